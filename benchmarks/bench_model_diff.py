@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Benchmark of the model diff: split_models of a two-model line list read in one pass, then diff_levels and
+diff_transitions (hash joins) of the two models, for 10^4 .. --max-lines resolved lines per model.
+Model b shifts 1% of the sublevels, drops 1% of them and 2% of the lines, and adds 1% new lines.
+
+    python benchmarks/bench_model_diff.py --max-lines 10000000
+"""
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+import numpy as np
+import pandas as pd
+
+from grotrian_plotter.data_loader import split_models
+from grotrian_plotter.modeldiff import diff_levels, diff_transitions, ModelDiff
+
+
+def synthetic_models(n_lines, n_levels, seed=0):
+    rng = np.random.default_rng(seed)
+    frame_a = pd.DataFrame({'LevelNumber': np.arange(1, n_levels + 1, dtype=np.int32),
+                            'SublevelNumber': np.ones(n_levels, dtype=np.int32),
+                            'ExcitationWaven': rng.random(n_levels) * 60000})
+    keep = rng.random(n_levels) > 0.01
+    frame_b = frame_a[keep].reset_index(drop=True)
+    shifted = rng.random(len(frame_b)) < 0.01
+    frame_b.loc[shifted, 'ExcitationWaven'] += 10
+    lines_a = rng.integers(0, n_levels, (n_lines, 2))
+    # model b: the lines of a between kept levels, minus 2%, plus 1% new ones (positions in frame_b)
+    new_pos = np.cumsum(keep) - 1
+    kept = keep[lines_a[:, 0]] & keep[lines_a[:, 1]] & (rng.random(n_lines) > 0.02)
+    lines_b = np.concatenate([new_pos[lines_a[kept]], rng.integers(0, len(frame_b), (n_lines // 100, 2))])
+    as_transitions = lambda lines: (lines[:, 0].astype(np.int32), lines[:, 1].astype(np.int32))
+    return frame_a, as_transitions(lines_a), frame_b, as_transitions(lines_b)
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Benchmark split and diff time versus number of lines.")
+    p.add_argument("--max-lines", type=int, default=10_000_000)
+    p.add_argument("--levels", type=int, default=20_000)
+    args = p.parse_args(argv)
+
+    print(f"{'lines':>10} {'split [s]':>9} {'levels [s]':>10} {'lines [s]':>9} {'removed':>9} {'added':>9}")
+    n = 10_000
+    while n <= args.max_lines:
+        frame_a, ta, frame_b, tb = synthetic_models(n, args.levels)
+        # both models' lines as one table, as read by fetch_transitions(models=[1, 2])
+        model_ids = np.repeat(np.array([1, 2], dtype=np.int32), [len(ta[0]), len(tb[0])])
+        both = np.concatenate([np.column_stack(ta), np.column_stack(tb)])
+        t0 = time.perf_counter()
+        split_models([1, 2], model_ids, both)
+        t1 = time.perf_counter()
+        levels = diff_levels(frame_a, frame_b)
+        t2 = time.perf_counter()
+        removed, added = diff_transitions(frame_a, ta, frame_b, tb)
+        t3 = time.perf_counter()
+        c = ModelDiff(levels, removed, added).counts()
+        print(f"{n:>10} {t1 - t0:>9.3f} {t2 - t1:>10.3f} {t3 - t2:>9.3f} {c['removed_lines']:>9} "
+              f"{c['added_lines']:>9}", flush=True)
+        n *= 10
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Benchmark: legacy LineFine reader (python engine, all columns as str, then to_numeric) vs the
+typed C-parser reader of grotrian_plotter.data_loader (column pushdown, int32 dtypes).
+'streamed' reads 200k-row chunks and keeps only lines between levels 1-200.
+Each reader runs in its own process so the peak RSS (ru_maxrss) is measured in isolation.
+
+    python benchmarks/bench_read_linefine.py --rows 2000000
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import resource
+import tempfile
+import subprocess
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+LINEFINE_HEADER = ['AtomicNumber', 'IonCharge', 'ModelIndex', 'LineNumber', 'type', 'LowerLevel', 'LowerSublevel',
+                   'UpperLevel', 'UpperSublevel', 'Wavelength', 'gf', 'A', 'RadDamping', 'StarkCoefficient',
+                   'VanderWaalsCoefficient', 'EWavenLower', 'EWavenUpper', 'gLower', 'gUpper', '2Jlower', '2JUpper',
+                   'broad', 'prd', 'nlteparm', 'commentid']
+
+
+def write_linefine(path, rows, seed=0):
+    """Write a synthetic 25-column ModelAtomicIonLineFine table with the schema of data/."""
+    import numpy as np
+    import pandas as pd
+    rng = np.random.default_rng(seed)
+    low = rng.integers(1, 500, rows)
+    up = low + rng.integers(1, 500, rows)
+    df = pd.DataFrame({c: np.zeros(rows, dtype=np.int8) for c in LINEFINE_HEADER})
+    df['AtomicNumber'] = 26
+    df['ModelIndex'] = 1
+    df['LineNumber'] = np.arange(1, rows + 1)
+    df['type'] = 1
+    df['LowerLevel'], df['UpperLevel'] = low, up
+    df['LowerSublevel'] = rng.integers(1, 4, rows)
+    df['UpperSublevel'] = rng.integers(1, 4, rows)
+    for col in ['Wavelength', 'gf', 'A', 'RadDamping', 'StarkCoefficient', 'VanderWaalsCoefficient',
+                'EWavenLower', 'EWavenUpper']:
+        df[col] = rng.random(rows) * 1e4
+    df.to_csv(path, sep='\t', index=False, float_format='%.7g')
+
+
+def legacy_fetch_transitions(path):
+    import pandas as pd
+    DB_trans = pd.read_csv(path, sep=r'\s+', comment='#', engine='python', dtype=str)
+    DB_trans = DB_trans.loc[:, [c for c in ['LowerLevel', 'LowerSublevel', 'UpperLevel', 'UpperSublevel']
+                                if c in DB_trans.columns]]
+    for col in DB_trans.columns:
+        DB_trans[col] = pd.to_numeric(DB_trans[col], errors='coerce')
+    return DB_trans.values.tolist()
+
+
+def typed_fetch_transitions(path):
+    from grotrian_plotter.data_loader import fetch_transitions
+    return fetch_transitions(None, 26, 0, '', file_linefine=path)
+
+
+def streamed_fetch_transitions(path, levs=range(1, 201), chunksize=200_000):
+    from grotrian_plotter.data_loader import fetch_transitions
+    return fetch_transitions(None, 26, 0, '', file_linefine=path, levs=levs, chunksize=chunksize)
+
+
+READERS = {'legacy': legacy_fetch_transitions, 'typed': typed_fetch_transitions,
+           'streamed': streamed_fetch_transitions}
+
+
+def run_worker(reader, path):
+    import pandas  # noqa: F401  (import cost is not part of the measurement)
+    t0 = time.perf_counter()
+    rows = READERS[reader](path)
+    wall = time.perf_counter() - t0
+    # ru_maxrss is in KiB on Linux
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(json.dumps({'reader': reader, 'rows': len(rows), 'wall_s': wall, 'peak_rss_mb': peak}))
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Benchmark LineFine table readers.")
+    p.add_argument("--rows", type=int, default=2_000_000, help="Rows in the synthetic LineFine table")
+    p.add_argument("--file-linefine", default=None, help="Use an existing LineFine file instead")
+    p.add_argument("--readers", default="legacy,typed,streamed", help="Comma-separated readers to run")
+    p.add_argument("--worker", default=None, help=argparse.SUPPRESS)
+    args = p.parse_args(argv)
+
+    if args.worker == 'write':
+        write_linefine(args.file_linefine, args.rows)
+        return
+    if args.worker:
+        run_worker(args.worker, args.file_linefine)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.file_linefine
+        if path is None:
+            path = os.path.join(tmp, 'ModelAtomicIonLineFine.dat')
+            print(f"[INFO] Writing {args.rows} synthetic lines to {path}")
+            # in a child too: a forked child inherits the parent's RSS in ru_maxrss
+            subprocess.run([sys.executable, os.path.abspath(__file__), '--worker', 'write',
+                            '--rows', str(args.rows), '--file-linefine', path], check=True)
+        results = []
+        for reader in args.readers.split(','):
+            out = subprocess.run([sys.executable, os.path.abspath(__file__), '--worker', reader,
+                                  '--file-linefine', path], check=True, capture_output=True, text=True)
+            results.append(json.loads(out.stdout.strip().splitlines()[-1]))
+
+    print(f"{'reader':<8} {'rows':>10} {'wall [s]':>10} {'peak RSS [MB]':>14}")
+    for r in results:
+        print(f"{r['reader']:<8} {r['rows']:>10} {r['wall_s']:>10.2f} {r['peak_rss_mb']:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Benchmark of plot_levels_and_transitions: render (figure + artists) and savefig time for
+10^2 .. 10^6 transitions, with the LineCollection renderer, the original per-artist renderer and the
+matplotlib-free svg renderer (which writes the PNG itself: its whole time is reported as render).
+The per-artist renderer is only run up to --max-artists transitions (it grows to minutes beyond that).
+
+    python benchmarks/bench_render.py --max-transitions 1000000
+"""
+import io
+import os
+import sys
+import time
+import contextlib
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+import numpy as np
+
+from grotrian_plotter import plotting
+
+
+def synthetic_levels(n_levels=300, seed=0):
+    rng = np.random.default_rng(seed)
+    levels = []
+    for k in range(n_levels):
+        mult = 1 if k % 2 else 3
+        l = int(rng.integers(0, 4))
+        levels.append({'LevelNumber': k + 1, 'SublevelNumber': 1, 'energy': float(rng.random() * 6),
+                       'label': f"{3 + k % 5}^{mult}{'SPDF'[l]}_1", 'J2': 2, 'n': 3 + k % 5, 'j': 1,
+                       'mult': mult, 'l': l, 'xstart': (8 if mult == 1 else 0) + l})
+    return levels
+
+
+def run_once(levels, transitions, renderer, outpath):
+    timings = {}
+    real_savefig = plt.Figure.savefig
+
+    def timed_savefig(fig, *a, **k):
+        t = time.perf_counter()
+        real_savefig(fig, *a, **k)
+        timings['savefig'] = time.perf_counter() - t
+
+    plt.Figure.savefig = timed_savefig
+    try:
+        t0 = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            plotting.plot_levels_and_transitions(levels, transitions, outpath=outpath, show=False,
+                                                 renderer=renderer)
+        total = time.perf_counter() - t0
+    finally:
+        plt.Figure.savefig = real_savefig
+    timings.setdefault('savefig', 0.0)
+    timings['render'] = total - timings['savefig']
+    return timings
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Benchmark render/savefig time versus number of transitions.")
+    p.add_argument("--max-transitions", type=int, default=1_000_000)
+    p.add_argument("--max-artists", type=int, default=10_000)
+    p.add_argument("--levels", type=int, default=300)
+    args = p.parse_args(argv)
+
+    levels = synthetic_levels(args.levels)
+    rng = np.random.default_rng(1)
+    print(f"{'transitions':>11} {'renderer':<12} {'render [s]':>10} {'savefig [s]':>11}")
+    with tempfile.TemporaryDirectory() as tmp:
+        outpath = os.path.join(tmp, 'bench.png')
+        n = 100
+        while n <= args.max_transitions:
+            i = rng.integers(0, args.levels, n).astype(np.int32)
+            f = rng.integers(0, args.levels, n).astype(np.int32)
+            for renderer in ('collections', 'artists', 'svg'):
+                if renderer == 'artists' and n > args.max_artists:
+                    continue
+                t = run_once(levels, (i, f, np.zeros(n, dtype=bool)), renderer, outpath)
+                print(f"{n:>11} {renderer:<12} {t['render']:>10.3f} {t['savefig']:>11.3f}", flush=True)
+            n *= 10
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Benchmark of the SQL path against a SQLite stand-in built from the data/ tables:
+one engine per query, sequential and string-built IN lists (as SQL_table did) vs the pooled engine
+with bound parameters and concurrent fetching of the three tables (fetch_sql_tables).
+
+    python benchmarks/bench_sql.py --repeat 50
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from grotrian_plotter.data_loader import build_sqlite_database, fetch_sql_tables, dispose_engines
+
+DATA = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+
+
+def legacy_fetch(url, atom, ion, levs):
+    import pandas as pd
+    import sqlalchemy
+    levs_str = ','.join([str(l) for l in levs])
+    out = []
+    for table, cols, col in (('ModelAtomicIonLevel', 'LevelNumber, FullConfig, ElectronConfig', 'LevelNumber'),
+                             ('ModelAtomicIonLevelSublevel', 'LevelNumber, SublevelNumber, "2J", ExcitationWaven',
+                              'LevelNumber'),
+                             ('ModelAtomicIonLineFine', 'LowerLevel, LowerSublevel, UpperLevel, UpperSublevel',
+                              'UpperLevel')):
+        engine = sqlalchemy.create_engine(url)
+        connection = engine.connect()
+        query = (f'SELECT {cols} FROM "{table}" WHERE AtomicNumber={atom} AND IonCharge={ion} '
+                 f'AND {col} IN ({levs_str})')
+        out.append(pd.read_sql(sqlalchemy.text(query), connection))
+    return out
+
+
+def pooled_fetch(url, atom, ion, levs):
+    return fetch_sql_tables(url, atom, ion, levs)
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Benchmark the SQL table fetching.")
+    p.add_argument("--repeat", type=int, default=50, help="Fetches per method")
+    p.add_argument("--levs", type=int, default=25, help="Select levels 1..N")
+    args = p.parse_args(argv)
+
+    import contextlib, io
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'standin.db')
+        build_sqlite_database(path, *(os.path.join(DATA, f) for f in
+                                      ('ModelAtomicIonLevel.dat', 'ModelAtomicIonLevelSublevel.dat',
+                                       'ModelAtomicIonLineFine.dat')))
+        url = f"sqlite:///{path}"
+        levs = list(range(1, args.levs + 1))
+        print(f"{'method':<8} {'fetches':>8} {'mean [ms]':>10}")
+        for name, fetch in (('legacy', legacy_fetch), ('pooled', pooled_fetch)):
+            with contextlib.redirect_stdout(io.StringIO()):
+                t0 = time.perf_counter()
+                for _ in range(args.repeat):
+                    fetch(url, 12, 0, levs)
+                wall = time.perf_counter() - t0
+            print(f"{name:<8} {args.repeat:>8} {1e3 * wall / args.repeat:>10.2f}")
+        dispose_engines()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Stage-level benchmark of the local-file pipeline on production-scale synthetic tables
+(examples/generate_synthetic_tables.py): read, build_levels_list, build_transitions_list and plot.
+For every stage it records the best wall time of --repeat runs and the peak traced memory
+(tracemalloc) of one run, and writes them as JSON together with the commit and the scale, so two
+commits can be compared:
+
+    python benchmarks/bench_stages.py --terms 2000 --lines 1000000 --json base.json
+    git checkout other-branch
+    python benchmarks/bench_stages.py --terms 2000 --lines 1000000 --compare base.json
+
+--compare prints new/baseline ratios and exits with status 1 when a stage is slower (or uses more
+memory) than --threshold times the baseline; stages faster than --min-seconds in both runs are
+too noisy to flag on time.
+"""
+import io
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import contextlib
+import subprocess
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+sys.path.insert(0, os.path.join(ROOT, 'examples'))
+
+import matplotlib
+matplotlib.use('Agg')
+
+from generate_synthetic_tables import gen_scaled_tables
+from grotrian_plotter.data_loader import fetch_levels_tables, fetch_transitions
+from grotrian_plotter.building import build_levels_list, build_transitions_list
+from grotrian_plotter.plotting import plot_levels_and_transitions
+
+STAGES = ['read', 'build_levels_list', 'build_transitions_list', 'plot']
+FILES = ['ModelAtomicIonLevel.dat', 'ModelAtomicIonLevelSublevel.dat', 'ModelAtomicIonLineFine.dat']
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def pipeline(tables_dir, levs, outpath, chunksize=None):
+    """The CLI local-file path, one callable per stage; each stage reads the previous stage's output."""
+    file_level, file_sublevel, file_linefine = [os.path.join(tables_dir, f) for f in FILES]
+    state = {}
+
+    def read():
+        state['Levels_SQL'], state['LevelsSub_SQL'] = fetch_levels_tables(
+            None, 12, 0, levs, file_level=file_level, file_sublevel=file_sublevel)
+        state['DB_trans_raw'] = fetch_transitions(None, 12, 0, '', file_linefine=file_linefine,
+                                                  levs=levs, chunksize=chunksize)
+
+    def levels():
+        state['levels'], state['pos_map'] = build_levels_list(state['Levels_SQL'], state['LevelsSub_SQL'])
+
+    def transitions():
+        state['transitions'] = build_transitions_list(state['DB_trans_raw'], state['pos_map'], mode='arrays')
+
+    def plot():
+        plot_levels_and_transitions(state['levels'], state['transitions'], outpath=outpath, show=False)
+
+    return dict(zip(STAGES, [read, levels, transitions, plot])), state
+
+
+def measure(stage, repeat):
+    times = []
+    for k in range(repeat):
+        if k == 0:
+            tracemalloc.start()
+        t0 = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            stage()
+        times.append(time.perf_counter() - t0)
+        if k == 0:
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+    # the first run is traced (slower); report the best of the untraced ones when there are any
+    return {'seconds': min(times[1:] or times), 'peak_mb': peak / 1024 ** 2}
+
+
+def run(args):
+    scale = {'species': args.species, 'terms': args.terms, 'sublevels': args.sublevels, 'lines': args.lines,
+             'seed': args.seed, 'chunksize': args.chunksize}
+    with tempfile.TemporaryDirectory() as tmp:
+        with contextlib.redirect_stdout(io.StringIO()):
+            gen_scaled_tables(tmp, species=args.species, terms=args.terms, sublevels=args.sublevels,
+                              lines=args.lines, seed=args.seed)
+        levs = list(range(1, args.terms + 1))
+        stages, state = pipeline(tmp, levs, os.path.join(tmp, 'diagram.png'), chunksize=args.chunksize)
+        results = {}
+        for name in STAGES:
+            results[name] = measure(stages[name], args.repeat)
+            print(f"{name:24s} {results[name]['seconds']:9.3f} s {results[name]['peak_mb']:9.1f} MB")
+        counts = {'levels': len(state['levels']), 'transitions': int(len(state['transitions'][0])),
+                  'unresolved': int(state['transitions'][2].sum())}
+    return {'commit': git_commit(), 'python': platform.python_version(), 'scale': scale, 'counts': counts,
+            'stages': results}
+
+
+def compare(report, baseline, threshold, min_seconds=0.05):
+    """Print new/baseline ratios; return the list of regressed (stage, metric) pairs."""
+    if baseline.get('scale') != report['scale']:
+        print(f"[WARN] scale differs from the baseline: {baseline.get('scale')} vs {report['scale']}")
+    regressions = []
+    print(f"{'stage':24s} {'time':>8s} {'memory':>8s}   (vs {baseline.get('commit')})")
+    for name in STAGES:
+        old, new = baseline['stages'].get(name), report['stages'][name]
+        if not old:
+            continue
+        ratios = {m: new[m] / old[m] if old[m] else float('inf') for m in ('seconds', 'peak_mb')}
+        flag = [m for m, r in ratios.items() if r > threshold]
+        if max(old['seconds'], new['seconds']) < min_seconds and 'seconds' in flag:
+            flag.remove('seconds')
+        regressions += [(name, m) for m in flag]
+        print(f"{name:24s} {ratios['seconds']:7.2f}x {ratios['peak_mb']:7.2f}x" + ('   REGRESSION' if flag else ''))
+    return regressions
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument('--species', type=int, default=1)
+    p.add_argument('--terms', type=int, default=500)
+    p.add_argument('--sublevels', type=int, default=3)
+    p.add_argument('--lines', type=int, default=100_000)
+    p.add_argument('--seed', type=int, default=0)
+    p.add_argument('--chunksize', type=int, default=None, help='Stream the LineFine file in chunks of N rows')
+    p.add_argument('--repeat', type=int, default=3)
+    p.add_argument('--json', default=None, help='Write the results to this file')
+    p.add_argument('--compare', default=None, help='Baseline JSON written by an earlier --json run')
+    p.add_argument('--threshold', type=float, default=1.25,
+                   help='Regression when new/baseline exceeds this ratio (default 1.25)')
+    p.add_argument('--min-seconds', type=float, default=0.05,
+                   help='Ignore time regressions of stages faster than this (default 0.05)')
+    args = p.parse_args(argv)
+
+    report = run(args)
+    if args.json:
+        with open(args.json, 'w') as fh:
+            json.dump(report, fh, indent=2)
+    if args.compare:
+        with open(args.compare) as fh:
+            baseline = json.load(fh)
+        if compare(report, baseline, args.threshold, args.min_seconds):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
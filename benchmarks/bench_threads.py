@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Benchmark of in-process parallel rendering: --diagrams diagrams (synthetic levels, --transitions lines each)
+rendered with render_figure + savefig on a thread pool of 1, 2, 4 ... --max-threads threads. Reports the
+throughput (diagrams/s) and the speed-up over one thread, and checks that every thread count produces the
+same images as the serial run.
+
+    python benchmarks/bench_threads.py --max-threads 8 --diagrams 32
+"""
+import io
+import os
+import sys
+import time
+import hashlib
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+import numpy as np
+
+from grotrian_plotter.plotting import render_figure, rendering_turn
+from bench_render import synthetic_levels
+
+
+def render_png(levels, transitions, renderer, fmt, dpi):
+    buf = io.BytesIO()
+    with rendering_turn():
+        render_figure(levels, transitions, renderer=renderer).savefig(buf, format=fmt, dpi=dpi)
+    return hashlib.md5(buf.getvalue()).hexdigest()
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Benchmark render throughput versus number of threads.")
+    p.add_argument("--max-threads", type=int, default=8)
+    p.add_argument("--diagrams", type=int, default=32)
+    p.add_argument("--transitions", type=int, default=10_000)
+    p.add_argument("--levels", type=int, default=300)
+    p.add_argument("--renderer", choices=("collections", "artists"), default="artists")
+    p.add_argument("--format", default="png")
+    p.add_argument("--dpi", type=int, default=100)
+    args = p.parse_args(argv)
+
+    rng = np.random.default_rng(1)
+    jobs = []
+    for k in range(args.diagrams):
+        levels = synthetic_levels(args.levels, seed=k)
+        i = rng.integers(0, args.levels, args.transitions).astype(np.int32)
+        f = rng.integers(0, args.levels, args.transitions).astype(np.int32)
+        jobs.append((levels, (i, f, np.zeros(args.transitions, dtype=bool))))
+
+    def run(job):
+        return render_png(job[0], job[1], args.renderer, args.format, args.dpi)
+
+    print(f"{'threads':>7} {'time [s]':>9} {'diagrams/s':>10} {'speed-up':>8} {'same output':>11}")
+    reference, base = None, None
+    n = 1
+    while n <= args.max_threads:
+        t0 = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=n) as pool:
+            digests = list(pool.map(run, jobs))
+        elapsed = time.perf_counter() - t0
+        if reference is None:
+            reference, base = digests, elapsed
+        print(f"{n:>7} {elapsed:>9.3f} {len(jobs) / elapsed:>10.2f} {base / elapsed:>8.2f} "
+              f"{str(digests == reference):>11}", flush=True)
+        n *= 2
+
+
+if __name__ == "__main__":
+    main()
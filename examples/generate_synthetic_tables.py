@@ -2,6 +2,10 @@
 """
 Simple synthetic generator for the three tables required by Grotrian script.
 Generates tiny .dat files compatible with the parser (whitespace-separated).
+
+With --terms (and optionally --species, --sublevels, --lines) it instead writes production-scale
+tables with the full column schema of data/*.dat, e.g.
+    python examples/generate_synthetic_tables.py --outdir /tmp/big --species 4 --terms 2000 --lines 1000000
 """
 import os
 import argparse
@@ -44,8 +48,111 @@ def gen_tables(outdir):
 
     print(f"Synthetic tables written to {outdir}")
 
+# Column schema of data/*.dat
+LEVEL_COLUMNS = ['AtomicNumber', 'IonCharge', 'ModelIndex', 'LevelNumber', 'type', 'FullConfig', 'ElectronConfig',
+                 'Term', '2S', 'L', 'P', 'LevelWeight', 'ExcitationWaven', 'commentid']
+SUBLEVEL_COLUMNS = ['AtomicNumber', 'IonCharge', 'ModelIndex', 'LevelNumber', 'SublevelNumber', '2J',
+                    'StatisticalWeight', 'ExcitationWaven', 'commentid']
+LINEFINE_COLUMNS = ['AtomicNumber', 'IonCharge', 'ModelIndex', 'LineNumber', 'type', 'LowerLevel', 'LowerSublevel',
+                    'UpperLevel', 'UpperSublevel', 'Wavelength', 'gf', 'A', 'RadDamping', 'StarkCoefficient',
+                    'VanderWaalsCoefficient', 'EWavenLower', 'EWavenUpper', 'gLower', 'gUpper', '2Jlower', '2JUpper',
+                    'broad', 'prd', 'nlteparm', 'commentid']
+L_LETTERS = 'SPDFGHI'
+
+
+def _species_terms(n_terms, rng):
+    """Terms 3s.nl-(2S+1)L of a two-electron ion: n, l, 2S+1 and term energy (cm^-1), sorted by energy."""
+    k = np.arange(n_terms)
+    mult = np.where(k % 2 == 0, 1, 3)
+    pair = k // 2
+    # walk n = 3, 4, ... and l = 0 .. min(n-1, 6) for each (n, l) pair
+    nl = [(n, l) for n in range(3, 3 + n_terms) for l in range(min(n, len(L_LETTERS)))][:len(pair)]
+    n = np.array([nl[p][0] for p in pair])
+    l = np.array([nl[p][1] for p in pair])
+    ionization = 61671.0
+    energy = ionization * (1 - 1.0 / (n - 0.6 * np.exp(-l)) ** 2 * 2.2) + rng.normal(0, 50, n_terms)
+    energy = np.clip(energy, 100.0, None)
+    energy[0] = 0.0
+    order = np.argsort(energy, kind='stable')
+    return n[order], l[order], mult[order], energy[order]
+
+
+def gen_scaled_tables(outdir, species=1, terms=25, sublevels=3, lines=100, seed=0, Z0=12):
+    """Write production-scale tables: species ions (Z0, 0), (Z0, 1), ..., terms terms per ion, up to
+    sublevels fine-structure sublevels per term (2J = |2L-2S|..2L+2S) and lines lines per ion.
+    """
+    os.makedirs(outdir, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    lvl_parts, sub_parts, line_parts = [], [], []
+    for s in range(species):
+        Z, ion = Z0 + s // 3, s % 3
+        n, l, mult, energy = _species_terms(terms, rng)
+        level_no = np.arange(1, terms + 1)
+        letters = np.array(list(L_LETTERS))[l]
+        odd = np.where(l % 2 == 1, '*', '')
+        nl = np.char.add(n.astype(str), np.array(list('spdfghi'))[l])
+        econf = np.char.add('3s.', nl)
+        term = np.char.add(np.char.add(mult.astype(str), letters), odd)
+        S2 = mult - 1
+        lvl_parts.append(pd.DataFrame({
+            'AtomicNumber': Z, 'IonCharge': ion, 'ModelIndex': 1, 'LevelNumber': level_no, 'type': 1,
+            'FullConfig': np.char.add(np.char.add(econf, '-'), term), 'ElectronConfig': econf, 'Term': term,
+            '2S': S2, 'L': l, 'P': 'NULL', 'LevelWeight': mult * (2 * l + 1),
+            'ExcitationWaven': np.round(energy, 3), 'commentid': 1}))
+
+        # fine structure: 2J from |2L - 2S| to 2L + 2S in steps of 2, at most `sublevels` per term
+        two_j = [np.arange(abs(2 * li - si), 2 * li + si + 1, 2)[:sublevels] for li, si in zip(l, S2)]
+        counts = np.array([len(t) for t in two_j])
+        sub_level = np.repeat(level_no, counts)
+        sub_no = np.concatenate([np.arange(1, c + 1) for c in counts])
+        sub_2j = np.concatenate(two_j)
+        sub_e = np.repeat(energy, counts) + (sub_no - 1) * rng.uniform(0, 20, len(sub_no))
+        sub_e[0] = 0.0
+        sub_parts.append(pd.DataFrame({
+            'AtomicNumber': Z, 'IonCharge': ion, 'ModelIndex': 1, 'LevelNumber': sub_level,
+            'SublevelNumber': sub_no, '2J': sub_2j, 'StatisticalWeight': sub_2j + 1,
+            'ExcitationWaven': np.round(sub_e, 3), 'commentid': 1}))
+
+        # lines between random sublevel pairs, lower = lower energy
+        a = rng.integers(0, len(sub_no), lines)
+        b = rng.integers(0, len(sub_no), lines)
+        b = np.where(a == b, (b + 1) % len(sub_no), b)
+        lo = np.where(sub_e[a] <= sub_e[b], a, b)
+        up = np.where(sub_e[a] <= sub_e[b], b, a)
+        dE = np.maximum(sub_e[up] - sub_e[lo], 1e-3)
+        gf = 10 ** rng.uniform(-6, 0.5, lines)
+        wl = 1e8 / dE
+        A = 0.6670e16 * gf / ((sub_2j[up] + 1) * wl ** 2)
+        line_parts.append(pd.DataFrame({
+            'AtomicNumber': Z, 'IonCharge': ion, 'ModelIndex': 1, 'LineNumber': np.arange(1, lines + 1),
+            'type': 1, 'LowerLevel': sub_level[lo], 'LowerSublevel': sub_no[lo], 'UpperLevel': sub_level[up],
+            'UpperSublevel': sub_no[up], 'Wavelength': wl, 'gf': gf, 'A': A,
+            'RadDamping': 10 ** rng.uniform(6, 9, lines), 'StarkCoefficient': 10 ** rng.uniform(-7, -5, lines),
+            'VanderWaalsCoefficient': 10 ** rng.uniform(-9, -8, lines), 'EWavenLower': sub_e[lo],
+            'EWavenUpper': sub_e[up], 'gLower': sub_2j[lo] + 1, 'gUpper': sub_2j[up] + 1,
+            '2Jlower': sub_2j[lo], '2JUpper': sub_2j[up], 'broad': 0, 'prd': 0, 'nlteparm': 1, 'commentid': 0}))
+
+    for name, parts, columns in (('ModelAtomicIonLevel.dat', lvl_parts, LEVEL_COLUMNS),
+                                 ('ModelAtomicIonLevelSublevel.dat', sub_parts, SUBLEVEL_COLUMNS),
+                                 ('ModelAtomicIonLineFine.dat', line_parts, LINEFINE_COLUMNS)):
+        df = pd.concat(parts, ignore_index=True).loc[:, columns]
+        df.to_csv(os.path.join(outdir, name), sep='\t', index=False, float_format='%.7g')
+
+    print(f"Synthetic tables ({species} species x {terms} terms, {lines} lines each) written to {outdir}")
+
+
 if __name__ == "__main__":
     p = argparse.ArgumentParser()
     p.add_argument("--outdir", default="examples/tables", help="Output directory for synthetic tables")
+    p.add_argument("--terms", type=int, default=None,
+                   help="Terms (LevelNumber) per species; enables the production-scale generator")
+    p.add_argument("--species", type=int, default=1, help="Number of (Z, ion) species (scaled mode)")
+    p.add_argument("--sublevels", type=int, default=3, help="Max fine-structure sublevels per term (scaled mode)")
+    p.add_argument("--lines", type=int, default=100, help="Lines per species (scaled mode)")
+    p.add_argument("--seed", type=int, default=0, help="Random seed (scaled mode)")
     args = p.parse_args()
-    gen_tables(args.outdir)
+    if args.terms:
+        gen_scaled_tables(args.outdir, species=args.species, terms=args.terms, sublevels=args.sublevels,
+                          lines=args.lines, seed=args.seed)
+    else:
+        gen_tables(args.outdir)
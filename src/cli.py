@@ -4,44 +4,48 @@
 cli.py (former "Grotrian-JIP-NEW.py")
 Refactored script (with the help of copilot) to build Grotrian diagrams from SRPM SQL DB.
 """
+import os
+import sys
 import argparse
 import warnings
-import matplotlib
-from grotrian_plotter.data_loader import fetch_levels_tables, fetch_transitions
-from grotrian_plotter.building import build_levels_list, build_transitions_list
-from grotrian_plotter.plotting import plot_levels_and_transitions
+from grotrian_plotter.selection import LevelSet
+# Heavy modules (NumPy, pandas, matplotlib and the rest of grotrian_plotter) are imported inside
+# main() by the stage that needs them, so --help and cache hits do not pay for them.
 # -------------------------
 # Utilities / core routines
 # -------------------------
 def set_backend_if_requested(backend):
     if backend:
         try:
+            import matplotlib
             matplotlib.use(backend, force=True)
             print(f"[INFO] matplotlib backend set to {backend}")
         except Exception as e:
             warnings.warn(f"Could not set backend {backend}: {e}")
 
 
+def use_headless_backend():
+    """Agg for runs that only write files, through MPLBACKEND: matplotlib is not imported here (nor at all
+    by runs that never draw). An explicit MPLBACKEND wins; an already imported matplotlib is switched.
+    """
+    os.environ.setdefault('MPLBACKEND', 'Agg')
+    if 'matplotlib' in sys.modules:
+        sys.modules['matplotlib'].use(os.environ['MPLBACKEND'])
+
+
 def parse_levs_arg(levs_arg):
-    """Parse '1-25,30,35' or '1-25' or comma-separated list into sorted unique ints."""
+    """Parse '1-25,30,35' or '1-25' or comma-separated list into a LevelSet (intervals)."""
     if levs_arg is None:
         return None
-    parts = [p.strip() for p in str(levs_arg).split(',')]
-    out = []
-    for p in parts:
-        if '-' in p:
-            a, b = p.split('-', 1)
-            out.extend(list(range(int(a), int(b) + 1)))
-        else:
-            out.append(int(p))
-    return sorted(set(out))
+    return LevelSet.parse(levs_arg)
 
 # -------------------------
 # Main
 # -------------------------
-def main(argv=None):
+def build_parser():
     p = argparse.ArgumentParser(description="Build Grotrian diagram from SRPM SQL DB or local files.")
-    p.add_argument("--database", default="AtomicModelsCCA", help="SQL database name")
+    p.add_argument("--database", default="AtomicModelsCCA",
+                   help="SQL database name, or a SQLAlchemy URL such as 'sqlite:///standin.db'")
     p.add_argument("--file-level", default=None, help="Ruta a tabla ModelAtomicIonLevel (archivo .dat/.csv).")
     p.add_argument("--file-sublevel", default=None, help="Ruta a tabla ModelAtomicIonLevelSublevel.")
     p.add_argument("--file-linefine", default=None, help="Ruta a tabla ModelAtomicIonLineFine.")
@@ -51,31 +55,263 @@ def main(argv=None):
     p.add_argument("--out", default=None, help="Output figure path (if given, saves instead of showing)")
     p.add_argument("--backend", default=None, help="Matplotlib backend to use (optional, e.g. 'Qt5Agg')")
     p.add_argument("--show", action="store_true", help="Show interactive window (if backend allows)")
-    args = p.parse_args(argv)
+    p.add_argument("--cache-dir", default=None,
+                   help="Directory of the parsed-table/model cache (local files only; "
+                        "default $GROTRIAN_CACHE_DIR or ~/.cache/grotrian_plotter)")
+    p.add_argument("--no-cache", action="store_true", help="Do not read or write the on-disk cache")
+    p.add_argument("--chunksize", type=int, default=None,
+                   help="Stream --file-linefine in chunks of N rows, keeping only lines between the selected levels")
+    p.add_argument("--renderer", default="artists", choices=["collections", "artists", "svg"],
+                   help="Draw levels/transitions as one artist each (original, default), two LineCollections (fast), "
+                        "or write --out (.svg/.png) directly without matplotlib (svg)")
+    p.add_argument("--label-layout", action="store_true",
+                   help="Spread level tags that would overlap in their term column (dense diagrams)")
+    p.add_argument("--validate", default=None, choices=["lenient", "strict"],
+                   help="Check the tables first (duplicate sublevels, dangling transitions, bad energies, missing "
+                        "configs): lenient warns once with the counts, strict stops on any problem")
+    p.add_argument("--emin", type=float, default=None,
+                   help="Draw only the sublevels with ExcitationWaven >= EMIN (cm^-1)")
+    p.add_argument("--emax", type=float, default=None,
+                   help="Draw only the sublevels with ExcitationWaven <= EMAX (cm^-1)")
+    p.add_argument("--wlmin", type=float, default=None, help="Draw only the transitions with Wavelength >= WLMIN")
+    p.add_argument("--wlmax", type=float, default=None, help="Draw only the transitions with Wavelength <= WLMAX")
+    p.add_argument("--diff-models", type=int, nargs=2, default=None, metavar=("OLD", "NEW"),
+                   help="Compare two ModelIndex versions of the species (read in one pass): print the shifted, "
+                        "added and removed sublevels and lines, and draw them over the NEW diagram")
+    p.add_argument("--lod-by", default="gf", choices=["gf", "A"],
+                   help="Line strength used by --lod-top/--lod-min/--lod-merge (default gf)")
+    p.add_argument("--lod-top", type=int, default=None, help="Draw only the N strongest transitions (or multiplets)")
+    p.add_argument("--lod-min", type=float, default=None,
+                   help="Draw only the transitions (or multiplets) with --lod-by value >= this threshold")
+    p.add_argument("--lod-merge", action="store_true",
+                   help="Draw one segment per multiplet (LevelNumber pair) instead of one per fine-structure line")
+    p.add_argument("--batch", default=None,
+                   help="JSON manifest of jobs (Z, ion, levs, out) to render over a process pool")
+    p.add_argument("--workers", type=int, default=None, help="Process pool size for --batch (default: CPU count)")
+    p.add_argument("--serve", default=None, metavar="ADDRESS",
+                   help="Run a local render service on PORT, HOST:PORT or a Unix socket path (see service.py)")
+    p.add_argument("--serve-workers", type=int, default=4, help="Render threads of --serve")
+    p.add_argument("--serve-queue", type=int, default=16,
+                   help="Requests --serve queues beyond its workers before answering 503 (backpressure)")
+    p.add_argument("--serve-allow-files", nargs=3, action="append", default=[],
+                   metavar=("LEVEL", "SUBLEVEL", "LINEFINE"),
+                   help="Tables --serve requests may name besides the --file-* ones (repeatable)")
+    p.add_argument("--serve-allow-database", action="append", default=[], metavar="URL",
+                   help="Database --serve requests may name besides --database (repeatable)")
+    p.add_argument("--serve-allow-remote", action="store_true",
+                   help="Let --serve listen on a non-loopback host (the service has no authentication)")
+    p.add_argument("--watch", action="store_true",
+                   help="Keep running: re-render when one of the three --file-* tables changes (Ctrl-C to stop)")
+    p.add_argument("--watch-interval", type=float, default=0.5, help="Polling interval of --watch in seconds")
+    p.add_argument("--profile", action="store_true",
+                   help="Print wall/CPU time, peak memory and row counts of each stage (traces memory)")
+    p.add_argument("--metrics-json", default=None, help="Write the per-stage metrics to this JSON file")
+    p.add_argument("--profile-stage", default=None,
+                   help="Run this stage (e.g. read_transitions, build_levels, plot) under cProfile")
+    p.add_argument("--profile-out", default=None, help="cProfile dump path for --profile-stage (default STAGE.prof)")
+    return p
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
 
     if args.backend:
         set_backend_if_requested(args.backend)
+    elif (args.out or args.batch or args.serve) and not args.show and args.renderer != 'svg':
+        # headless fast path: nothing will be shown, so skip the GUI backend resolution
+        # (the svg renderer never loads matplotlib)
+        use_headless_backend()
+
+    if args.serve:
+        from grotrian_plotter.service import RenderService, serve, parse_address
+        host, port, unix_socket = parse_address(args.serve, allow_remote=args.serve_allow_remote)
+        files = (args.file_level, args.file_sublevel, args.file_linefine)
+        service = RenderService(files=files if all(files) else None, database=args.database,
+                                workers=args.serve_workers, queue_size=args.serve_queue, renderer=args.renderer,
+                                allowed_files=args.serve_allow_files, allowed_databases=args.serve_allow_database)
+        return serve(service, host=host, port=port, unix_socket=unix_socket)
+
+    if args.batch:
+        import json
+        from grotrian_plotter.batch import run_batch
+        results = run_batch(args.batch, workers=args.workers, renderer=args.renderer,
+                            trace_memory=bool(args.profile or args.metrics_json))
+        failed = [r for r in results if not r['ok']]
+        print(f"[BATCH] {len(results) - len(failed)} ok, {len(failed)} failed")
+        if args.metrics_json:
+            with open(args.metrics_json, 'w') as fh:
+                json.dump([{'job': r['job'], 'ok': r['ok'], 'metrics': r.get('metrics')} for r in results], fh,
+                          indent=2)
+        return results
 
-    levs_list = parse_levs_arg(args.levs)
-    if not levs_list:
+    level_set = parse_levs_arg(args.levs)
+    if not level_set:
         raise ValueError("No levels parsed from --levs argument")
 
-    print("[INFO] 1/4: Fetching tables...")
-    Levels_SQL, LevelsSub_SQL = fetch_levels_tables(args.database, args.Z, args.ion, levs_list,
-                                                    file_level=args.file_level,
-                                                    file_sublevel=args.file_sublevel)
+    windowed = any(v is not None for v in (args.emin, args.emax, args.wlmin, args.wlmax))
+    if args.diff_models and (windowed or args.watch):
+        raise ValueError("--diff-models does not combine with --watch or --emin/--emax/--wlmin/--wlmax")
+    if args.watch:
+        if windowed:
+            raise ValueError("--emin/--emax/--wlmin/--wlmax are not supported with --watch")
+        if not (args.file_level and args.file_sublevel and args.file_linefine):
+            raise ValueError("--watch needs --file-level, --file-sublevel and --file-linefine")
+        if args.renderer == 'svg' and (args.show or not args.out):
+            raise ValueError("--watch with --renderer svg needs --out and no --show")
+        from grotrian_plotter.watch import DiagramWatcher
+        watcher = DiagramWatcher(args.Z, args.ion, level_set, args.file_level, args.file_sublevel,
+                                 args.file_linefine, outpath=args.out, show=args.show, renderer=args.renderer,
+                                 label_layout=args.label_layout)
+        return watcher.run(interval=args.watch_interval)
 
-    print("[INFO] 2/4: Building levels list...")
-    levels, pos_map = build_levels_list(Levels_SQL, LevelsSub_SQL)
+    lod = args.lod_top is not None or args.lod_min is not None or args.lod_merge
+    # line values (Wavelength, gf, A) for the level of detail and the wavelength window
+    need_values = lod or args.wlmin is not None or args.wlmax is not None
+    window_index = None
+    from grotrian_plotter.metrics import PipelineMetrics
+    metrics = PipelineMetrics(trace_memory=bool(args.profile or args.metrics_json),
+                              profile_stage=args.profile_stage, profile_path=args.profile_out)
 
-    print("[INFO] 3/4: Fetching and building transitions...")
-    levs_str = ','.join([str(l) for l in levs_list])
-    DB_trans_raw = fetch_transitions(args.database, args.Z, args.ion, levs_str,
-                                    file_linefine=args.file_linefine)
-    transitions = build_transitions_list(DB_trans_raw, pos_map)
+    if args.diff_models:
+        from grotrian_plotter.modeldiff import load_models, diff_models, plot_model_diff
+        old, new = args.diff_models
+        files = (args.file_level, args.file_sublevel, args.file_linefine)
+        if any(files) and not all(files):
+            raise ValueError("--diff-models needs all three --file-* tables, or none (SQL)")
+        print(f"[INFO] 1/2: Loading models {old} and {new}...")
+        models = load_models(args.Z, args.ion, level_set, [old, new], *files, database=args.database,
+                             chunksize=args.chunksize, metrics=metrics)
+        with metrics.stage('diff', rows_in=sum(len(m.transitions[0]) for m in models.values())) as rec:
+            diff = diff_models(models[old], models[new])
+            rec.update(diff.counts())
+        print(f"[DIFF] model {old} -> {new}: {diff}")
+        print("[INFO] 2/2: Plotting overlay diagram...")
+        with metrics.stage('plot'):
+            plot_model_diff(diff, models[old], models[new], outpath=args.out, show=args.show)
+        if args.profile:
+            print(metrics.format())
+        if args.metrics_json:
+            metrics.write_json(args.metrics_json)
+        return diff
+
+    if args.file_level and args.file_sublevel and args.file_linefine and not args.no_cache:
+        from grotrian_plotter.building import levels_frame_to_list
+        from grotrian_plotter.cache import TableCache, load_atomic_model
+        print("[INFO] 1-3/4: Loading atomic model (cache)...")
+        cache = TableCache(args.cache_dir)
+        model = load_atomic_model(args.Z, args.ion, level_set, args.file_level, args.file_sublevel,
+                                  args.file_linefine, cache=cache, chunksize=args.chunksize, metrics=metrics,
+                                  values=need_values, validate=args.validate, index=windowed)
+        frame, transitions, window_index = model.frame, model.transitions, model.window_index
+        print(f"[INFO] cache {'hit' if cache.hits else 'miss'} ({cache.cache_dir})")
+        with metrics.stage('levels_list', rows_in=len(frame)) as rec:
+            levels, pos_map = levels_frame_to_list(frame)
+            rec['rows_out'] = len(levels)
+    elif not (args.file_level or args.file_sublevel or args.file_linefine):
+        from grotrian_plotter.data_loader import fetch_sql_tables
+        from grotrian_plotter.building import build_levels_frame, levels_frame_to_list, build_transitions_list
+        from grotrian_plotter.lod import with_values
+        from grotrian_plotter.validation import validation_stage
+        print("[INFO] 1/4: Fetching tables (SQL, concurrent)...")
+        with metrics.stage('read') as rec:
+            Levels_SQL, LevelsSub_SQL, DB_trans_raw = fetch_sql_tables(args.database, args.Z, args.ion, level_set,
+                                                                       values=need_values)
+            if need_values:
+                DB_trans_raw, line_values = DB_trans_raw
+            rec['rows_out'] = len(Levels_SQL) + len(LevelsSub_SQL) + len(DB_trans_raw)
+        validation_stage(metrics, args.validate, Levels_SQL, LevelsSub_SQL, DB_trans_raw)
+
+        print("[INFO] 2/4: Building levels list...")
+        with metrics.stage('build_levels', rows_in=len(LevelsSub_SQL)) as rec:
+            frame = build_levels_frame(Levels_SQL, LevelsSub_SQL)
+            levels, pos_map = levels_frame_to_list(frame)
+            rec['rows_out'] = len(levels)
+
+        print("[INFO] 3/4: Building transitions...")
+        with metrics.stage('build_transitions', rows_in=len(DB_trans_raw)) as rec:
+            transitions = build_transitions_list(DB_trans_raw, pos_map, mode='arrays')
+            if need_values:
+                transitions = with_values(transitions, line_values)
+            rec['unresolved'] = int(transitions[2].sum())
+            rec['rows_out'] = len(transitions[2]) - rec['unresolved']
+    else:
+        from grotrian_plotter.data_loader import fetch_levels_tables, fetch_transitions
+        from grotrian_plotter.building import build_levels_frame, levels_frame_to_list, build_transitions_list
+        from grotrian_plotter.lod import with_values
+        from grotrian_plotter.validation import validation_stage
+        print("[INFO] 1/4: Fetching tables...")
+        with metrics.stage('read_levels') as rec:
+            Levels_SQL, LevelsSub_SQL = fetch_levels_tables(args.database, args.Z, args.ion, level_set,
+                                                            file_level=args.file_level,
+                                                            file_sublevel=args.file_sublevel)
+            rec['rows_out'] = len(LevelsSub_SQL)
+            rec['levels'] = len(Levels_SQL)
+
+        print("[INFO] 2/4: Building levels list...")
+        with metrics.stage('build_levels', rows_in=len(LevelsSub_SQL)) as rec:
+            frame = build_levels_frame(Levels_SQL, LevelsSub_SQL)
+            levels, pos_map = levels_frame_to_list(frame)
+            rec['rows_out'] = len(levels)
+
+        print("[INFO] 3/4: Fetching and building transitions...")
+        with metrics.stage('read_transitions') as rec:
+            DB_trans_raw = fetch_transitions(args.database, args.Z, args.ion, str(level_set),
+                                            file_linefine=args.file_linefine,
+                                            levs=level_set, chunksize=args.chunksize, values=need_values)
+            if need_values:
+                DB_trans_raw, line_values = DB_trans_raw
+            rec['rows_out'] = len(DB_trans_raw)
+        validation_stage(metrics, args.validate, Levels_SQL, LevelsSub_SQL, DB_trans_raw)
+        with metrics.stage('build_transitions', rows_in=len(DB_trans_raw)) as rec:
+            transitions = build_transitions_list(DB_trans_raw, pos_map, mode='arrays')
+            if need_values:
+                transitions = with_values(transitions, line_values)
+            rec['unresolved'] = int(transitions[2].sum())
+            rec['rows_out'] = len(transitions[2]) - rec['unresolved']
+    n_unresolved = int(transitions[2].sum())
+    metrics.set(n_levels=len(levels), n_transitions=len(transitions[2]), n_unresolved=n_unresolved)
+    if n_unresolved:
+        warnings.warn(f"{n_unresolved} of {len(transitions[2])} transitions not found in pos_map; skipping")
+
+    if windowed:
+        from grotrian_plotter.windows import apply_windows, WindowIndex
+        with metrics.stage('window', rows_in=len(transitions[0])) as rec:
+            if window_index is None:
+                # energies from the frame's ExcitationWaven, as read
+                window_index = WindowIndex.build(frame, transitions)
+            levels, transitions = apply_windows(levels, transitions, window_index, emin=args.emin, emax=args.emax,
+                                                wlmin=args.wlmin, wlmax=args.wlmax)
+            rec['rows_out'] = len(transitions[0])
+            rec['levels'] = len(levels)
+        print(f"[INFO] window: {len(levels)} levels, {len(transitions[0])} transitions")
+
+    if lod:
+        from grotrian_plotter.lod import reduce_transitions
+        with metrics.stage('level_of_detail', rows_in=len(transitions[0])) as rec:
+            transitions, counts = reduce_transitions(transitions, levels, by=args.lod_by, top=args.lod_top,
+                                                     min_value=args.lod_min, merge=args.lod_merge)
+            rec['rows_out'] = len(transitions[0])
+        print(f"[INFO] level of detail: {len(transitions[0])} segments drawn for {int(counts.sum())} "
+              f"of {rec['rows_in']} transitions")
 
     print("[INFO] 4/4: Plotting diagram...")
-    plot_levels_and_transitions(levels, transitions, outpath=args.out, show=args.show, title=f"{args.Z}:{args.ion}")
+    from grotrian_plotter.plotting import plot_levels_and_transitions
+    with metrics.stage('plot', rows_in=len(levels) + len(transitions[0])) as rec:
+        plot_levels_and_transitions(levels, transitions, outpath=args.out, show=args.show,
+                                    renderer=args.renderer, label_layout=args.label_layout)
+        rec['rows_out'] = len(levels) + len(transitions[0])
+
+    if args.profile:
+        print(metrics.format())
+    if args.metrics_json:
+        metrics.write_json(args.metrics_json)
+        print(f"[INFO] metrics written to {args.metrics_json}")
+    if args.profile_stage:
+        if metrics.stage_record(args.profile_stage) is None:
+            warnings.warn(f"--profile-stage {args.profile_stage}: no such stage in this run")
+        else:
+            print(f"[INFO] cProfile of stage {args.profile_stage} written to {metrics.profile_path}")
+    return metrics
 
 
 # %%
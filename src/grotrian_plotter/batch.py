@@ -0,0 +1,182 @@
+# src/grotrian_plotter/batch.py
+"""Batch rendering of many (Z, ion, levs) diagrams from one manifest.
+
+The manifest is a JSON file:
+
+    {"file_level": "data/ModelAtomicIonLevel.dat",
+     "file_sublevel": "data/ModelAtomicIonLevelSublevel.dat",
+     "file_linefine": "data/ModelAtomicIonLineFine.dat",
+     "jobs": [{"Z": 12, "ion": 0, "levs": "1-25", "out": "figures/mgI.png"}, ...]}
+
+Each source table is read once, split by (AtomicNumber, IonCharge) in memory and handed to every
+worker of a process pool once; jobs then only carry their species and level selection.
+"""
+import os
+import json
+import time
+import traceback
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from .data_loader import read_table_from_file, LEVEL_DTYPES, SUBLEVEL_DTYPES, LINEFINE_DTYPES, SPECIES_DTYPES
+from .selection import LevelSet
+from .metrics import PipelineMetrics
+
+# species tables of the current worker process (set once by _init_worker)
+_TABLES = None
+
+
+def read_manifest(path):
+    """Load a batch manifest; relative paths are taken relative to the manifest file."""
+    with open(path) as fh:
+        manifest = json.load(fh)
+    base = os.path.dirname(os.path.abspath(path))
+    for key in ('file_level', 'file_sublevel', 'file_linefine'):
+        if manifest.get(key):
+            manifest[key] = os.path.join(base, manifest[key])
+    for job in manifest.get('jobs', []):
+        if job.get('out'):
+            job['out'] = os.path.join(base, job['out'])
+    return manifest
+
+
+def _split_by_species(df):
+    """{(Z, ion): rows}; a table without species columns applies to every species (key None)."""
+    if not all(c in df.columns for c in SPECIES_DTYPES):
+        return {None: df.reset_index(drop=True)}
+    parts = {}
+    for (Z, ion), rows in df.groupby(list(SPECIES_DTYPES), sort=False):
+        parts[(int(Z), int(ion))] = rows.drop(columns=list(SPECIES_DTYPES)).reset_index(drop=True)
+    return parts
+
+
+def load_species_tables(file_level, file_sublevel, file_linefine, species=None):
+    """Read each table once and split it by (AtomicNumber, IonCharge).
+    With species (a set of (Z, ion)) only those rows are kept while reading.
+    Returns {'level': {...}, 'sublevel': {...}, 'linefine': {...}} keyed by (Z, ion).
+    """
+    row_filter = None
+    if species:
+        wanted = np.array(sorted({int(Z) * 1000 + int(ion) for Z, ion in species}))
+
+        def row_filter(df):
+            if not all(c in df.columns for c in SPECIES_DTYPES):
+                return np.ones(len(df), dtype=bool)
+            return np.isin(df['AtomicNumber'].to_numpy() * 1000 + df['IonCharge'].to_numpy(), wanted)
+
+    tables = {}
+    for name, path, dtypes in (('level', file_level, LEVEL_DTYPES), ('sublevel', file_sublevel, SUBLEVEL_DTYPES),
+                               ('linefine', file_linefine, LINEFINE_DTYPES)):
+        dtype = dict(SPECIES_DTYPES, **dtypes)
+        df = read_table_from_file(path, usecols=list(dtype), dtype=dtype, row_filter=row_filter)
+        tables[name] = _split_by_species(df)
+    return tables
+
+
+def _species_table(tables, name, Z, ion):
+    parts = tables[name]
+    if None in parts:
+        return parts[None]
+    if (Z, ion) not in parts:
+        raise KeyError(f"No rows for Z={Z}, ion={ion} in the {name} table")
+    return parts[(Z, ion)]
+
+
+def _init_worker(tables, renderer='artists'):
+    global _TABLES
+    if renderer != 'svg':
+        import matplotlib
+        matplotlib.use('Agg', force=True)
+    _TABLES = tables
+
+
+def render_job(job, tables=None, trace_memory=False, **plot_kwargs):
+    """Build and render one manifest job. Never raises: failures are reported in the result dict.
+    result['metrics'] holds the per-stage metrics (see metrics.PipelineMetrics).
+    """
+    from .building import build_levels_frame, levels_frame_to_list, resolve_transitions
+    from .plotting import plot_levels_and_transitions
+
+    tables = _TABLES if tables is None else tables
+    metrics = PipelineMetrics(trace_memory=trace_memory)
+    result = {'job': job, 'ok': False, 'error': None, 'timings': {}}
+    t_start = time.perf_counter()
+    try:
+        Z, ion = int(job['Z']), int(job['ion'])
+        levs = LevelSet.parse(str(job.get('levs', '1-25')))
+        t0 = time.perf_counter()
+        with metrics.stage('build_levels') as rec:
+            Levels_SQL = _species_table(tables, 'level', Z, ion)
+            LevelsSub_SQL = _species_table(tables, 'sublevel', Z, ion)
+            Levels_SQL = Levels_SQL[levs.mask(Levels_SQL['LevelNumber'].to_numpy(dtype=float))]
+            LevelsSub_SQL = LevelsSub_SQL[levs.mask(LevelsSub_SQL['LevelNumber'].to_numpy(dtype=float))]
+            rec['rows_in'] = len(LevelsSub_SQL)
+            frame = build_levels_frame(Levels_SQL, LevelsSub_SQL)
+            levels, _ = levels_frame_to_list(frame)
+            rec['rows_out'] = len(levels)
+        lines = _species_table(tables, 'linefine', Z, ion)
+        with metrics.stage('build_transitions', rows_in=len(lines)) as rec:
+            transitions = resolve_transitions(lines, frame)
+            rec['unresolved'] = int(transitions[2].sum())
+            rec['rows_out'] = len(transitions[2]) - rec['unresolved']
+        t1 = time.perf_counter()
+        with metrics.stage('plot', rows_in=len(levels) + len(transitions[2])) as rec:
+            plot_levels_and_transitions(levels, transitions, outpath=job['out'], show=False, **plot_kwargs)
+            rec['rows_out'] = len(levels) + len(transitions[2]) - int(transitions[2].sum())
+        t2 = time.perf_counter()
+        result['timings'] = {'build': t1 - t0, 'render': t2 - t1}
+        result['n_levels'] = len(levels)
+        result['n_transitions'] = int(len(transitions[0]))
+        result['n_unresolved'] = int(transitions[2].sum())
+        metrics.set(n_levels=result['n_levels'], n_transitions=result['n_transitions'],
+                    n_unresolved=result['n_unresolved'])
+        result['ok'] = True
+    except Exception as e:
+        result['error'] = f"{type(e).__name__}: {e}"
+        result['traceback'] = traceback.format_exc()
+    result['timings']['total'] = time.perf_counter() - t_start
+    result['metrics'] = metrics.as_dict()
+    return result
+
+
+def run_batch(manifest, workers=None, progress=print, trace_memory=False, renderer='artists'):
+    """Render every job of a manifest (dict or path) over a process pool of size workers.
+    Returns one result dict per job, in manifest order; failed jobs do not stop the batch.
+    trace_memory adds the peak traced memory of each stage to result['metrics'].
+    renderer is passed to plot_levels_and_transitions ('svg' workers never import matplotlib).
+    """
+    if not isinstance(manifest, dict):
+        manifest = read_manifest(manifest)
+    jobs = manifest.get('jobs', [])
+    t0 = time.perf_counter()
+    species = {(int(j['Z']), int(j['ion'])) for j in jobs if 'Z' in j and 'ion' in j}
+    tables = load_species_tables(manifest['file_level'], manifest['file_sublevel'], manifest['file_linefine'],
+                                 species=species)
+    if progress:
+        progress(f"[BATCH] tables loaded in {time.perf_counter() - t0:.2f}s; {len(jobs)} jobs")
+
+    results = [None] * len(jobs)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(tables, renderer)) as pool:
+        run_job = partial(render_job, trace_memory=trace_memory, renderer=renderer)
+        futures = {pool.submit(run_job, job): k for k, job in enumerate(jobs)}
+        for fut in as_completed(futures):
+            k = futures[fut]
+            try:
+                results[k] = fut.result()
+            except Exception as e:  # e.g. a worker process died
+                results[k] = {'job': jobs[k], 'ok': False, 'error': f"{type(e).__name__}: {e}", 'timings': {}}
+            if progress:
+                progress(format_result(results[k]))
+    return results
+
+
+def format_result(result):
+    job = result['job']
+    head = f"[BATCH] {'ok  ' if result['ok'] else 'FAIL'} Z={job.get('Z')} ion={job.get('ion')} " \
+           f"levs={job.get('levs')} -> {job.get('out')}"
+    if not result['ok']:
+        return f"{head}: {result['error']}"
+    t = result['timings']
+    return f"{head} (build {t['build']:.3f}s, render {t['render']:.3f}s, total {t['total']:.3f}s)"
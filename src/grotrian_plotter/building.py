@@ -2,6 +2,18 @@
 import warnings
 from fractions import Fraction
 
+import numpy as np
+import pandas as pd
+
+ANGULAR_LETTERS = {'S': 0, 'P': 1, 'D': 2, 'F': 3, 'G': 4, 'H': 5, 'I': 6, 'K': 7}
+TRIP_SING_SEP = 8
+SUPERL_SEP = TRIP_SING_SEP + 8
+TERMS_SEP = 0
+
+LEVEL_FIELDS = ['LevelNumber', 'SublevelNumber', 'energy', 'label', 'J2', 'n', 'j', 'mult', 'l', 'xstart', 'tag']
+# the frame also keeps ExcitationWaven as read (cm^-1): energy windows compare against it, not against energy * 1e4
+LEVEL_FRAME_COLUMNS = LEVEL_FIELDS + ['ExcitationWaven']
+
 
 def normalize_fullconfig(fullconfig):
     """Apply the small Mg I specific normalization used originally.
@@ -21,11 +33,211 @@ def normalize_fullconfig(fullconfig):
     return fullconfig
 
 
-def build_levels_list(Levels_SQL, LevelsSub_SQL):
-    """Produce a list of dicts (levels) with consistent fields and a mapping for positions."""
+def build_levels_list(Levels_SQL, LevelsSub_SQL, engine='columnar'):
+    """Produce a list of dicts (levels) with consistent fields and a mapping for positions.
+    engine='columnar' (default) uses build_levels_frame; engine='iterrows' keeps the original row loop.
+    """
+    if engine == 'iterrows':
+        return _build_levels_list_iterrows(Levels_SQL, LevelsSub_SQL)
+    if engine != 'columnar':
+        raise ValueError(f"Unknown engine for build_levels_list: {engine}")
+    return levels_frame_to_list(build_levels_frame(Levels_SQL, LevelsSub_SQL))
+
+
+def levels_frame_to_list(frame):
+    """Convert the output of build_levels_frame to the (levels, pos_map) pair used by plotting."""
+    levels = frame.loc[:, LEVEL_FIELDS].to_dict('records')
+    keys = zip(frame['LevelNumber'].tolist(), frame['SublevelNumber'].tolist())
+    pos_map = dict(zip(keys, range(len(levels))))
+    return levels, pos_map
+
+
+def parse_term(fullconfig, electronconfig=None):
+    """Parse one (FullConfig, ElectronConfig) pair into (n, ang), following the original label rules.
+    Returns None when the level has to fall back to the 'Level-Sublevel' label.
+    """
+    fullconfig = normalize_fullconfig(fullconfig)
+    if not (isinstance(fullconfig, str) and '-' in fullconfig):
+        return None
+    left, right = fullconfig.split('-', 1)
+    if len(right) > 0:
+        if '.' in left:
+            left = left.split('.')[1]
+        n = left[0:-1] if len(left) > 1 else left
+        return n, right[0:2]
+    # superlevel handling: use ElectronConfig (similar to original)
+    try:
+        electronconfig = electronconfig.split(',')[-1].split('.')[1]
+        return electronconfig[0:len(electronconfig)-1], '*'+electronconfig[-1].upper()
+    except Exception:
+        return None
+
+
+def config_tag(fullconfig, electronconfig=None):
+    """Level tag of a (FullConfig, ElectronConfig) pair, without J: n and the term letter ('4s', '3p'),
+    with the occupancy of a doubly occupied outer orbital ('3s2-1S' -> '$3s^2$'). None without a term.
+    """
+    parsed = parse_term(fullconfig, electronconfig)
+    if parsed is None:
+        return None
+    n, ang = parsed
+    letter = ang[-1].lower() if ang else ''
+    # the occupancy is only in the raw configuration (normalize_fullconfig drops it)
+    raw = fullconfig.split('-', 1)[0] if isinstance(fullconfig, str) else ''
+    outer = raw.split('.')[-1]
+    occupancy = outer[len(str(n)) + 1:] if outer[:len(str(n)) + 1].lower() == f"{n}{letter}" else ''
+    if occupancy.isdigit() and int(occupancy) > 1:
+        return f"${n}{letter}^{occupancy}$"
+    return f"{n}{letter}"
+
+
+def _term_attributes(n, ang):
+    """Return (n, mult, l) for a parsed term, with the same fallbacks as the label parser."""
+    try:
+        n = int(n)
+    except Exception:
+        n = None
+    mult = (int(ang[0]) if ang[0].isdigit() else ang[0]) if ang else 1
+    l = ANGULAR_LETTERS.get(ang[1], -1) if len(ang) > 1 else -1
+    return n, mult, l
+
+
+def _xstart(mult, l):
+    """Vectorized column position from multiplicity and angular momentum arrays."""
+    l = np.asarray(l, dtype=np.int64)
+    xstart = l + TERMS_SEP
+    xstart = np.where(mult == 1, TRIP_SING_SEP + l + TERMS_SEP, xstart)
+    xstart = np.where(mult == '*', SUPERL_SEP + l + TERMS_SEP, xstart)
+    return xstart
+
+
+def build_levels_frame(Levels_SQL, LevelsSub_SQL):
+    """Columnar version of build_levels_list.
+    Joins both tables once, parses each distinct (FullConfig, ElectronConfig) pair once and
+    returns a DataFrame with one row per plotted sublevel and the LEVEL_FRAME_COLUMNS columns.
+    """
+    needed = ['LevelNumber', 'SublevelNumber', '2J', 'ExcitationWaven']
+    missing = [c for c in needed if c not in LevelsSub_SQL.columns]
+    if missing:
+        warnings.warn(f"Missing expected columns in LevelsSub_SQL: {missing}; no levels built")
+        return pd.DataFrame({c: pd.Series(dtype=object) for c in LEVEL_FRAME_COLUMNS})
+
+    sub = LevelsSub_SQL.loc[:, needed].reset_index(drop=True)
+    lev_no = sub['LevelNumber'].astype(np.int64).to_numpy()
+    sub_no = sub['SublevelNumber'].astype(np.int64).to_numpy()
+
+    # energy in 1e4 cm^-1 (as original); non-numeric values are dropped, NaN is kept
+    raw_e = sub['ExcitationWaven']
+    waven = pd.to_numeric(raw_e, errors='coerce').to_numpy(dtype=float)
+    E = waven / 1e4
+    keep = np.ones(len(sub), dtype=bool)
+    if raw_e.dtype == object:
+        bad_e = np.isnan(E) & ~raw_e.map(lambda v: isinstance(v, float)).to_numpy()
+        if bad_e.any():
+            warnings.warn(f"Bad ExcitationWaven value in {int(bad_e.sum())} sublevels; skipping")
+            keep &= ~bad_e
+
+    # --- one join against Levels_SQL (a duplicated LevelNumber gets the fallback label, see below) ---
+    config_col = 'FullConfig' if 'FullConfig' in Levels_SQL.columns else 'ElectronConfig'
+    if config_col not in Levels_SQL.columns:
+        warnings.warn("Levels_SQL has neither FullConfig nor ElectronConfig; no levels built")
+        keep[:] = False
+        lv = pd.DataFrame({'LevelNumber': [], config_col: [], 'ElectronConfig': []})
+    else:
+        lv = Levels_SQL.drop_duplicates('LevelNumber').reset_index(drop=True)
+    lv_index = pd.Index(pd.to_numeric(lv['LevelNumber'], errors='coerce'))
+    row_of = lv_index.get_indexer(lev_no)
+    not_found = (row_of < 0) & keep
+    if not_found.any():
+        warnings.warn(f"{int(not_found.sum())} sublevels refer to LevelNumber not found in Levels_SQL; skipping")
+        keep &= ~not_found
+
+    # --- parse each distinct config pair once ---
+    fullconfigs = lv[config_col].to_numpy(dtype=object)
+    if 'ElectronConfig' in lv.columns:
+        electronconfigs = lv['ElectronConfig'].to_numpy(dtype=object)
+    else:
+        electronconfigs = np.full(len(lv), None, dtype=object)
+    pair_codes, pairs = pd.MultiIndex.from_arrays(
+        [pd.Series(fullconfigs, dtype=object), pd.Series(electronconfigs, dtype=object)]).factorize()
+    n_pairs = len(pairs)
+    has_term = np.zeros(n_pairs + 1, dtype=bool)
+    heads = np.full(n_pairs + 1, None, dtype=object)
+    ns = np.full(n_pairs + 1, None, dtype=object)
+    mults = np.full(n_pairs + 1, None, dtype=object)
+    ls = np.full(n_pairs + 1, -1, dtype=np.int64)
+    tags = np.full(n_pairs + 1, None, dtype=object)
+    for k, (fullconfig, electronconfig) in enumerate(pairs):
+        parsed = parse_term(fullconfig, electronconfig)
+        if parsed is None:
+            continue
+        n, ang = parsed
+        has_term[k] = True
+        heads[k] = f"{n}^{ang}"
+        ns[k], mults[k], ls[k] = _term_attributes(n, ang)
+        tags[k] = config_tag(fullconfig, electronconfig)
+
+    # pair code per sublevel row (the last slot is a sentinel for unmatched rows)
+    row_codes = np.full(len(sub), n_pairs, dtype=np.int64)
+    row_codes[row_of >= 0] = pair_codes[row_of[row_of >= 0]]
+    # the original lookup of a LevelNumber with several Levels_SQL rows got a Series, not a config
+    # string, and fell back to the 'Level-Sublevel' label: same here
+    if config_col in Levels_SQL.columns:
+        all_levels = pd.to_numeric(Levels_SQL['LevelNumber'], errors='coerce')
+        row_codes[np.isin(lev_no, all_levels[all_levels.duplicated()].to_numpy())] = n_pairs
+
+    idx = np.flatnonzero(keep)
+    lev_no, sub_no, E, waven, row_codes = lev_no[idx], sub_no[idx], E[idx], waven[idx], row_codes[idx]
+    J2 = sub['2J'].to_numpy()[idx]
+
+    # J as Fraction, once per distinct 2J value
+    j_codes, j_values = pd.factorize(pd.Series(J2, dtype=object))
+    j_fracs = np.empty(len(j_values), dtype=object)
+    j_fracs[:] = [Fraction(int(v), 2) for v in j_values]
+    j_strs = np.array([str(v) for v in j_fracs] + [''], dtype=object)
+    j = j_fracs[j_codes]
+    jstr = j_strs[j_codes]
+
+    with_term = has_term[row_codes]
+    n = ns[row_codes]
+    mult = mults[row_codes]
+    l = ls[row_codes]
+    label = np.empty(len(idx), dtype=object)
+    label[with_term] = heads[row_codes[with_term]] + '_' + jstr[with_term]
+
+    # fallback label 'Level-Sublevel_J'; the original label parser read mult from its first character
+    fb = ~with_term
+    if fb.any():
+        fb_lev = pd.Series(lev_no[fb]).astype(str)
+        fb_sub = pd.Series(sub_no[fb]).astype(str)
+        label[fb] = (fb_lev + '-' + fb_sub + '_' + pd.Series(jstr[fb], dtype=object)).to_numpy(dtype=object)
+        mult[fb] = [int(c) if c.isdigit() else c for c in fb_lev.str[0]]
+
+    xstart = _xstart(mult, l)
+
+    return pd.DataFrame({
+        'LevelNumber': lev_no,
+        'SublevelNumber': sub_no,
+        'energy': E,
+        'label': label,
+        'J2': J2,
+        'n': n,
+        'j': j,
+        'mult': mult,
+        'l': l,
+        'xstart': xstart,
+        'tag': pd.Series(tags[row_codes], dtype=object),
+        'ExcitationWaven': waven,
+    })
+
+
+def _build_levels_list_iterrows(Levels_SQL, LevelsSub_SQL):
+    """Original row-by-row implementation of build_levels_list (kept as reference)."""
     # Index Levels_SQL by LevelNumber for faster lookup
     levels_sql_indexed = Levels_SQL.set_index('LevelNumber')
     levels = []
+    # skipped rows per reason, reported once at the end (validation.check_tables has the details)
+    skipped = {'missing_columns': 0, 'bad_energy': 0, 'missing_level': 0}
 
     # --- ITERATE USING iterrows() to access columns by name safely ---
     for idx, row in LevelsSub_SQL.iterrows():
@@ -34,16 +246,16 @@ def build_levels_list(Levels_SQL, LevelsSub_SQL):
             SublevelNumber = int(row['SublevelNumber'])
             J2 = row['2J']                      # now safe: dictionary-like access
             E_waven = row['ExcitationWaven']
-        except KeyError as e:
-            # If a column name is different, warn and continue
-            warnings.warn(f"Missing expected column in LevelsSub_SQL: {e}; row index {idx}")
+        except KeyError:
+            # If a column name is different, count and continue
+            skipped['missing_columns'] += 1
             continue
 
         # energy in 1e4 cm^-1 (as original)
         try:
             E = float(E_waven) / 1e4
         except Exception:
-            warnings.warn(f"Bad ExcitationWaven value for Level {LevelNumber}, Sublevel {SublevelNumber}: {E_waven}")
+            skipped['bad_energy'] += 1
             continue
 
         # attempt to get FullConfig; handle missing gracefully
@@ -54,10 +266,12 @@ def build_levels_list(Levels_SQL, LevelsSub_SQL):
             try:
                 fullconfig = levels_sql_indexed.loc[LevelNumber, 'ElectronConfig']
             except Exception:
-                warnings.warn(f"LevelNumber {LevelNumber} not found in Levels_SQL; skipping")
+                skipped['missing_level'] += 1
                 continue
 
+        raw_config = fullconfig
         fullconfig = normalize_fullconfig(fullconfig)
+        tag = None
 
         # parsing logic (keeps original behavior)
         J_frac = Fraction(int(J2), 2)
@@ -71,10 +285,12 @@ def build_levels_list(Levels_SQL, LevelsSub_SQL):
                 n = left[0:-1] if len(left) > 1 else left
                 ang = right[0:2]
                 label = f"{str(n)}^{ang}_{str(J_frac)}"
+                tag = config_tag(raw_config)
             else:
                 # superlevel handling: use ElectronConfig (similar to original)
                 try:
                     electronconfig = levels_sql_indexed.loc[LevelNumber, 'ElectronConfig']
+                    tag = config_tag(raw_config, electronconfig)
                     electronconfig = electronconfig.split(',')[-1].split('.')[1]
                     ang = '*'+electronconfig[-1].upper()
                     n = electronconfig[0:len(electronconfig)-1]
@@ -89,9 +305,13 @@ def build_levels_list(Levels_SQL, LevelsSub_SQL):
             'SublevelNumber': SublevelNumber,
             'energy': E,
             'label': label,
-            'J2': J2
+            'J2': J2,
+            'tag': tag,
         })
 
+    if any(skipped.values()):
+        warnings.warn("Skipped sublevels: " + ', '.join(f"{n} {why}" for why, n in skipped.items() if n))
+
     # Rest of function: same as before (derived columns, xstart, pos_map)
     angularletters = {'S': 0, 'P': 1, 'D': 2, 'F': 3, 'G': 4, 'H': 5, 'I': 6, 'K': 7}
     trip_sing_sep = 8
@@ -150,19 +370,90 @@ def build_levels_list(Levels_SQL, LevelsSub_SQL):
 
 
 
-def build_transitions_list(DB_transitions, pos_map):
+def build_transitions_list(DB_transitions, pos_map, mode='dicts'):
     """From DB_transitions rows produce transitions list mapping to indices in levels list using pos_map.
     DB_transitions rows are [low, sublow, up, subup]
+    mode='arrays' returns the (i, f, unresolved) triple of resolve_transitions instead of a list of dicts.
     """
+    if mode == 'arrays':
+        return resolve_transitions(DB_transitions, pos_map)
+    if mode != 'dicts':
+        raise ValueError(f"Unknown mode for build_transitions_list: {mode}")
     transitions = []
+    skipped = 0
     for (low, sublow, up, subup) in DB_transitions:
         key_low = (int(low), int(sublow))
         key_up = (int(up), int(subup))
         if key_low in pos_map and key_up in pos_map:
             transitions.append({'i': pos_map[key_low], 'f': pos_map[key_up]})
         else:
-            # If not found, try fallback: some DB entries may have missing sublevels or index mismatch
-            # We simply warn and skip
-            warnings.warn(f"Transition {key_low} -> {key_up} not found in pos_map; skipping")
+            # some DB entries may have missing sublevels or index mismatch: counted and skipped
+            skipped += 1
+    if skipped:
+        warnings.warn(f"{skipped} transitions not found in pos_map; skipping")
     return transitions
 
+
+TRANSITION_COLUMNS = ['LowerLevel', 'LowerSublevel', 'UpperLevel', 'UpperSublevel']
+
+
+def _level_keys(level, sublevel):
+    """Pack (LevelNumber, SublevelNumber) pairs into one int64 key per pair."""
+    return (np.asarray(level, dtype=np.int64) << 32) | np.asarray(sublevel, dtype=np.int64)
+
+
+def transitions_array(DB_transitions):
+    """Return DB_transitions (list of rows, 2D array or DataFrame) as an (n, 4) array.
+    Integer input is kept as is (no copy for the int32 arrays of the streaming reader); anything else
+    becomes float so missing values show up as NaN.
+    """
+    if isinstance(DB_transitions, pd.DataFrame):
+        DB_transitions = DB_transitions.loc[:, TRANSITION_COLUMNS].to_numpy()
+    arr = np.asarray(DB_transitions)
+    if arr.dtype.kind not in 'iu':
+        arr = arr.astype(float)
+    return arr.reshape(-1, 4)
+
+
+def resolve_transitions(DB_transitions, pos_map):
+    """Vectorized version of build_transitions_list.
+    Maps (LowerLevel, LowerSublevel) / (UpperLevel, UpperSublevel) to level positions with a sorted-key
+    search. pos_map is the dict returned by build_levels_list or the frame from build_levels_frame
+    (positions are its row order). Returns int32 arrays i, f for the resolved rows and a boolean mask
+    of the unresolved input rows.
+    """
+    if isinstance(pos_map, pd.DataFrame):
+        pos_keys = _level_keys(pos_map['LevelNumber'].to_numpy(), pos_map['SublevelNumber'].to_numpy())
+        pos_vals = np.arange(len(pos_keys), dtype=np.int32)
+    else:
+        n_pos = len(pos_map)
+        pos_keys = np.fromiter((k[0] for k in pos_map), dtype=np.int64, count=n_pos) << 32
+        pos_keys |= np.fromiter((k[1] for k in pos_map), dtype=np.int64, count=n_pos)
+        pos_vals = np.fromiter(pos_map.values(), dtype=np.int32, count=n_pos)
+    order = np.argsort(pos_keys, kind='stable')
+    pos_keys, pos_vals = pos_keys[order], pos_vals[order]
+    if len(pos_keys):
+        # duplicated keys: the last position wins, as in a dict built row by row
+        last = np.append(pos_keys[1:] != pos_keys[:-1], True)
+        pos_keys, pos_vals = pos_keys[last], pos_vals[last]
+
+    rows = transitions_array(DB_transitions)
+    if rows.dtype.kind in 'iu':
+        valid = np.ones(len(rows), dtype=bool)
+    else:
+        valid = np.isfinite(rows).all(axis=1)
+        rows = np.where(valid[:, None], rows, 0).astype(np.int64)
+
+    def lookup(level, sublevel):
+        keys = _level_keys(level, sublevel)
+        at = np.searchsorted(pos_keys, keys)
+        at = np.minimum(at, max(len(pos_keys) - 1, 0))
+        found = (pos_keys[at] == keys) if len(pos_keys) else np.zeros(len(keys), dtype=bool)
+        return at, found
+
+    at_i, found_i = lookup(rows[:, 0], rows[:, 1])
+    at_f, found_f = lookup(rows[:, 2], rows[:, 3])
+    resolved = valid & found_i & found_f
+    i = pos_vals[at_i[resolved]] if len(pos_vals) else np.empty(0, dtype=np.int32)
+    f = pos_vals[at_f[resolved]] if len(pos_vals) else np.empty(0, dtype=np.int32)
+    return i, f, ~resolved
@@ -0,0 +1,320 @@
+# src/grotrian_plotter/cache.py
+"""On-disk cache of parsed tables and built atomic models.
+
+Each entry is a directory of .npy files (one per column, strings stored as fixed-width unicode)
+that np.load can memory-map, plus a meta.json. Entries are keyed by the identity of the source
+files (path, size, mtime or content hash), the selected levels and Z/ion, and the cache is kept
+under max_bytes by evicting the least recently used entries.
+"""
+import os
+import json
+import time
+import shutil
+import hashlib
+import tempfile
+import warnings
+from fractions import Fraction
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from .metrics import stage
+from .selection import LevelSet
+
+CACHE_VERSION = 5
+DEFAULT_CACHE_DIR = os.environ.get('GROTRIAN_CACHE_DIR',
+                                   os.path.join(os.path.expanduser('~'), '.cache', 'grotrian_plotter'))
+DEFAULT_MAX_BYTES = 512 * 1024 ** 2
+
+
+class AtomicModel(namedtuple('AtomicModel', 'levels sublevels frame transitions window_index')):
+    """What load_atomic_model returns: the Levels_SQL and LevelsSub_SQL tables, the levels frame, the
+    transitions ((i, f, unresolved), plus values when read with values=True) and the windows.WindowIndex
+    (None unless index=True).
+    """
+    __slots__ = ()
+
+
+def file_identity(path, content_hash=False):
+    """Identity of a source file: absolute path, size and mtime (or a sha256 of the content)."""
+    st = os.stat(path)
+    ident = {'path': os.path.abspath(path), 'size': st.st_size}
+    if content_hash:
+        h = hashlib.sha256()
+        with open(path, 'rb') as fh:
+            for block in iter(lambda: fh.read(1 << 20), b''):
+                h.update(block)
+        ident['sha256'] = h.hexdigest()
+    else:
+        ident['mtime_ns'] = st.st_mtime_ns
+    return ident
+
+
+def cache_key(files, atom, ion, levs, content_hash=False, **extra):
+    """Hex key covering the source files, the selected levels and the Z/ion."""
+    payload = {
+        'version': CACHE_VERSION,
+        'files': [file_identity(f, content_hash) if f else None for f in files],
+        'atom': atom, 'ion': ion,
+        'levs': str(LevelSet.parse(levs)),
+        'extra': extra,
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+
+# -----------------------------------------------------------------------------
+# Column encoding (DataFrame <-> dict of mmap-able arrays)
+# -----------------------------------------------------------------------------
+def _encode_column(values):
+    arr = np.asarray(values)
+    if arr.dtype == object:
+        # None/NaN become '' (the readers never produce empty strings)
+        arr = np.array(['' if (v is None or (isinstance(v, float) and v != v)) else str(v) for v in arr],
+                       dtype=str)
+    return arr
+
+
+def frame_to_arrays(df, prefix):
+    """Flatten a DataFrame into {prefix/column: array}, with a column order entry."""
+    arrays = {f"{prefix}/{i}": _encode_column(df[col].to_numpy()) for i, col in enumerate(df.columns)}
+    return arrays, {prefix: list(df.columns)}
+
+
+def arrays_to_frame(arrays, prefix, columns):
+    data = {}
+    for i, col in enumerate(columns):
+        arr = arrays[f"{prefix}/{i}"]
+        if arr.dtype.kind == 'U':
+            arr = pd.Series(arr, dtype=object).replace('', None)
+        data[col] = arr
+    return pd.DataFrame(data)
+
+
+def levels_frame_to_arrays(frame):
+    """Encode a build_levels_frame output (n, j and mult are Python objects there)."""
+    out = frame.drop(columns=['n', 'j', 'mult']).copy()
+    out['n'] = np.array([-1 if v is None else v for v in frame['n']], dtype=np.int64)
+    out['mult'] = np.array([str(v) for v in frame['mult']], dtype=str)
+    return frame_to_arrays(out, 'levels')
+
+
+def levels_frame_from_arrays(arrays, columns):
+    from .building import LEVEL_FRAME_COLUMNS
+    out = arrays_to_frame(arrays, 'levels', columns)
+    n = np.asarray(out['n'])
+    out['n'] = np.where(n < 0, None, n.astype(object))
+    j_codes, j_values = pd.factorize(out['J2'])
+    j_fracs = np.empty(len(j_values), dtype=object)
+    j_fracs[:] = [Fraction(int(v), 2) for v in j_values]
+    out['j'] = j_fracs[j_codes]
+    m_codes, m_values = pd.factorize(out['mult'])
+    mults = np.empty(len(m_values), dtype=object)
+    mults[:] = [int(v) if v.isdigit() else v for v in m_values]
+    out['mult'] = mults[m_codes]
+    out['label'] = out['label'].fillna('')
+    return out.loc[:, LEVEL_FRAME_COLUMNS]
+
+
+# -----------------------------------------------------------------------------
+# Cache directory
+# -----------------------------------------------------------------------------
+class TableCache:
+    """Size-bounded, least-recently-used directory cache of named numpy arrays."""
+
+    def __init__(self, cache_dir=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir or DEFAULT_CACHE_DIR
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _entry(self, key):
+        return os.path.join(self.cache_dir, key)
+
+    def _discard(self, entry, tag):
+        """Move entry aside (an atomic rename, so readers never see it half-removed) and delete it."""
+        aside = tempfile.mkdtemp(prefix=f'.{tag}-', dir=self.cache_dir)
+        try:
+            os.replace(entry, os.path.join(aside, 'entry'))
+        except OSError:
+            # already gone (another process discarded or replaced it)
+            pass
+        shutil.rmtree(aside, ignore_errors=True)
+
+    def load(self, key, mmap=True):
+        """Return (arrays, meta) for key, or None on a miss. Arrays are memory-mapped when mmap is True.
+        An entry that exists but cannot be read (truncated or corrupt files) is removed, so the next
+        store rebuilds it.
+        """
+        entry = self._entry(key)
+        meta_path = os.path.join(entry, 'meta.json')
+        try:
+            with open(meta_path) as fh:
+                meta = json.load(fh)
+            arrays = {name: np.load(os.path.join(entry, fname), mmap_mode='r' if mmap else None,
+                                    allow_pickle=False)
+                      for name, fname in meta['arrays'].items()}
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            self.misses += 1
+            if os.path.isdir(entry):
+                warnings.warn(f"Discarding unreadable cache entry {entry}")
+                self._discard(entry, 'bad')
+            return None
+        self.hits += 1
+        # mark as recently used for eviction (a read-only or concurrently pruned cache still hits)
+        now = time.time()
+        try:
+            os.utime(meta_path, (now, now))
+        except OSError:
+            pass
+        return arrays, meta
+
+    def store(self, key, arrays, meta=None):
+        """Write the arrays atomically under key, replacing any entry already there, then evict old
+        entries above max_bytes.
+        """
+        meta = dict(meta or {})
+        meta['arrays'] = {}
+        tmp = tempfile.mkdtemp(prefix='.tmp-', dir=self.cache_dir)
+        try:
+            for i, (name, arr) in enumerate(arrays.items()):
+                fname = f"{i}.npy"
+                np.save(os.path.join(tmp, fname), np.ascontiguousarray(arr), allow_pickle=False)
+                meta['arrays'][name] = fname
+            with open(os.path.join(tmp, 'meta.json'), 'w') as fh:
+                json.dump(meta, fh)
+            entry = self._entry(key)
+            try:
+                os.replace(tmp, entry)
+            except OSError:
+                # an entry is already there (stale, corrupt or just stored by another process): move it
+                # aside and put the new one in its place
+                self._discard(entry, 'old')
+                try:
+                    os.replace(tmp, entry)
+                except OSError:
+                    # another process stored it again in between; its entry is as good as ours
+                    shutil.rmtree(tmp, ignore_errors=True)
+        except Exception:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+        self.evict()
+
+    def entries(self):
+        """List (key, size in bytes, last use time) for every complete entry."""
+        out = []
+        for key in os.listdir(self.cache_dir):
+            entry = self._entry(key)
+            meta_path = os.path.join(entry, 'meta.json')
+            if key.startswith('.') or not os.path.exists(meta_path):
+                continue
+            size = sum(os.path.getsize(os.path.join(entry, f)) for f in os.listdir(entry))
+            out.append((key, size, os.path.getmtime(meta_path)))
+        return out
+
+    def evict(self):
+        """Remove least recently used entries until the cache fits in max_bytes."""
+        entries = sorted(self.entries(), key=lambda e: e[2])
+        total = sum(e[1] for e in entries)
+        for key, size, _ in entries:
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(self._entry(key), ignore_errors=True)
+            total -= size
+
+    def clear(self):
+        for key, _, _ in self.entries():
+            shutil.rmtree(self._entry(key), ignore_errors=True)
+
+
+# -----------------------------------------------------------------------------
+# Cached atomic model
+# -----------------------------------------------------------------------------
+def load_atomic_model(atom, ion, levs, file_level, file_sublevel, file_linefine, cache=None, chunksize=None,
+                      metrics=None, values=False, validate=None, index=False):
+    """Return the AtomicModel (levels, sublevels, frame, transitions, window_index) of local files.
+    transitions is the (i, f, unresolved) triple of resolve_transitions. With a TableCache, a hit
+    skips parsing and building entirely; a miss builds the model and stores it. chunksize streams
+    the LineFine file (see data_loader.iter_transitions). Stages are recorded in metrics
+    (a metrics.PipelineMetrics) when given. values also reads Wavelength/gf/A and returns the
+    (i, f, unresolved, values) transitions of lod.with_values. validate ('lenient' or 'strict') runs
+    validation.check_tables on the tables read by a miss, before the transitions are resolved or stored;
+    the issue counts are stored with the model, so a hit warns (or raises) as the miss did.
+    The windows.WindowIndex of the model (energy order, and wavelength order with values) is stored
+    with it; index returns it as window_index, so window queries on a hit sort nothing.
+    """
+    from .data_loader import fetch_levels_tables, fetch_transitions
+    from .building import build_levels_frame, resolve_transitions
+    from .lod import with_values
+    from .validation import validation_stage, enforce, ValidationReport
+    from .windows import WindowIndex
+
+    levs = LevelSet.parse(levs)
+    key = None
+    if cache is not None:
+        key = cache_key([file_level, file_sublevel, file_linefine], atom, ion, levs, stream=bool(chunksize),
+                        values=bool(values), validate=validate)
+        with stage(metrics, 'cache_load') as rec:
+            hit = cache.load(key)
+            if hit is not None:
+                arrays, meta = hit
+                cols = meta['columns']
+                frame = levels_frame_from_arrays(arrays, cols['levels'])
+                transitions = (arrays['transitions/i'], arrays['transitions/f'], arrays['transitions/unresolved']) \
+                    + ((arrays['transitions/values'],) if values else ())
+                model = AtomicModel(arrays_to_frame(arrays, 'Levels_SQL', cols['Levels_SQL']),
+                                    arrays_to_frame(arrays, 'LevelsSub_SQL', cols['LevelsSub_SQL']), frame,
+                                    transitions, WindowIndex.from_arrays(arrays, frame, transitions) if index else None)
+                rec['rows_out'] = len(frame)
+            rec['hit'] = hit is not None
+        if hit is not None:
+            if validate is not None and 'validation' in meta:
+                enforce(ValidationReport.from_counts(meta['validation']), validate)
+            return model
+
+    with stage(metrics, 'read_levels') as rec:
+        Levels_SQL, LevelsSub_SQL = fetch_levels_tables(None, atom, ion, levs,
+                                                        file_level=file_level, file_sublevel=file_sublevel)
+        rec['rows_out'] = len(LevelsSub_SQL)
+        rec['levels'] = len(Levels_SQL)
+    with stage(metrics, 'build_levels', rows_in=len(LevelsSub_SQL)) as rec:
+        frame = build_levels_frame(Levels_SQL, LevelsSub_SQL)
+        rec['rows_out'] = len(frame)
+    with stage(metrics, 'read_transitions') as rec:
+        DB_trans_raw = fetch_transitions(None, atom, ion, str(levs), file_linefine=file_linefine,
+                                         levs=levs, chunksize=chunksize, values=values)
+        if values:
+            DB_trans_raw, line_values = DB_trans_raw
+        rec['rows_out'] = len(DB_trans_raw)
+    report = validation_stage(metrics, validate, Levels_SQL, LevelsSub_SQL, DB_trans_raw)
+    with stage(metrics, 'build_transitions', rows_in=len(DB_trans_raw)) as rec:
+        transitions = resolve_transitions(DB_trans_raw, frame)
+        if values:
+            transitions = with_values(transitions, line_values)
+        rec['unresolved'] = int(transitions[2].sum())
+        rec['rows_out'] = len(transitions[2]) - rec['unresolved']
+
+    window_index = None
+    if cache is not None:
+        with stage(metrics, 'cache_store'):
+            window_index = WindowIndex.build(frame, transitions)
+            arrays, columns = window_index.to_arrays(), {}
+            for name, df in (('Levels_SQL', Levels_SQL), ('LevelsSub_SQL', LevelsSub_SQL)):
+                a, c = frame_to_arrays(df, name)
+                arrays.update(a)
+                columns.update(c)
+            a, c = levels_frame_to_arrays(frame)
+            arrays.update(a)
+            columns.update(c)
+            arrays.update({'transitions/i': transitions[0], 'transitions/f': transitions[1],
+                           'transitions/unresolved': transitions[2]})
+            if values:
+                arrays['transitions/values'] = transitions[3]
+            meta = {'columns': columns, 'atom': atom, 'ion': ion}
+            if report is not None:
+                meta['validation'] = report.counts()
+            cache.store(key, arrays, meta)
+    if index and window_index is None:
+        window_index = WindowIndex.build(frame, transitions)
+    return AtomicModel(Levels_SQL, LevelsSub_SQL, frame, transitions, window_index if index else None)
@@ -1,35 +1,203 @@
 # src/grotrian_plotter/data_loader.py
 import pandas as pd
+import numpy as np
 import os
+import atexit
+import warnings
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
-def SQL_table(table, where='', columns='*', server='Local', database='AtmosphericModels4suoGPK'):
-    ''' columns must be separated by commas as in a SQL query '''
-    import pyodbc, sqlalchemy
-    pyodbc.lowercase = False
+from .selection import LevelSet
+
+DEFAULT_DATABASE = 'AtmosphericModels4suoGPK'
+
+# Module-level engines (one connection pool per database URL), reused across calls and batch runs
+_ENGINES = {}
+_ENGINES_LOCK = threading.Lock()
+
+# SQL Server accepts at most 2100 parameters per statement; longer IN lists are split in batches
+MAX_BIND_PARAMS = 2000
+
+
+def sql_url(server='Local', database=DEFAULT_DATABASE):
+    """SQLAlchemy URL for a database. A database given as a URL (e.g. 'sqlite:///standin.db') is used as is;
+    otherwise the SSRPM SQL Server is reached through pyodbc.
+    """
+    if '://' in database:
+        return database
     if server == 'Local':
         server = os.environ['COMPUTERNAME'] # Get your local server automatically
-    else:
-        server = server
-    print(f"Getting data from {table} in {server}")
-    
-    conn = 'mssql+pyodbc:///?odbc_connect={}'.format('DRIVER={SQL Server};'
+    return 'mssql+pyodbc:///?odbc_connect={}'.format('DRIVER={SQL Server};'
                                   'SERVER='+server+';'
                                   'DATABASE='+database+';'
                                   'uid=sa;pwd=1234Plantilla')
-    
-    engine = sqlalchemy.create_engine(conn)
-    connection = engine.connect()
-    
-    table = f"SELECT {columns} FROM "+'['+database+']'+'.dbo.'+'['+table+'] '   
-    query = table+where
-#    print("\nQUERY:",query)
-    # return pd.read_sql(query, connection) # TO FIND THE ERROR
+
+
+def get_engine(server='Local', database=DEFAULT_DATABASE):
+    """Return the pooled engine for (server, database), creating it on first use."""
+    import sqlalchemy
+    url = sql_url(server, database)
+    with _ENGINES_LOCK:
+        engine = _ENGINES.get(url)
+        if engine is None:
+            if url.startswith('mssql+pyodbc'):
+                import pyodbc
+                pyodbc.lowercase = False
+            # pre-ping recycles connections dropped by the server between batch runs
+            engine = sqlalchemy.create_engine(url, pool_pre_ping=not url.startswith('sqlite'))
+            _ENGINES[url] = engine
+    return engine
+
+
+@atexit.register
+def dispose_engines():
+    """Close every pooled connection (called at exit; safe to call any time)."""
+    with _ENGINES_LOCK:
+        for engine in _ENGINES.values():
+            engine.dispose()
+        _ENGINES.clear()
+
+
+def _sql_table_ref(engine, table, database, columns=()):
+    import sqlalchemy
+    schema = f"{database}.dbo" if engine.dialect.name == 'mssql' else None
+    return sqlalchemy.table(table, *[sqlalchemy.column(c) for c in columns], schema=schema)
+
+
+def SQL_table(table, where='', columns='*', server='Local', database=DEFAULT_DATABASE):
+    ''' columns must be separated by commas as in a SQL query '''
+    import sqlalchemy
+    engine = get_engine(server, database)
+    print(f"Getting data from {table} in {engine.url.host or engine.url.database or server}")
+    if engine.dialect.name == 'mssql':
+        table_ref = '['+database+']'+'.dbo.'+'['+table+'] '
+    else:
+        table_ref = f'"{table}" '
+    query = f"SELECT {columns} FROM " + table_ref + where
     try:
-        return pd.read_sql(query, connection)
-    except:
-        print('DATA from {} -> {} -> {}: NOT received'.format(server,database,table))
-    # connection.close() # Closes automatically
-    
+        with engine.connect() as connection:
+            return pd.read_sql(sqlalchemy.text(query), connection)
+    except Exception:
+        print('DATA from {} -> {} -> {}: NOT received'.format(server, database, table))
+        raise
+
+
+def _level_predicate(column, levels):
+    """column BETWEEN lo AND hi OR ... (single levels as one IN list) for a LevelSet. Returns
+    (predicate, exact); above MAX_BIND_PARAMS parameters the predicate is the covering range only,
+    exact is False and the rows have to be filtered with levels.mask.
+    """
+    import sqlalchemy
+    if not levels:
+        return sqlalchemy.false(), True
+    singles = [a for a, b in levels.intervals if a == b]
+    ranges = [(a, b) for a, b in levels.intervals if a < b]
+    if len(singles) + 2 * len(ranges) > MAX_BIND_PARAMS:
+        return column.between(int(levels.starts[0]), int(levels.ends[-1])), False
+    terms = [column.between(a, b) for a, b in ranges]
+    if singles:
+        terms.append(column.in_(singles))
+    return sqlalchemy.or_(*terms), True
+
+
+def SQL_select(table, columns, server='Local', database=DEFAULT_DATABASE, in_column=None, in_values=None,
+               levels=None, level_columns=(), **equals):
+    """SELECT columns FROM table WHERE col=:value AND ... [AND in_column IN (:values)], all bound parameters.
+    equals maps column names to values (None values are ignored). in_values longer than MAX_BIND_PARAMS
+    are fetched in batches over the same pooled connection. levels (a LevelSet, or anything
+    LevelSet.parse accepts) restricts every column of level_columns to the selection with range predicates.
+    """
+    import sqlalchemy
+    engine = get_engine(server, database)
+    wanted = list(columns) + [c for c in list(equals) + [in_column] + list(level_columns) if c and c not in columns]
+    t = _sql_table_ref(engine, table, database, wanted)
+    stmt = sqlalchemy.select(*[t.c[c] for c in columns])
+    for col, value in equals.items():
+        if value is not None:
+            stmt = stmt.where(t.c[col] == value)
+    inexact = []
+    if level_columns:
+        levels = LevelSet.parse(levels)
+        for col in level_columns:
+            predicate, exact = _level_predicate(t.c[col], levels)
+            stmt = stmt.where(predicate)
+            if not exact:
+                inexact.append(col)
+    if in_column is None:
+        batches = [None]
+    else:
+        values = [int(v) for v in in_values]
+        stmt = stmt.where(t.c[in_column].in_(sqlalchemy.bindparam('in_values', expanding=True)))
+        batches = [values[k:k + MAX_BIND_PARAMS] for k in range(0, len(values), MAX_BIND_PARAMS)] or [[]]
+    print(f"Getting data from {table} in {engine.url.host or engine.url.database or server}")
+    with engine.connect() as connection:
+        frames = [pd.read_sql(stmt, connection, params=None if b is None else {'in_values': b})
+                  for b in batches]
+    df = frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=True)
+    if inexact:
+        keep = np.logical_and.reduce([levels.mask(df[col].to_numpy(dtype=float)) for col in inexact])
+        df = df[keep].reset_index(drop=True)
+    return df
+
+
+_EXECUTOR = None
+
+
+def _sql_executor():
+    global _EXECUTOR
+    with _ENGINES_LOCK:
+        if _EXECUTOR is None:
+            _EXECUTOR = ThreadPoolExecutor(max_workers=3, thread_name_prefix='grotrian-sql')
+    return _EXECUTOR
+
+
+def fetch_sql_tables(database, atom, ion, levs, server='Local', values=False):
+    """Fetch the Level, Sublevel and LineFine tables concurrently over the pooled engine.
+    Returns (Levels_SQL, LevelsSub_SQL, DB_transitions rows), as fetch_levels_tables/fetch_transitions
+    (with values, the third item is the (rows, values) pair of fetch_transitions).
+    """
+    pool = _sql_executor()
+    levs = LevelSet.parse(levs)
+    lev = pool.submit(SQL_select, 'ModelAtomicIonLevel', LEVEL_COLUMNS, server, database, levels=levs,
+                      level_columns=('LevelNumber',), AtomicNumber=atom, IonCharge=ion)
+    sub = pool.submit(SQL_select, 'ModelAtomicIonLevelSublevel', SUBLEVEL_COLUMNS, server, database, levels=levs,
+                      level_columns=('LevelNumber',), AtomicNumber=atom, IonCharge=ion)
+    columns = LINEFINE_COLUMNS + (LINE_VALUE_COLUMNS if values else [])
+    lines = pool.submit(SQL_select, 'ModelAtomicIonLineFine', columns, server, database, levels=levs,
+                        level_columns=LINE_LEVEL_COLUMNS, AtomicNumber=atom, IonCharge=ion)
+    return lev.result(), sub.result(), _rows_and_values(lines.result(), values)
+
+
+def _rows_and_values(df, values=False):
+    """LineFine rows as a list of [low, sublow, up, subup]; with values also the (n, 3) float64 array of
+    LINE_VALUE_COLUMNS, row-aligned (NULL values are NaN).
+    """
+    rows = df.loc[:, LINEFINE_COLUMNS].values.tolist()
+    if not values:
+        return rows
+    return rows, df.loc[:, LINE_VALUE_COLUMNS].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=float)
+
+
+def build_sqlite_database(path, file_level, file_sublevel, file_linefine):
+    """Write a SQLite stand-in of the SSRPM database from the three tables (all columns, e.g. data/*.dat).
+    Use it with database='sqlite:///<path>' to run and benchmark the SQL path locally.
+    """
+    import sqlalchemy
+    engine = sqlalchemy.create_engine(f"sqlite:///{path}")
+    try:
+        for table, file in (('ModelAtomicIonLevel', file_level), ('ModelAtomicIonLevelSublevel', file_sublevel),
+                            ('ModelAtomicIonLineFine', file_linefine)):
+            df = pd.read_csv(file, sep=r'\s+', comment='#', engine='c')
+            df.to_sql(table, engine, if_exists='replace', index=False, chunksize=50_000)
+        with engine.begin() as connection:
+            for table, col in (('ModelAtomicIonLevel', 'LevelNumber'), ('ModelAtomicIonLevelSublevel', 'LevelNumber'),
+                               ('ModelAtomicIonLineFine', 'UpperLevel'), ('ModelAtomicIonLineFine', 'LowerLevel')):
+                connection.execute(sqlalchemy.text(
+                    f'CREATE INDEX "ix_{table}_{col}" ON "{table}" (AtomicNumber, IonCharge, "{col}")'))
+    finally:
+        engine.dispose()
+    return path
+
 # -----------------------------------------------------------------------------
 def SQL_where(model=None,atom=None,ion=None,level=None,sublevel=None,Pi=None,
               lowerlevel=None,lowersublevel=None,upperlevel=None,
@@ -49,74 +217,302 @@ def SQL_where(model=None,atom=None,ion=None,level=None,sublevel=None,Pi=None,
     return "WHERE "+" AND ".join(selected)
 
 
-def read_table_from_file(path, usecols=None):
+# Columns (and their dtypes) actually used from each table; everything else is skipped while parsing
+LEVEL_DTYPES = {'LevelNumber': 'int32', 'FullConfig': str, 'ElectronConfig': str}
+SUBLEVEL_DTYPES = {'LevelNumber': 'int32', 'SublevelNumber': 'int32', '2J': 'int32', 'ExcitationWaven': 'float64'}
+LINEFINE_DTYPES = {'LowerLevel': 'int32', 'LowerSublevel': 'int32', 'UpperLevel': 'int32', 'UpperSublevel': 'int32'}
+# line values read only when a level-of-detail stage needs them (see lod.py)
+LINE_VALUE_DTYPES = {'Wavelength': 'float64', 'gf': 'float64', 'A': 'float64'}
+# (AtomicNumber, IonCharge) columns of multi-species files
+SPECIES_DTYPES = {'AtomicNumber': 'int16', 'IonCharge': 'int16'}
+# model version of each row; read only when several models are fetched together (models=[...])
+MODEL_COLUMN = 'ModelIndex'
+MODEL_DTYPES = {MODEL_COLUMN: 'int32'}
+LEVEL_COLUMNS = list(LEVEL_DTYPES)
+SUBLEVEL_COLUMNS = list(SUBLEVEL_DTYPES)
+LINEFINE_COLUMNS = list(LINEFINE_DTYPES)
+LINE_VALUE_COLUMNS = list(LINE_VALUE_DTYPES)
+# a line is selected when both of its levels are
+LINE_LEVEL_COLUMNS = ('LowerLevel', 'UpperLevel')
+
+READ_CHUNKSIZE = 1_000_000
+
+
+def _read_csv(path, usecols, dtype, chunksize=None):
+    """pd.read_csv with the C parser on whitespace-separated tables (header row, '#' comments)."""
+    wanted = set(usecols) if usecols else None
+    return pd.read_csv(path, sep=r'\s+', comment='#', engine='c',
+                       usecols=(lambda c: c in wanted) if wanted else None,
+                       dtype=dtype, chunksize=chunksize)
+
+
+def _coerce_numeric(df, dtype):
+    """Cast the numeric columns of a str DataFrame, turning bad values into NaN (original behavior)."""
+    for col, kind in (dtype or {}).items():
+        if col in df.columns and kind is not str:
+            df[col] = pd.to_numeric(df[col], errors='coerce')
+    return df
+
+
+def read_table_from_file(path, usecols=None, dtype=None, row_filter=None, chunksize=None):
     """Read whitespace-separated table with pandas, return DataFrame.
-    We try to load as strings first and then cast necessary cols where possible.
+    Only usecols are parsed (missing ones are ignored) and dtype (column -> dtype) is applied by
+    the C parser. If a typed column holds non-numeric values (e.g. NULL) the table is re-read as
+    strings and coerced with pd.to_numeric, as before. row_filter(df) -> boolean mask is applied
+    chunk by chunk, so filtered-out rows are never accumulated. Without dtype all columns are str.
     """
     if not os.path.exists(path):
         raise FileNotFoundError(f"File not found: {path}")
-    # read flexibly; allow comments '#' too
-    df = pd.read_csv(path, sep=r'\s+', comment='#', engine='python', dtype=str)
+    if row_filter is not None and chunksize is None:
+        chunksize = READ_CHUNKSIZE
+    try:
+        return _read_filtered(path, usecols, dtype or str, row_filter, chunksize)
+    except (ValueError, TypeError):
+        if dtype is None:
+            raise
+        coerce = lambda df: _coerce_numeric(df, dtype)
+        return _read_filtered(path, usecols, str, row_filter, chunksize, convert=coerce)
+
+
+def _read_filtered(path, usecols, dtype, row_filter, chunksize, convert=None):
+    reader = _read_csv(path, usecols, dtype, chunksize=chunksize)
+    chunks = [reader] if chunksize is None else reader
+    kept = []
+    for chunk in chunks:
+        if convert is not None:
+            chunk = convert(chunk)
+        if row_filter is not None:
+            chunk = chunk[row_filter(chunk)]
+        kept.append(chunk)
+    if len(kept) == 1:
+        df = kept[0]
+    else:
+        df = pd.concat(kept, ignore_index=True)
     if usecols:
-        # keep only requested columns if present
-        cols = [c for c in usecols if c in df.columns]
-        df = df.loc[:, cols]
-    return df
+        # keep the requested column order
+        df = df.loc[:, [c for c in usecols if c in df.columns]]
+    return df.reset_index(drop=True)
 
 
-def fetch_levels_tables(database, atom, ion, levs,
-                        file_level=None, file_sublevel=None):
-    """Return Levels and LevelsSublevels DataFrames filtered for given levs.
-    Si se pasan file_level y file_sublevel, se leen desde archivos locales.
+def _species_mask(df, atom=None, ion=None, models=None):
+    """Rows of (atom, ion) (and of the ModelIndex values models); files without the species columns
+    hold a single species.
     """
-    levs_str = ','.join([str(l) for l in levs])
+    mask = np.ones(len(df), dtype=bool)
+    for col, value in (('AtomicNumber', atom), ('IonCharge', ion)):
+        if value is not None and col in df.columns:
+            mask &= (df[col] == value).to_numpy()
+    if models is not None:
+        if MODEL_COLUMN not in df.columns:
+            raise ValueError(f"No {MODEL_COLUMN} column: cannot select models {list(models)}")
+        mask &= np.isin(df[MODEL_COLUMN].to_numpy(), models)
+    return mask
+
+
+def _warn_no_species(path, rows, atom, ion):
+    """Warn that none of the rows of a non-empty file are of species (atom, ion)."""
+    if rows:
+        warnings.warn(f"{path}: none of its {rows} rows are of species Z={atom} ion={ion} "
+                      "(AtomicNumber/IonCharge columns); check --Z/--ion", stacklevel=3)
+
+
+def _levs_filter(levs, atom=None, ion=None, columns=('LevelNumber',), models=None):
+    """Row filter of the rows of (atom, ion) whose level columns are all in levs (interval search)."""
+    levs = LevelSet.parse(levs)
+
+    def row_filter(df):
+        mask = _species_mask(df, atom, ion, models)
+        for col in columns:
+            mask &= levs.mask(df[col].to_numpy(dtype=float))
+        return mask
+    return row_filter
+
+
+def _read_species_table(path, dtypes, row_filter=None, atom=None, ion=None, models=None):
+    """Read the dtypes columns of one species (atom, ion) of a table; species columns are dropped.
+    With models, the ModelIndex column is read and kept (see split_models). Warns when the file has
+    rows but none of the species.
+    """
+    dtype = dict(SPECIES_DTYPES, **(MODEL_DTYPES if models is not None else {}), **dtypes)
+    if row_filter is None:
+        row_filter = lambda df: _species_mask(df, atom, ion, models)
+    # rows read and rows of the species, counted chunk by chunk
+    seen = [0, 0]
+
+    def counted_filter(df):
+        species = _species_mask(df, atom, ion)
+        seen[0] += len(df)
+        seen[1] += int(species.sum())
+        return species & row_filter(df)
+    df = read_table_from_file(path, usecols=list(dtype), dtype=dtype, row_filter=counted_filter)
+    if not seen[1]:
+        _warn_no_species(path, seen[0], atom, ion)
+    return df.drop(columns=[c for c in SPECIES_DTYPES if c in df.columns])
 
-    if file_level and file_sublevel:
-        # --- lectura desde archivos locales ---
-        Levels_SQL = pd.read_csv(file_level, sep=r'\s+', comment='#', engine='python', dtype=str)
-        LevelsSub_SQL = pd.read_csv(file_sublevel, sep=r'\s+', comment='#', engine='python', dtype=str)
 
-        # Filtrar columnas relevantes si existen
-        Levels_SQL = Levels_SQL.loc[:, [c for c in ['LevelNumber','FullConfig','ElectronConfig'] if c in Levels_SQL.columns]]
-        LevelsSub_SQL = LevelsSub_SQL.loc[:, [c for c in ['LevelNumber','SublevelNumber','2J','ExcitationWaven'] if c in LevelsSub_SQL.columns]]
+def _model_list(models):
+    """Sorted distinct ModelIndex values (an int is one model)."""
+    return sorted({int(m) for m in np.atleast_1d(models)})
 
-        # Convertir a numéricos donde aplique
-        for col in ['LevelNumber','SublevelNumber','2J','ExcitationWaven']:
-            if col in LevelsSub_SQL.columns:
-                LevelsSub_SQL[col] = pd.to_numeric(LevelsSub_SQL[col], errors='coerce')
-        if 'LevelNumber' in Levels_SQL.columns:
-            Levels_SQL['LevelNumber'] = pd.to_numeric(Levels_SQL['LevelNumber'], errors='coerce')
 
-        # Filtrar por levs
-        Levels_SQL = Levels_SQL[Levels_SQL['LevelNumber'].isin(levs)]
-        LevelsSub_SQL = LevelsSub_SQL[LevelsSub_SQL['LevelNumber'].isin(levs)]
+def _model_columns(models):
+    return [MODEL_COLUMN] if models is not None else []
 
-        return Levels_SQL.reset_index(drop=True), LevelsSub_SQL.reset_index(drop=True)
+
+def _model_in(models):
+    """SQL_select arguments of ModelIndex IN (models) (none without models)."""
+    return {'in_column': MODEL_COLUMN, 'in_values': models} if models is not None else {}
+
+
+def split_models(models, model_ids, *tables):
+    """{model: tuple of the rows of each table with that ModelIndex}, for the row-aligned model_ids.
+    One stable argsort of model_ids and a binary search per model: every table is split in a single
+    pass, whatever the number of models; row order is kept inside each model. Tables are DataFrames
+    (the ModelIndex column is dropped, index reset) or arrays; models without rows get empty tables.
+    """
+    model_ids = np.asarray(model_ids)
+    order = np.argsort(model_ids, kind='stable')
+    sorted_ids = model_ids[order]
+    out = {}
+    for m in _model_list(models):
+        rows = order[np.searchsorted(sorted_ids, m, side='left'):np.searchsorted(sorted_ids, m, side='right')]
+        parts = []
+        for table in tables:
+            if isinstance(table, pd.DataFrame):
+                part = table.iloc[rows].reset_index(drop=True)
+                parts.append(part.drop(columns=[c for c in (MODEL_COLUMN,) if c in part.columns]))
+            else:
+                parts.append(np.asarray(table)[rows])
+        out[m] = tuple(parts)
+    return out
+
+
+def fetch_levels_tables(database, atom, ion, levs,
+                        file_level=None, file_sublevel=None, models=None):
+    """Return Levels and LevelsSublevels DataFrames filtered for given levs.
+    Si se pasan file_level y file_sublevel, se leen desde archivos locales.
+    With models (ModelIndex values), every model is read in the same file pass or query
+    (ModelIndex IN (...)) and {model: (Levels_SQL, LevelsSub_SQL)} is returned (see split_models).
+    """
+    if models is not None:
+        models = _model_list(models)
+    if file_level and file_sublevel:
+        # --- lectura desde archivos locales: solo columnas usadas, tipadas, filtradas por levs al leer ---
+        row_filter = _levs_filter(levs, atom, ion, models=models)
+        Levels_SQL = _read_species_table(file_level, LEVEL_DTYPES, row_filter=row_filter, atom=atom, ion=ion,
+                                         models=models)
+        LevelsSub_SQL = _read_species_table(file_sublevel, SUBLEVEL_DTYPES, row_filter=row_filter, atom=atom,
+                                            ion=ion, models=models)
 
     else:
-        # --- lectura desde SQL (original) ---
-        Levels_SQL = SQL_table('ModelAtomicIonLevel',
-                               SQL_where(atom=atom, ion=ion) + f" AND LevelNumber IN ({levs_str})",
-                               database=database).loc[:, ['LevelNumber','FullConfig','ElectronConfig']]
-        LevelsSub_SQL = SQL_table('ModelAtomicIonLevelSublevel',
-                                  SQL_where(atom=atom, ion=ion) + f" AND LevelNumber IN ({levs_str})",
-                                  database=database).loc[:, ['LevelNumber','SublevelNumber','2J','ExcitationWaven']]
+        # --- lectura desde SQL (pooled engine, bound parameters, level ranges as BETWEEN) ---
+        Levels_SQL = SQL_select('ModelAtomicIonLevel', LEVEL_COLUMNS + _model_columns(models), database=database,
+                                levels=levs, level_columns=('LevelNumber',), **_model_in(models),
+                                AtomicNumber=atom, IonCharge=ion)
+        LevelsSub_SQL = SQL_select('ModelAtomicIonLevelSublevel', SUBLEVEL_COLUMNS + _model_columns(models),
+                                   database=database, levels=levs, level_columns=('LevelNumber',), **_model_in(models),
+                                   AtomicNumber=atom, IonCharge=ion)
+    if models is None:
         return Levels_SQL, LevelsSub_SQL
+    lev = split_models(models, Levels_SQL[MODEL_COLUMN], Levels_SQL)
+    sub = split_models(models, LevelsSub_SQL[MODEL_COLUMN], LevelsSub_SQL)
+    return {m: lev[m] + sub[m] for m in models}
+
+
+def iter_transitions(file_linefine, levs=None, chunksize=READ_CHUNKSIZE, atom=None, ion=None, values=False,
+                     models=None):
+    """Stream a LineFine file in chunks of chunksize rows.
+    Yields int32 (n, 4) arrays [LowerLevel, LowerSublevel, UpperLevel, UpperSublevel] holding only the
+    lines of species (atom, ion) whose lower and upper levels are both in levs (all lines if levs is None).
+    Rows with missing (NULL/NaN) values are dropped. Peak memory depends on chunksize, not on the file size.
+    With values, (lines, values) pairs are yielded instead, values being the row-aligned float64 (n, 3)
+    array of LINE_VALUE_COLUMNS (missing values stay NaN).
+    With models, only the lines of those ModelIndex values are kept and the int32 ModelIndex of each
+    line is appended to what is yielded: (lines, model_ids) or (lines, values, model_ids).
+    """
+    if not os.path.exists(file_linefine):
+        raise FileNotFoundError(f"File not found: {file_linefine}")
+    levs = None if levs is None else LevelSet.parse(levs)
+    models = None if models is None else _model_list(models)
+    # float64 so NULL/NaN do not break the typed parse; cast to int32 once filtered
+    dtype = dict(SPECIES_DTYPES, **{c: 'float64' for c in LINEFINE_DTYPES}, **(LINE_VALUE_DTYPES if values else {}),
+                 **(MODEL_DTYPES if models is not None else {}))
+    seen = [0, 0]  # rows read, rows of the species
+    for chunk in _read_csv(file_linefine, list(dtype), dtype, chunksize=chunksize):
+        arr = chunk.loc[:, list(LINEFINE_DTYPES)].to_numpy()
+        species = _species_mask(chunk, atom, ion)
+        seen[0] += len(chunk)
+        seen[1] += int(species.sum())
+        keep = np.isfinite(arr).all(axis=1) & species & _species_mask(chunk, atom, ion, models)
+        if levs is not None:
+            keep &= levs.mask(arr[:, 0]) & levs.mask(arr[:, 2])
+        out = (arr[keep].astype(np.int32),)
+        if values:
+            out += (chunk.loc[:, LINE_VALUE_COLUMNS].to_numpy()[keep],)
+        if models is not None:
+            out += (chunk[MODEL_COLUMN].to_numpy()[keep],)
+        yield out if len(out) > 1 else out[0]
+    if not seen[1]:
+        _warn_no_species(file_linefine, seen[0], atom, ion)
 
 
 def fetch_transitions(database, atom, ion, levs_str,
-                      file_linefine=None):
+                      file_linefine=None, levs=None, chunksize=None, values=False, models=None):
     """Fetch transitions as list of rows.
     Si se pasa file_linefine, se lee desde archivo local.
+    With chunksize (local file only) the file is streamed through iter_transitions and an int32
+    (n, 4) array of the lines between levs is returned instead of a list.
+    With values, a (rows, values) pair is returned: values is the row-aligned float64 (n, 3) array of
+    LINE_VALUE_COLUMNS (Wavelength, gf, A), read in the same pass.
+    With models (ModelIndex values), the lines of every model are read in the same pass or query and
+    {model: rows (or (rows, values))} is returned.
     """
+    if models is not None:
+        return _fetch_model_transitions(database, atom, ion, levs_str, file_linefine, levs, chunksize, values,
+                                        _model_list(models))
+    if file_linefine:
+        if chunksize:
+            chunks = list(iter_transitions(file_linefine, levs=levs, chunksize=chunksize, atom=atom, ion=ion,
+                                           values=values))
+            if not values:
+                return np.concatenate(chunks) if chunks else np.empty((0, 4), dtype=np.int32)
+            if not chunks:
+                return np.empty((0, 4), dtype=np.int32), np.empty((0, len(LINE_VALUE_COLUMNS)))
+            return np.concatenate([c[0] for c in chunks]), np.concatenate([c[1] for c in chunks])
+        dtypes = dict(LINEFINE_DTYPES, **(LINE_VALUE_DTYPES if values else {}))
+        row_filter = None if levs is None else _levs_filter(levs, atom, ion, LINE_LEVEL_COLUMNS)
+        DB_trans = _read_species_table(file_linefine, dtypes, row_filter=row_filter, atom=atom, ion=ion)
+        return _rows_and_values(DB_trans, values)
+    else:
+        if levs is None:
+            levs = LevelSet.parse(str(levs_str))
+        DB_trans = SQL_select('ModelAtomicIonLineFine', LINEFINE_COLUMNS + (LINE_VALUE_COLUMNS if values else []),
+                              database=database, levels=levs, level_columns=LINE_LEVEL_COLUMNS,
+                              AtomicNumber=atom, IonCharge=ion)
+        return _rows_and_values(DB_trans, values)
+
+
+def _fetch_model_transitions(database, atom, ion, levs_str, file_linefine, levs, chunksize, values, models):
+    """fetch_transitions of several models: one read of all their lines, split by ModelIndex."""
+    if file_linefine and chunksize:
+        chunks = list(iter_transitions(file_linefine, levs=levs, chunksize=chunksize, atom=atom, ion=ion,
+                                       values=values, models=models))
+        empty = (np.empty((0, 4), dtype=np.int32),) + \
+            ((np.empty((0, len(LINE_VALUE_COLUMNS))),) if values else ()) + (np.empty(0, dtype=np.int32),)
+        parts = [np.concatenate([c[k] for c in chunks] + [e]) for k, e in enumerate(empty)]
+        split = split_models(models, parts[-1], *parts[:-1])
+        return {m: t if values else t[0] for m, t in split.items()}
     if file_linefine:
-        DB_trans = pd.read_csv(file_linefine, sep=r'\s+', comment='#', engine='python', dtype=str)
-        DB_trans = DB_trans.loc[:, [c for c in ['LowerLevel','LowerSublevel','UpperLevel','UpperSublevel'] if c in DB_trans.columns]]
-        for col in DB_trans.columns:
-            DB_trans[col] = pd.to_numeric(DB_trans[col], errors='coerce')
-        return DB_trans.values.tolist()
+        dtypes = dict(LINEFINE_DTYPES, **(LINE_VALUE_DTYPES if values else {}))
+        row_filter = None if levs is None else _levs_filter(levs, atom, ion, LINE_LEVEL_COLUMNS, models=models)
+        DB_trans = _read_species_table(file_linefine, dtypes, row_filter=row_filter, atom=atom, ion=ion,
+                                       models=models)
     else:
-        DB_trans = SQL_table('ModelAtomicIonLineFine',
-                             SQL_where(atom=atom, ion=ion) + f'AND UpperLevel IN ({levs_str})',
-                             database=database).loc[:, ['LowerLevel','LowerSublevel','UpperLevel','UpperSublevel']]
-        return DB_trans.values.tolist()
+        if levs is None:
+            levs = LevelSet.parse(str(levs_str))
+        DB_trans = SQL_select('ModelAtomicIonLineFine',
+                              LINEFINE_COLUMNS + (LINE_VALUE_COLUMNS if values else []) + _model_columns(models),
+                              database=database, levels=levs, level_columns=LINE_LEVEL_COLUMNS, **_model_in(models),
+                              AtomicNumber=atom, IonCharge=ion)
+    split = split_models(models, DB_trans[MODEL_COLUMN], DB_trans)
+    return {m: _rows_and_values(t[0], values) for m, t in split.items()}
@@ -0,0 +1,77 @@
+# src/grotrian_plotter/labels.py
+"""Label layout for large diagrams.
+
+multiplet_groups groups the sublevels tagged together by (LevelNumber, mult, l), whatever their row
+order. place_labels then resolves collisions between the tags of each term column: the tags of a
+column are sorted by energy once and swept bottom-up, merging overlapping tags into clusters that are
+re-centered on the mean energy of their anchors (so a crowded group spreads both ways instead of
+drifting up). Sorting dominates: O(n log n) for n tags, independently of how crowded the columns are.
+"""
+import numpy as np
+import pandas as pd
+
+# vertical room of one tag, in points (the annotation font size)
+LABEL_HEIGHT_PT = 10.0
+
+
+def multiplet_groups(level_numbers, mults, ls, grouped):
+    """Group code per sublevel: rows with grouped True share a code when their (LevelNumber, mult, l)
+    match, the other rows get a code of their own. Codes are numbered in order of first appearance.
+    """
+    n = len(level_numbers)
+    keys = pd.MultiIndex.from_arrays([pd.Series(level_numbers, dtype=object), pd.Series(mults, dtype=object),
+                                      pd.Series(ls, dtype=object)])
+    codes, _ = keys.factorize()
+    grouped = np.asarray(grouped, dtype=bool)
+    # singletons: codes above the grouped ones, one per row
+    codes = np.where(grouped, codes, codes.max(initial=-1) + 1 + np.arange(n))
+    _, first, group = np.unique(codes, return_index=True, return_inverse=True)
+    # renumber by first appearance
+    rank = np.empty(len(first), dtype=np.int64)
+    rank[np.argsort(first, kind='stable')] = np.arange(len(first))
+    return rank[group.ravel()]
+
+
+def label_height(ys, axes_height_pt, height_pt=LABEL_HEIGHT_PT, margin=0.05):
+    """Height of one tag in data units for an axis autoscaled on ys (with matplotlib's 5% margins)."""
+    ys = np.asarray(ys, dtype=float)
+    ys = ys[np.isfinite(ys)]
+    if not len(ys):
+        return 0.0
+    span = (ys.max() - ys.min()) * (1 + 2 * margin)
+    return height_pt / axes_height_pt * span if span > 0 else 0.0
+
+
+def place_labels(columns, ys, height):
+    """Label y positions with no two tags of the same column closer than height.
+    Tags that do not collide keep their anchor y; each cluster of colliding tags is stacked height
+    apart, in anchor order, centered on the mean of its anchors.
+    """
+    ys = np.asarray(ys, dtype=float)
+    out = ys.copy()
+    if height <= 0 or len(ys) < 2:
+        return out
+    order = np.lexsort((ys, np.asarray(columns)))
+    cols = np.asarray(columns)[order]
+    # sweep each column: clusters as [start index in order, count, sum of anchors, bottom y]
+    stack = []
+    for k, idx in enumerate(order):
+        y = ys[idx]
+        if not np.isfinite(y):
+            continue
+        if stack and cols[stack[-1][0]] != cols[k]:
+            _flush(stack, order, out, height)
+        cluster = [k, 1, y, y]
+        while stack and stack[-1][3] + stack[-1][1] * height > cluster[3]:
+            prev = stack.pop()
+            count, total = prev[1] + cluster[1], prev[2] + cluster[2]
+            cluster = [prev[0], count, total, total / count - (count - 1) * height / 2]
+        stack.append(cluster)
+    _flush(stack, order, out, height)
+    return out
+
+
+def _flush(stack, order, out, height):
+    for start, count, _, bottom in stack:
+        out[order[start:start + count]] = bottom + height * np.arange(count)
+    stack.clear()
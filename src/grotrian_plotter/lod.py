@@ -0,0 +1,93 @@
+# src/grotrian_plotter/lod.py
+"""Level of detail: reduce a dense transition set to the lines worth drawing.
+
+Runs between resolve_transitions and plotting on transitions carrying their line values, i.e. the
+(i, f, unresolved, values) 4-tuple where values is the (n_resolved, 3) array of Wavelength, gf and A
+of the resolved lines (see with_values, and values=True of the readers and of load_atomic_model).
+
+    transitions, counts = reduce_transitions(transitions, levels, by='gf', top=500, merge=True)
+
+merge draws one segment per multiplet (pair of LevelNumbers), at the positions of its strongest
+component, with gf and A summed; top keeps the N strongest segments and min_value cuts below a
+threshold. The plotting cost then follows the number of segments kept, not the size of the line list.
+"""
+import numpy as np
+import pandas as pd
+
+from .data_loader import LINE_VALUE_COLUMNS
+from .building import _level_keys
+
+LOD_KEYS = ('gf', 'A')
+
+
+def with_values(transitions, values):
+    """(i, f, unresolved, values) from resolve_transitions output and the values of its input rows."""
+    i, f, unresolved = transitions[:3]
+    values = np.asarray(values, dtype=float).reshape(-1, len(LINE_VALUE_COLUMNS))
+    return i, f, unresolved, values[~unresolved]
+
+
+def _level_numbers(levels):
+    if isinstance(levels, pd.DataFrame):
+        return levels['LevelNumber'].to_numpy(dtype=np.int64)
+    return np.fromiter((l['LevelNumber'] for l in levels), dtype=np.int64, count=len(levels))
+
+
+def merge_multiplets(transitions, levels, by='gf'):
+    """One segment per (lower, upper) LevelNumber pair: the positions and Wavelength of the component
+    with the largest `by` value, gf and A summed over the components. Returns (transitions, counts).
+    """
+    i, f, unresolved, values = transitions
+    if not len(i):
+        return transitions, np.empty(0, dtype=np.int64)
+    lev = _level_numbers(levels)
+    _, group = np.unique(_level_keys(lev[i], lev[f]), return_inverse=True)
+    group = group.ravel()
+    strength = np.nan_to_num(values[:, LINE_VALUE_COLUMNS.index(by)], nan=-np.inf)
+    # strongest component first within each group (ties: first line)
+    order = np.lexsort((np.arange(len(i)), -strength, group))
+    first = order[np.r_[True, group[order][1:] != group[order][:-1]]]
+    counts = np.bincount(group)
+    merged = values[first].copy()
+    for col in LOD_KEYS:
+        k = LINE_VALUE_COLUMNS.index(col)
+        merged[:, k] = np.bincount(group, weights=np.nan_to_num(values[:, k]))
+        # all components without a value: keep NaN
+        merged[np.bincount(group, weights=np.isfinite(values[:, k])) == 0, k] = np.nan
+    # segments in the order of their strongest line
+    keep = np.argsort(first, kind='stable')
+    return (i[first][keep], f[first][keep], unresolved, merged[keep]), counts[keep]
+
+
+def reduce_transitions(transitions, levels=None, by='gf', top=None, min_value=None, merge=False):
+    """Level-of-detail stage: merge multiplets (needs levels), then keep the segments whose `by` value
+    (gf or A) is at least min_value and, of those, the top strongest. Lines without a value are dropped
+    by top/min_value. Returns ((i, f, unresolved, values), counts), counts being the number of lines
+    behind each segment. unresolved is passed through unchanged.
+    """
+    if by not in LOD_KEYS:
+        raise ValueError(f"Unknown level-of-detail key: {by} (expected one of {', '.join(LOD_KEYS)})")
+    if len(transitions) < 4:
+        raise ValueError("reduce_transitions needs (i, f, unresolved, values) transitions; read them with values")
+    if top is not None and top < 0:
+        raise ValueError(f"top must be >= 0, got {top}")
+    if merge:
+        if levels is None:
+            raise ValueError("merge=True needs the levels to group lines by LevelNumber")
+        transitions, counts = merge_multiplets(transitions, levels, by=by)
+    else:
+        counts = np.ones(len(transitions[0]), dtype=np.int64)
+    i, f, unresolved, values = transitions
+    strength = values[:, LINE_VALUE_COLUMNS.index(by)]
+    keep = np.ones(len(i), dtype=bool)
+    if min_value is not None:
+        keep &= strength >= min_value
+    if top is not None:
+        keep &= np.isfinite(strength)
+        candidates = np.flatnonzero(keep)
+        if len(candidates) > top:
+            # the top strongest, ties broken by line order
+            best = candidates[np.argsort(-strength[candidates], kind='stable')[:top]]
+            keep[:] = False
+            keep[best] = True
+    return (i[keep], f[keep], unresolved, values[keep]), counts[keep]
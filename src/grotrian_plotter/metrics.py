@@ -0,0 +1,120 @@
+# src/grotrian_plotter/metrics.py
+"""Per-stage metrics of the diagram pipeline (read, build, plot).
+
+A PipelineMetrics records, for each stage run inside `with metrics.stage(name):`, the wall and CPU
+time, the peak traced memory (tracemalloc, when trace_memory is on), the process peak RSS and the
+row counts in and out set by the stage. One stage can also be run under cProfile and dumped to a
+.prof file (read it with `python -m pstats` or snakeviz).
+
+    metrics = PipelineMetrics(trace_memory=True, profile_stage='plot')
+    with metrics.stage('plot', rows_in=len(levels)) as rec:
+        ...
+        rec['rows_out'] = n_drawn
+    metrics.set(n_unresolved=3)
+    metrics.as_dict()
+"""
+import sys
+import time
+import json
+import cProfile
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def _max_rss_mb():
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in KiB on Linux, bytes on macOS
+    return rss / 1024 ** 2 if sys.platform == 'darwin' else rss / 1024
+
+
+class PipelineMetrics:
+    """Collects one record per pipeline stage; see the module docstring."""
+
+    def __init__(self, trace_memory=False, profile_stage=None, profile_path=None):
+        self.trace_memory = trace_memory
+        self.profile_stage = profile_stage
+        self.profile_path = profile_path or (f"{profile_stage}.prof" if profile_stage else None)
+        self.stages = []
+        self.totals = {}
+
+    @contextmanager
+    def stage(self, name, rows_in=None, **counts):
+        """Time the enclosed block as stage name. Yields the stage record; set rec['rows_out'] (or any
+        other count) inside the block.
+        """
+        rec = {'stage': name, 'rows_in': rows_in, 'rows_out': None, **counts}
+        started_tracing = False
+        if self.trace_memory:
+            if tracemalloc.is_tracing():
+                tracemalloc.reset_peak()
+            else:
+                tracemalloc.start()
+                started_tracing = True
+            mem0 = tracemalloc.get_traced_memory()[0]
+        prof = None
+        if name == self.profile_stage:
+            prof = cProfile.Profile()
+            prof.enable()
+        wall0, cpu0 = time.perf_counter(), time.process_time()
+        try:
+            yield rec
+        finally:
+            rec['wall_s'] = time.perf_counter() - wall0
+            rec['cpu_s'] = time.process_time() - cpu0
+            if prof is not None:
+                prof.disable()
+                prof.dump_stats(self.profile_path)
+                rec['profile'] = self.profile_path
+            rec['peak_mb'] = None
+            if self.trace_memory:
+                rec['peak_mb'] = (tracemalloc.get_traced_memory()[1] - mem0) / 1024 ** 2
+                if started_tracing:
+                    tracemalloc.stop()
+            rec['max_rss_mb'] = _max_rss_mb()
+            self.stages.append(rec)
+
+    def set(self, **totals):
+        """Record whole-run values (e.g. n_unresolved)."""
+        self.totals.update(totals)
+
+    def stage_record(self, name):
+        for rec in self.stages:
+            if rec['stage'] == name:
+                return rec
+        return None
+
+    def as_dict(self):
+        return {'stages': [dict(r) for r in self.stages], 'totals': dict(self.totals),
+                'wall_s': sum(r['wall_s'] for r in self.stages), 'cpu_s': sum(r['cpu_s'] for r in self.stages)}
+
+    def write_json(self, path):
+        with open(path, 'w') as fh:
+            json.dump(self.as_dict(), fh, indent=2)
+
+    def format(self):
+        """Human-readable table of the stages."""
+        def num(v, fmt):
+            width = fmt.split('.')[0].rstrip('d')
+            return format(v, fmt) if v is not None else format('-', f'>{width}')
+        lines = [f"{'stage':20s} {'wall s':>8s} {'cpu s':>8s} {'peak MB':>8s} {'rss MB':>8s} {'rows in':>9s} "
+                 f"{'rows out':>9s}"]
+        for r in self.stages:
+            lines.append(f"{r['stage']:20s} {r['wall_s']:8.3f} {r['cpu_s']:8.3f} {num(r['peak_mb'], '8.1f')} "
+                         f"{num(r['max_rss_mb'], '8.1f')} {num(r['rows_in'], '9d')} {num(r['rows_out'], '9d')}")
+        for k, v in self.totals.items():
+            lines.append(f"{k}: {v}")
+        return '\n'.join(lines)
+
+
+def stage(metrics, name, rows_in=None, **counts):
+    """metrics.stage(...) when a PipelineMetrics is given, else a no-op context yielding a scratch dict."""
+    if metrics is None:
+        return nullcontext({})
+    return metrics.stage(name, rows_in=rows_in, **counts)
@@ -0,0 +1,249 @@
+# src/grotrian_plotter/modeldiff.py
+"""Several ModelIndex versions of one species, loaded together and compared.
+
+    models = load_models(12, 0, '1-40', [1, 2], file_level=..., file_sublevel=..., file_linefine=...)
+    diff = diff_models(models[1], models[2])
+    print(diff)     # 3 shifted, 1 added, 0 removed sublevels; 120 added, 4 removed lines
+    plot_model_diff(diff, models[1], models[2], outpath='diff.png')
+
+load_models reads the tables of every model in one file pass or query (data_loader models=[...]) and
+splits them in memory. The diff joins the two models on their (LevelNumber, SublevelNumber) keys and
+on their (lower, upper) line keys with hash tables (pandas Index lookups), one pass per table, so it
+stays linear for line lists with millions of rows.
+"""
+import numpy as np
+import pandas as pd
+
+from .building import _level_keys
+from .metrics import stage
+from .selection import LevelSet
+from .windows import level_wavenumbers
+
+LEVEL_STATUSES = ('same', 'shifted', 'added', 'removed')
+
+
+def load_models(atom, ion, levs, models, file_level=None, file_sublevel=None, file_linefine=None,
+                database=None, chunksize=None, values=False, metrics=None):
+    """{model: cache.AtomicModel} of the ModelIndex values models, as load_atomic_model returns them
+    (without window_index). Local files when all three are given, SQL
+    (database) otherwise; each table is read once for all the models.
+    """
+    from .data_loader import fetch_levels_tables, fetch_transitions
+    from .building import build_levels_frame, resolve_transitions
+    from .lod import with_values
+    from .cache import AtomicModel
+
+    levs = LevelSet.parse(levs)
+    with stage(metrics, 'read_levels') as rec:
+        tables = fetch_levels_tables(database, atom, ion, levs, file_level=file_level, file_sublevel=file_sublevel,
+                                     models=models)
+        rec['rows_out'] = sum(len(t[1]) for t in tables.values())
+        rec['models'] = len(tables)
+    with stage(metrics, 'build_levels', rows_in=rec['rows_out']) as rec:
+        frames = {m: build_levels_frame(*t) for m, t in tables.items()}
+        rec['rows_out'] = sum(len(f) for f in frames.values())
+    with stage(metrics, 'read_transitions') as rec:
+        lines = fetch_transitions(database, atom, ion, str(levs), file_linefine=file_linefine, levs=levs,
+                                  chunksize=chunksize, values=values, models=models)
+        rec['rows_out'] = sum(len(l[0] if values else l) for l in lines.values())
+    with stage(metrics, 'build_transitions', rows_in=rec['rows_out']) as rec:
+        out = {}
+        for m, (Levels_SQL, LevelsSub_SQL) in tables.items():
+            if values:
+                transitions = with_values(resolve_transitions(lines[m][0], frames[m]), lines[m][1])
+            else:
+                transitions = resolve_transitions(lines[m], frames[m])
+            out[m] = AtomicModel(Levels_SQL, LevelsSub_SQL, frames[m], transitions, None)
+        rec['rows_out'] = sum(len(model.transitions[0]) for model in out.values())
+    return out
+
+
+def _frame_keys(frame):
+    if not len(frame):
+        return np.empty(0, dtype=np.int64)
+    return _level_keys(frame['LevelNumber'].to_numpy(), frame['SublevelNumber'].to_numpy())
+
+
+def _key_positions(keys):
+    """Hash index of keys -> row position; a duplicated key keeps its last row (as resolve_transitions)."""
+    positions = pd.Series(np.arange(len(keys), dtype=np.int64), index=pd.Index(keys))
+    return positions[~positions.index.duplicated(keep='last')]
+
+
+def diff_levels(frame_a, frame_b, tolerance=0.0):
+    """One row per sublevel of either levels frame (build_levels_frame), joined on (LevelNumber,
+    SublevelNumber): pos_a/pos_b (row in each frame, -1 when missing), energy_a/energy_b
+    (ExcitationWaven, cm^-1), shift (energy_b - energy_a) and status: 'same', 'shifted'
+    (|shift| > tolerance), 'added' (only in b) or 'removed' (only in a). Rows of a come first, in
+    their order, then the sublevels added by b.
+    """
+    keys_a, keys_b = _frame_keys(frame_a), _frame_keys(frame_b)
+    index_b = _key_positions(keys_b)
+    at = index_b.index.get_indexer(keys_a)
+    pos_b = np.where(at >= 0, index_b.to_numpy()[at], -1)
+    added = np.flatnonzero(~pd.Index(keys_b).isin(keys_a))
+
+    pos_a = np.concatenate([np.arange(len(keys_a)), np.full(len(added), -1)])
+    pos_b = np.concatenate([pos_b, added])
+    keys = np.concatenate([keys_a, keys_b[added]])
+    energy_a = _energies(frame_a, pos_a)
+    energy_b = _energies(frame_b, pos_b)
+    shift = energy_b - energy_a
+
+    status = np.full(len(keys), 'same', dtype=object)
+    status[np.abs(shift) > tolerance] = 'shifted'
+    status[pos_b < 0] = 'removed'
+    status[pos_a < 0] = 'added'
+    return pd.DataFrame({'LevelNumber': (keys >> 32).astype(np.int32),
+                         'SublevelNumber': (keys & 0xFFFFFFFF).astype(np.int32),
+                         'pos_a': pos_a, 'pos_b': pos_b, 'energy_a': energy_a, 'energy_b': energy_b,
+                         'shift': shift, 'status': pd.Categorical(status, categories=LEVEL_STATUSES)})
+
+
+def _energies(frame, pos):
+    """ExcitationWaven (cm^-1) of the rows pos of a levels frame; NaN where pos is -1."""
+    out = np.full(len(pos), np.nan)
+    if len(frame):
+        found = pos >= 0
+        out[found] = level_wavenumbers(frame)[pos[found]]
+    return out
+
+
+def _line_keys(frame_a, transitions_a, frame_b, transitions_b):
+    """One int64 key per resolved line of a and of b, equal for lines between the same two sublevels.
+    The sublevel keys of both frames are factorized together (one hash pass over the levels, not the
+    lines), so each line end is a code looked up by position and the (lower, upper) pair packs into a
+    single integer.
+    """
+    keys_a = _frame_keys(frame_a)
+    codes, uniques = pd.factorize(np.concatenate([keys_a, _frame_keys(frame_b)]))
+    codes = codes.astype(np.int64)
+    n = max(len(uniques), 1)
+    out = []
+    for frame_codes, transitions in ((codes[:len(keys_a)], transitions_a), (codes[len(keys_a):], transitions_b)):
+        i, f = (np.asarray(t, dtype=np.int64) for t in transitions[:2])
+        out.append(frame_codes[i] * n + frame_codes[f])
+    return out
+
+
+def diff_transitions(frame_a, transitions_a, frame_b, transitions_b):
+    """(removed, added): boolean masks over the resolved lines of a (lines missing from b) and of b
+    (lines missing from a). Lines are matched by their two sublevels (LevelNumber, SublevelNumber).
+    """
+    keys_a, keys_b = _line_keys(frame_a, transitions_a, frame_b, transitions_b)
+    removed = ~pd.Index(keys_a).isin(keys_b)
+    added = ~pd.Index(keys_b).isin(keys_a)
+    return removed, added
+
+
+class ModelDiff:
+    """diff_models result: .levels (the diff_levels frame), .removed_lines / .added_lines (masks over the
+    resolved lines of model a / model b).
+    """
+
+    def __init__(self, levels, removed_lines, added_lines):
+        self.levels = levels
+        self.removed_lines, self.added_lines = removed_lines, added_lines
+
+    def sublevels(self, status):
+        """Rows of .levels with that status."""
+        return self.levels[(self.levels['status'] == status).to_numpy()]
+
+    def counts(self):
+        counts = self.levels['status'].value_counts()
+        return {'shifted_sublevels': int(counts['shifted']), 'added_sublevels': int(counts['added']),
+                'removed_sublevels': int(counts['removed']), 'added_lines': int(self.added_lines.sum()),
+                'removed_lines': int(self.removed_lines.sum()),
+                'common_lines': int(len(self.added_lines) - self.added_lines.sum())}
+
+    def to_dict(self):
+        changed = self.levels[(self.levels['status'] != 'same').to_numpy()]
+        return {'counts': self.counts(),
+                'sublevels': changed.drop(columns=['pos_a', 'pos_b']).astype({'status': str}).to_dict('records')}
+
+    def __str__(self):
+        c = self.counts()
+        return (f"{c['shifted_sublevels']} shifted, {c['added_sublevels']} added, {c['removed_sublevels']} removed "
+                f"sublevels; {c['added_lines']} added, {c['removed_lines']} removed lines")
+
+
+def diff_models(model_a, model_b, tolerance=0.0):
+    """ModelDiff of two load_models/load_atomic_model AtomicModels (a: old, b: new). tolerance (cm^-1) is the
+    largest energy change still reported as 'same'.
+    """
+    frame_a, transitions_a = model_a.frame, model_a.transitions
+    frame_b, transitions_b = model_b.frame, model_b.transitions
+    removed, added = diff_transitions(frame_a, transitions_a, frame_b, transitions_b)
+    return ModelDiff(diff_levels(frame_a, frame_b, tolerance), removed, added)
+
+
+# overlay colors: (removed, added, old energy of a shifted sublevel)
+DIFF_COLORS = ('red', 'green', 'orange')
+
+
+def render_diff_figure(diff, model_a, model_b, figsize=None, show_J=True, fig=None):
+    """Overlay diagram of diff on a new Figure (plotting.render_figure): model b as usual with
+    its common lines, the lines and sublevels added by b in green, the ones removed from a in red at
+    their a positions, and the former energy of every shifted sublevel in orange. fig as in render_figure.
+    """
+    from matplotlib.collections import LineCollection
+    from matplotlib.lines import Line2D
+    from .building import levels_frame_to_list
+    from .plotting import render_figure, level_segments, transition_segments, FIGSIZE, LEVEL_WIDTH
+
+    frame_a, transitions_a = model_a.frame, model_a.transitions
+    frame_b, transitions_b = model_b.frame, model_b.transitions
+    levels_b = levels_frame_to_list(frame_b)[0]
+    common = ~diff.added_lines
+    fig = render_figure(levels_b, (transitions_b[0][common], transitions_b[1][common], np.zeros(0, dtype=bool)),
+                        figsize=figsize or FIGSIZE, show_J=show_J, fig=fig)
+    ax = fig.axes[0]
+
+    xa, ea = (frame_a[c].to_numpy(dtype=float) for c in ('xstart', 'energy'))
+    xb, eb = (frame_b[c].to_numpy(dtype=float) for c in ('xstart', 'energy'))
+    removed_color, added_color, shifted_color = DIFF_COLORS
+    pos_a = diff.sublevels('removed')['pos_a'].to_numpy()
+    pos_b = diff.sublevels('added')['pos_b'].to_numpy()
+    pos_shifted = diff.sublevels('shifted')['pos_a'].to_numpy()
+    ax.add_collection(LineCollection(level_segments(xa[pos_shifted], ea[pos_shifted], LEVEL_WIDTH),
+                                     colors=shifted_color, linestyles='--', zorder=2))
+    ax.add_collection(LineCollection(level_segments(xa[pos_a], ea[pos_a], LEVEL_WIDTH), colors=removed_color,
+                                     zorder=3))
+    ax.add_collection(LineCollection(level_segments(xb[pos_b], eb[pos_b], LEVEL_WIDTH), colors=added_color,
+                                     zorder=3))
+    ia, fa = (np.asarray(t, dtype=np.int64)[diff.removed_lines] for t in transitions_a[:2])
+    ib, fb = (np.asarray(t, dtype=np.int64)[diff.added_lines] for t in transitions_b[:2])
+    ax.add_collection(LineCollection(transition_segments(xa, ea, ia, fa), colors=removed_color, linewidths=0.8,
+                                     zorder=1))
+    ax.add_collection(LineCollection(transition_segments(xb, eb, ib, fb), colors=added_color, linewidths=0.8,
+                                     zorder=1))
+    c = diff.counts()
+    ax.legend(handles=[Line2D([], [], color=added_color, label=f"added ({c['added_sublevels']} sublevels, "
+                                                                f"{c['added_lines']} lines)"),
+                       Line2D([], [], color=removed_color, label=f"removed ({c['removed_sublevels']} sublevels, "
+                                                                  f"{c['removed_lines']} lines)"),
+                       Line2D([], [], color=shifted_color, linestyle='--',
+                              label=f"former energy ({c['shifted_sublevels']} shifted)")],
+              loc='lower center', fontsize=8)
+    ax.autoscale_view()
+    return fig
+
+
+def plot_model_diff(diff, model_a, model_b, outpath=None, show=True, dpi=None, fmt=None, figsize=None,
+                    show_J=True):
+    """Save (outpath: path or binary file object, fmt giving its format) or show the overlay diagram of
+    render_diff_figure.
+    """
+    from .plotting import DPI, FIGSIZE, rendering_turn
+    if outpath:
+        with rendering_turn():
+            fig = render_diff_figure(diff, model_a, model_b, figsize=figsize, show_J=show_J)
+            fig.savefig(outpath, dpi=dpi or DPI, format=fmt)
+        if isinstance(outpath, str):
+            print(f"[INFO] Figure saved to {outpath}")
+    elif show:
+        import matplotlib.pyplot as plt
+        fig = render_diff_figure(diff, model_a, model_b, figsize=figsize, show_J=show_J,
+                                 fig=plt.figure(figsize=figsize or FIGSIZE))
+        plt.show()
+        plt.close(fig)
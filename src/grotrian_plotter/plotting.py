@@ -1,94 +1,333 @@
 # src/grotrian_plotter/plotting.py
-import matplotlib.pyplot as plt
+"""Drawing of the diagram with matplotlib.
+
+Figures are built with the object-oriented API: render_figure creates a Figure with its own Agg
+canvas and every option (figure size, show_J, annotations) is an argument, so nothing touches
+pyplot, rcParams or module globals. pyplot is only used to open a window (show=True). One piece of
+matplotlib is still shared by all figures, the mathtext parser of the tags and ticks, and it is not
+thread-safe: threads build and save their figures inside rendering_turn(), one at a time.
+"""
+import threading
+from fractions import Fraction
+
 import numpy as np
 
+from .labels import multiplet_groups, label_height, place_labels
+# matplotlib is imported by the functions that draw with it, so renderer='svg' never loads it
 
-def plot_levels_and_transitions(levels, transitions, outpath=None, show=True, title=''):
-    """Plot the levels and transitions. levels: list of dicts (with xstart, energy, label...)."""
-    # plotting parameters (kept as in original)
-    levelWidth = 0.1
-    plt.rcParams["figure.figsize"] = (4.6 * 1.5, 3.46 * 1.5)
-    font_size = 10
 
-    fig, ax = plt.subplots()
+def transition_indices(transitions):
+    """Return (i, f) index arrays from a list of {'i','f'} dicts or an (i, f[, unresolved]) tuple of arrays."""
+    if isinstance(transitions, tuple):
+        return np.asarray(transitions[0], dtype=np.int64), np.asarray(transitions[1], dtype=np.int64)
+    i = np.fromiter((t['i'] for t in transitions), dtype=np.int64, count=len(transitions))
+    f = np.fromiter((t['f'] for t in transitions), dtype=np.int64, count=len(transitions))
+    return i, f
 
-    temp = []
-    for l in levels:
-        # draw horizontal level
-        ax.plot([l['xstart'] - levelWidth, l['xstart'] + levelWidth],
-                [l['energy'], l['energy']], '-0')
-
-        # determine tag text (keeps original mapping)
-        if l['energy'] == 0:
-            tag = '$3s^2$'
-        elif l['energy'] in [6.8275, 6.136555]:
-            tag = ''
-        elif np.isclose(l['energy'], 5.781276999999999):
-            tag = '$3p^2$'
-        else:
-            # fallback to label parsing similar to original
-            try:
-                tag = l['label'].split('^')[0] + l['label'].split('_')[0][-1].lower()
-            except Exception:
-                tag = l['label']
 
-        L = l['label'].split('_')[0][-1]
+def level_segments(xs, es, levelWidth=0.1):
+    """(n, 2, 2) segments of the horizontal level bars."""
+    seg = np.empty((len(xs), 2, 2))
+    seg[:, 0, 0] = xs - levelWidth
+    seg[:, 1, 0] = xs + levelWidth
+    seg[:, :, 1] = es[:, None]
+    return seg
+
+
+def transition_segments(xs, es, i, f):
+    """(n, 2, 2) segments from level i to level f; index pairs out of range are dropped."""
+    n = len(xs)
+    ok = (i < n) & (f < n) & (i >= -n) & (f >= -n)
+    i, f = i[ok], f[ok]
+    seg = np.empty((len(i), 2, 2))
+    seg[:, 0, 0], seg[:, 0, 1] = xs[i], es[i]
+    seg[:, 1, 0], seg[:, 1, 1] = xs[f], es[f]
+    return seg
+
+
+# plotting parameters (kept as in original)
+LEVEL_WIDTH = 0.1
+FONT_SIZE = 10
+FIGSIZE = (4.6 * 1.5, 3.46 * 1.5)
+DPI = 200
+TERM_TICKS = ['$^3S$','$^3P$','$^3D$','$^3F$','$^3G$','$^3H$','$^3I$','',
+              '$^1S$','$^1P$','$^1D$','$^1F$','$^1G$','$^1H$','$^1I$']
+XLIM = (-1, 13)
+# manual reference lines of the original figure: (energy, color)
+GUIDES = ((6.8275, 'blue'), (6.0825, 'green'))
+YLABEL = 'Energy ($10^4 \\ cm^{-1}$)'
+# room of the tick labels below the axes, in points
+TICK_LABELS_PT = 34
+
 
-        # annotation logic preserved
-        if (('show_J' in globals() and globals()['show_J'] == 'no') or l['mult'] == '*'):
-            ax.annotate(tag, xy=(l['xstart'] + levelWidth, l['energy']), fontsize=font_size)
+def axes_height_pt(figsize=FIGSIZE):
+    """Axes height in points once the figure is laid out (figure height minus the tick labels)."""
+    return figsize[1] * 72 - TICK_LABELS_PT
+
+
+AXES_HEIGHT_PT = axes_height_pt(FIGSIZE)
+
+
+def level_tag(l):
+    """Tag of one level, without its J: the 'tag' built from its configuration (building.config_tag),
+    or the original label-based tag for levels without one.
+    """
+    if l.get('tag') is not None:
+        return l['tag']
+    # fallback to label parsing similar to original
+    try:
+        return l['label'].split('^')[0] + l['label'].split('_')[0][-1].lower()
+    except Exception:
+        return l['label']
+
+
+def level_annotations(levels, levelWidth=LEVEL_WIDTH, layout=False, show_J=True, axes_height=AXES_HEIGHT_PT):
+    """[(text, (x, y))] of the level tags, following the original annotation rules:
+    singlets and S terms get one tag per J, higher multiplets one tag with all their J (in increasing
+    order) at the mean energy (show_J=False: one plain tag per level, without J). Multiplets are grouped
+    by (LevelNumber, mult, l), not by row order. With layout, tags that would overlap in their term
+    column are spread apart (labels.place_labels) for an axes axes_height points high; by default they
+    stay at their levels, as originally.
+    """
+    # per level: 'plain' (tag only), 'single' (tag + J), 'multiplet' (grouped) or None (no tag, as originally)
+    kinds = []
+    for l in levels:
+        L = l['label'].split('_')[0][-1]
+        if not show_J or l['mult'] == '*':
+            kinds.append('plain')
         elif l['mult'] == 1 or L == 'S':
-            ax.annotate(tag + '$_{'+ str(l['j']) + '}$',
-                        xy=(l['xstart'] + levelWidth, l['energy']), fontsize=font_size)
+            kinds.append('single')
         elif isinstance(l['mult'], int) and l['mult'] > 1:
-            temp.append([str(l['j']), l['energy']])
-            if l['mult'] == len(temp):  # usually 3
-                js = ','.join([x[0] for x in temp])
-                aver_ener = sum([x[1] for x in temp]) / len([x[1] for x in temp])
-                ax.annotate(tag + '$_{'+js+'}$',
-                            xy=(l['xstart'] + levelWidth, aver_ener), fontsize=font_size)
-                temp = []
-
-    # Manual annotations from original script
+            kinds.append('multiplet')
+        else:
+            kinds.append(None)
+    rows = [k for k, kind in enumerate(kinds) if kind]
+    if not rows:
+        return []
+    group = multiplet_groups([levels[k].get('LevelNumber') for k in rows], [levels[k]['mult'] for k in rows],
+                             [levels[k].get('l') for k in rows], [kinds[k] == 'multiplet' for k in rows])
+    n_groups = group.max() + 1
+    # first row, J list and mean energy of each group
+    first = np.full(n_groups, len(rows))
+    np.minimum.at(first, group, np.arange(len(rows)))
+    js = [[] for _ in range(n_groups)]
+    for g, k in zip(group, rows):
+        js[g].append(levels[k]['j'])
+    es = np.array([levels[k]['energy'] for k in rows], dtype=float)
+    ys = np.bincount(group, weights=es) / np.bincount(group)
+
+    out = []
+    for g, r in enumerate(first):
+        l = levels[rows[r]]
+        text = level_tag(l)
+        if kinds[rows[r]] != 'plain':
+            # J in increasing order, so the tag does not depend on the row order
+            text += '$_{' + ','.join(str(j) for j in sorted(js[g], key=lambda j: Fraction(str(j)))) + '}$'
+        out.append((text, (l['xstart'] + levelWidth, ys[g])))
+    if layout and len(out) > 1:
+        height = label_height([l['energy'] for l in levels] + [g[0] for g in GUIDES], axes_height)
+        placed = place_labels([xy[0] for _, xy in out], [xy[1] for _, xy in out], height)
+        out = [(text, (x, float(y))) for (text, (x, _)), y in zip(out, placed)]
+    return out
+
+
+def guide_positions(levels):
+    """x range of the two manual guide lines and the y of the 'nl=9s-20p' tag (original placement)."""
     positions = [lv['xstart'] for lv in levels]
     x1, x2 = min(positions) - 0.2, max(positions) + 0.2
-    ax.plot([x1, x2], [6.8275, 6.8275], 'blue')
-    ax.annotate('$3p^2$', xy=(x2, 6.8275), fontsize=font_size)
-
-    ax.plot([x1, x2], [6.0825, 6.0825], 'green')
     # original placed label at levels[-2]['energy'] - keep similar behavior with safe access
     try:
         y_for_label = levels[-2]['energy']
     except Exception:
         y_for_label = 6.0825
-    ax.annotate('nl=9s-20p', xy=(x2, y_for_label), fontsize=font_size)
+    return x1, x2, y_for_label
+
+
+def draw_diagram(ax, levels, transitions, renderer='artists', show_J=True, annotate=True,
+                 axes_height=AXES_HEIGHT_PT, label_layout=False):
+    """Draw levels, tags, guides and transitions on ax.
+    annotate=False leaves out the level tags and the guide lines; show_J, axes_height and label_layout
+    (as layout) are passed to level_annotations. Returns the artists {'levels', 'transitions', 'tags',
+    'guides', 'guide_tags'}; with the collections renderer they can be updated in place by update_diagram.
+    """
+    import matplotlib as mpl
+    from matplotlib.collections import LineCollection
+    if renderer not in ('collections', 'artists'):
+        raise ValueError(f"Unknown renderer: {renderer}")
+    levelWidth = LEVEL_WIDTH
+    font_size = FONT_SIZE
+    artists = {'levels': None, 'transitions': None}
+
+    xs = np.fromiter((l['xstart'] for l in levels), dtype=float, count=len(levels))
+    es = np.fromiter((l['energy'] for l in levels), dtype=float, count=len(levels))
+    if renderer == 'collections':
+        # same look as ax.plot(..., '-0'): black, default line width, zorder of lines
+        artists['levels'] = ax.add_collection(LineCollection(level_segments(xs, es, levelWidth), colors='0',
+                                                             linewidths=mpl.rcParams['lines.linewidth'], zorder=2))
+    else:
+        for l in levels:
+            # draw horizontal level
+            ax.plot([l['xstart'] - levelWidth, l['xstart'] + levelWidth],
+                    [l['energy'], l['energy']], '-0')
+
+    artists['tags'], artists['guides'], artists['guide_tags'] = [], [], []
+    if annotate:
+        artists['tags'] = [ax.annotate(text, xy=xy, fontsize=font_size)
+                           for text, xy in level_annotations(levels, show_J=show_J, axes_height=axes_height,
+                                                                layout=label_layout)]
+
+        # Manual annotations from original script
+        x1, x2, y_for_label = guide_positions(levels)
+        (y_blue, blue), (y_green, green) = GUIDES
+        artists['guides'] = [ax.plot([x1, x2], [y_blue, y_blue], blue)[0]]
+        artists['guide_tags'] = [ax.annotate('$3p^2$', xy=(x2, y_blue), fontsize=font_size)]
+        artists['guides'].append(ax.plot([x1, x2], [y_green, y_green], green)[0])
+        artists['guide_tags'].append(ax.annotate('nl=9s-20p', xy=(x2, y_for_label), fontsize=font_size))
 
     # plot transitions as arrows (cyan dotted)
-    for t in transitions:
-        try:
-            i = t['i']; f = t['f']
-            ax.arrow(levels[i]['xstart'], levels[i]['energy'],
-                     levels[f]['xstart'] - levels[i]['xstart'],
-                     levels[f]['energy'] - levels[i]['energy'],
-                     head_width=0, head_length=0, linestyle=':', color='cyan')
-        except Exception:
-            # skip transitions that map out of bounds
-            continue
+    if renderer == 'collections':
+        # one collection below the levels, as the arrow patches were (patch zorder 1)
+        artists['transitions'] = ax.add_collection(
+            LineCollection(transition_segments(xs, es, *transition_indices(transitions)),
+                           colors='cyan', linestyles=':', linewidths=mpl.rcParams['patch.linewidth'], zorder=1))
+        ax.autoscale_view()
+    else:
+        for i, f in zip(*transition_indices(transitions)):
+            try:
+                ax.arrow(levels[i]['xstart'], levels[i]['energy'],
+                         levels[f]['xstart'] - levels[i]['xstart'],
+                         levels[f]['energy'] - levels[i]['energy'],
+                         head_width=0, head_length=0, linestyle=':', color='cyan')
+            except Exception:
+                # skip transitions that map out of bounds
+                continue
+    return artists
 
+
+def update_diagram(ax, artists, levels, transitions=None, levels_changed=True, show_J=True, annotate=True,
+                   axes_height=AXES_HEIGHT_PT, label_layout=False):
+    """Update the artists of draw_diagram (collections renderer) in place for new levels/transitions.
+    Only the tags whose text or position changed are touched. transitions=None keeps the drawn lines;
+    show_J, annotate, axes_height and label_layout are those the diagram was drawn with.
+    Returns the number of tags added, changed or removed.
+    """
+    xs = np.fromiter((l['xstart'] for l in levels), dtype=float, count=len(levels))
+    es = np.fromiter((l['energy'] for l in levels), dtype=float, count=len(levels))
+    if transitions is not None:
+        artists['transitions'].set_segments(transition_segments(xs, es, *transition_indices(transitions)))
+    if not levels_changed:
+        return 0
+    artists['levels'].set_segments(level_segments(xs, es, LEVEL_WIDTH))
+
+    touched = 0
+    tags = artists['tags']
+    wanted = []
+    if annotate:
+        wanted = level_annotations(levels, show_J=show_J, axes_height=axes_height, layout=label_layout)
+    for k, (text, xy) in enumerate(wanted):
+        if k < len(tags):
+            if tags[k].get_text() != text or tuple(tags[k].xy) != tuple(xy):
+                tags[k].set_text(text)
+                tags[k].xy = xy
+                touched += 1
+        else:
+            tags.append(ax.annotate(text, xy=xy, fontsize=FONT_SIZE))
+            touched += 1
+    for extra in tags[len(wanted):]:
+        extra.remove()
+        touched += 1
+    del tags[len(wanted):]
+
+    x1, x2, y_for_label = guide_positions(levels)
+    for line in artists['guides']:
+        line.set_xdata([x1, x2])
+    if artists['guide_tags']:
+        artists['guide_tags'][0].xy = (x2, GUIDES[0][0])
+        artists['guide_tags'][1].xy = (x2, y_for_label)
+    ax.relim()
+    ax.autoscale_view()
+    return touched
+
+
+def format_axes(ax):
+    """Term ticks and labels of the original figure."""
     # xticks and labels
     font_axis_size = 12
-    xticks = ['$^3S$','$^3P$','$^3D$','$^3F$','$^3G$','$^3H$','$^3I$','',
-              '$^1S$','$^1P$','$^1D$','$^1F$','$^1G$','$^1H$','$^1I$']
+    xticks = TERM_TICKS
     ax.set_xticks([i for i in range(len(xticks))])
     ax.set_xticklabels(xticks)
-    ax.set_xlim(-1, 13)
-    ax.set_ylabel('Energy ($10^4 \\ cm^{-1}$)', fontsize=font_axis_size)
+    ax.set_xlim(*XLIM)
+    ax.set_ylabel(YLABEL, fontsize=font_axis_size)
     ax.tick_params(axis='x', labelsize=font_axis_size)
-    plt.tight_layout()
+
+
+# matplotlib keeps a single mathtext parser for all figures, which fails when two threads parse at once;
+# every render (the tags and tick labels are mathtext) takes its turn behind this lock
+_RENDER_LOCK = threading.Lock()
+
+
+def rendering_turn():
+    """Context in which to build and save a figure when other threads may be rendering: a lock shared by
+    every render of the process.
+    """
+    return _RENDER_LOCK
+
+
+def render_figure(levels, transitions, renderer='artists', figsize=FIGSIZE, show_J=True, annotate=True,
+                  label_layout=False, fig=None):
+    """The diagram on a new matplotlib Figure with its own Agg canvas (or on fig, e.g. a pyplot figure).
+    No pyplot, rcParams or module state is involved; save the result with fig.savefig. Callers that may
+    run in several threads build and save inside rendering_turn().
+    """
+    if renderer not in ('collections', 'artists'):
+        raise ValueError(f"Unknown renderer: {renderer}")
+    if fig is None:
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        fig = Figure(figsize=figsize)
+        FigureCanvasAgg(fig)
+    ax = fig.subplots()
+    draw_diagram(ax, levels, transitions, renderer=renderer, show_J=show_J, annotate=annotate,
+                 axes_height=axes_height_pt(figsize), label_layout=label_layout)
+    format_axes(ax)
+    fig.tight_layout()
+    return fig
+
+
+def plot_levels_and_transitions(levels, transitions, outpath=None, show=True, renderer='artists',
+                                dpi=DPI, fmt=None, figsize=FIGSIZE, show_J=True, annotate=True, label_layout=False):
+    """Plot the levels and transitions. levels: list of dicts (with xstart, energy, label...).
+    transitions: list of {'i','f'} dicts or the (i, f, unresolved) arrays from resolve_transitions.
+    renderer='artists' (default) keeps the original one ax.plot per level and one ax.arrow per transition;
+    renderer='collections' draws all levels and all transitions as one LineCollection each (faster).
+    renderer='svg' writes outpath (.svg, or .png rasterized with Pillow) directly, without matplotlib.
+    outpath may also be a binary file object, with fmt ('png', 'svg', ...) giving the format.
+    figsize (inches), show_J (J values in the level tags), annotate (tags and guide lines) and
+    label_layout (spread overlapping tags, see level_annotations) apply to every renderer. Saving goes
+    through render_figure inside rendering_turn(), so it may be called from several threads (the renders
+    take turns); only show opens a pyplot window.
+    """
+    to_file = isinstance(outpath, str)
+    options = dict(figsize=figsize, show_J=show_J, annotate=annotate, label_layout=label_layout)
+    if renderer == 'svg':
+        from .svgwriter import write_diagram
+        if not outpath:
+            raise ValueError("renderer='svg' writes a file: give outpath (.svg or .png)")
+        write_diagram(levels, transitions, outpath, dpi=dpi, fmt=fmt, **options)
+        if to_file:
+            print(f"[INFO] Figure saved to {outpath}")
+        return
+    if renderer not in ('collections', 'artists'):
+        raise ValueError(f"Unknown renderer: {renderer}")
 
     if outpath:
-        fig.savefig(outpath, dpi=200)
-        print(f"[INFO] Figure saved to {outpath}")
-    if show and not outpath:
+        with rendering_turn():
+            fig = render_figure(levels, transitions, renderer=renderer, **options)
+            fig.savefig(outpath, dpi=dpi, format=fmt)
+        if to_file:
+            print(f"[INFO] Figure saved to {outpath}")
+    elif show:
+        import matplotlib.pyplot as plt
+        fig = render_figure(levels, transitions, renderer=renderer, fig=plt.figure(figsize=figsize), **options)
         plt.show()
-    plt.close(fig)
+        plt.close(fig)
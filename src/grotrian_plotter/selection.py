@@ -0,0 +1,119 @@
+# src/grotrian_plotter/selection.py
+
+
+class LevelSet:
+    """A level selection kept as sorted, disjoint, inclusive (lo, hi) intervals ('1-25,30' -> 1-25, 30-30).
+    Iterates as the sorted level numbers, so it can stand in for the expanded list; mask() filters an
+    array of level numbers with one binary search per value, and the intervals become BETWEEN
+    predicates in SQL (data_loader.SQL_select), whatever the number of levels selected.
+    Parsing is plain Python (the CLI parses --levs before numpy is imported).
+    """
+
+    def __init__(self, intervals=()):
+        merged = []
+        for a, b in sorted((int(a), int(b)) for a, b in intervals if a <= b):
+            if merged and a <= merged[-1][1] + 1:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], b))
+            else:
+                merged.append((a, b))
+        self.intervals = merged
+        self._bounds = None
+
+    @classmethod
+    def parse(cls, levs):
+        """LevelSet of '1-25,30,35', a LevelSet, a range or an iterable of ints."""
+        if isinstance(levs, cls):
+            return levs
+        if isinstance(levs, range) and levs.step == 1:
+            return cls([(levs.start, levs.stop - 1)])
+        if isinstance(levs, str):
+            intervals = []
+            for p in (p.strip() for p in levs.split(',')):
+                if not p:
+                    continue
+                if '-' in p:
+                    a, b = p.split('-', 1)
+                    intervals.append((int(a), int(b)))
+                else:
+                    intervals.append((int(p), int(p)))
+            return cls(intervals)
+        return cls.from_values(levs)
+
+    @classmethod
+    def from_values(cls, values):
+        """LevelSet of the level numbers in values (any order, duplicates allowed)."""
+        if hasattr(values, 'dtype'):
+            import numpy as np
+            values = np.unique(np.asarray(values, dtype=np.int64))
+            breaks = np.flatnonzero(np.diff(values) != 1)
+            return cls(zip(values[np.r_[0, breaks + 1]].tolist(), values[np.r_[breaks, len(values) - 1]].tolist()))
+        intervals = []
+        for v in sorted(set(int(v) for v in values)):
+            if intervals and v == intervals[-1][1] + 1:
+                intervals[-1][1] = v
+            else:
+                intervals.append([v, v])
+        return cls(intervals)
+
+    @property
+    def starts(self):
+        return self._arrays()[0]
+
+    @property
+    def ends(self):
+        return self._arrays()[1]
+
+    def _arrays(self):
+        if self._bounds is None:
+            import numpy as np
+            iv = np.array(self.intervals, dtype=np.int64).reshape(-1, 2)
+            self._bounds = iv[:, 0].copy(), iv[:, 1].copy()
+        return self._bounds
+
+    def __len__(self):
+        return sum(b - a + 1 for a, b in self.intervals)
+
+    def __bool__(self):
+        return bool(self.intervals)
+
+    def __iter__(self):
+        for a, b in self.intervals:
+            yield from range(a, b + 1)
+
+    def __contains__(self, value):
+        return any(a <= value <= b for a, b in self.intervals)
+
+    def __eq__(self, other):
+        return self.intervals == LevelSet.parse(other).intervals
+
+    def __array__(self, dtype=None, copy=None):
+        return self.to_array() if dtype is None else self.to_array().astype(dtype)
+
+    def __str__(self):
+        return ','.join(str(a) if a == b else f"{a}-{b}" for a, b in self.intervals)
+
+    def __repr__(self):
+        return f"LevelSet('{self}')"
+
+    def to_array(self):
+        """The selected level numbers, sorted (int64)."""
+        import numpy as np
+        starts, ends = self._arrays()
+        counts = ends - starts + 1
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        return np.repeat(starts, counts) + offsets
+
+    def mask(self, values):
+        """Boolean mask of the values (level numbers, any numeric array) inside the selection."""
+        import numpy as np
+        starts, ends = self._arrays()
+        values = np.asarray(values)
+        k = np.searchsorted(starts, values, side='right') - 1
+        inside = k >= 0
+        inside[inside] = values[inside] <= ends[k[inside]]
+        return inside
+
+
+def parse_levs(levs):
+    """Parse '1-25,30,35' or '1-25' or comma-separated list (or a list of ints) into sorted unique ints."""
+    return list(LevelSet.parse(levs))
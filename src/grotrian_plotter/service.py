@@ -0,0 +1,395 @@
+# src/grotrian_plotter/service.py
+"""Long-running local render service: one warm process answering diagram requests over HTTP.
+
+The service keeps matplotlib imported, the parsed tables and built models in a GrotrianSession and
+the last rendered images in memory, so a request costs only what is new in it. It listens on
+localhost (or on a Unix socket) and renders on a bounded thread pool; when all workers are busy and
+the queue is full, requests are refused at once with 503 and a Retry-After header (backpressure).
+
+    python src/cli.py --serve 8765 --file-level ... --file-sublevel ... --file-linefine ...
+    curl 'http://127.0.0.1:8765/render?Z=12&ion=0&levs=1-25&format=svg' -o mgI.svg
+    curl -d '{"Z": 12, "ion": 0, "levs": "1-40", "format": "png", "dpi": 100}' http://127.0.0.1:8765/render
+    curl http://127.0.0.1:8765/stats
+
+Requests: Z, ion, levs (default '1-25'), emin/emax/wlmin/wlmax windows, format (png, svg, pdf), dpi,
+renderer, and optionally files (the three tables, a list or a comma-separated string) or database to
+use another source. Only the source the service was started with and those of allowed_files /
+allowed_databases are accepted; any other path or URL is refused with 400.
+/stats reports the model, selection and image cache hit rates and the latency percentiles.
+
+Images of local tables are keyed by the files' size/mtime, so an edited table is rebuilt. A database
+is not watched: its models and images are kept until POST /invalidate (RenderService.invalidate) drops
+them, so call it after the database changes.
+
+The service binds loopback addresses only; parse_address refuses any other host unless allow_remote.
+"""
+import io
+import os
+import json
+import stat
+import time
+import socket
+import ipaddress
+import threading
+import socketserver
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qsl
+
+import numpy as np
+
+from .data_loader import DEFAULT_DATABASE
+from .selection import LevelSet
+from .session import GrotrianSession, DEFAULT_MAX_BYTES, _rate
+from .plotting import DPI
+
+CONTENT_TYPES = {'png': 'image/png', 'svg': 'image/svg+xml', 'pdf': 'application/pdf'}
+# formats of the matplotlib-free renderer
+SVG_RENDERER_FORMATS = ('png', 'svg')
+RENDERERS = ('collections', 'artists', 'svg')
+MAX_DPI = 1200
+# optional energy (cm^-1) and wavelength windows, see windows.py
+WINDOW_FIELDS = ('emin', 'emax', 'wlmin', 'wlmax')
+# latencies kept for the percentiles
+LATENCY_WINDOW = 1000
+DEFAULT_PORT = 8765
+
+
+class ServiceBusy(Exception):
+    """All workers busy and the queue full: retry later."""
+
+
+def _file_set(files):
+    return tuple(os.path.realpath(f) for f in files)
+
+
+def parse_request(request, renderer='artists', allowed_files=(), allowed_databases=()):
+    """Validated render request (dict, e.g. decoded JSON or query parameters). Raises ValueError.
+    files and database must be one of allowed_files (tables triples) and allowed_databases.
+    """
+    try:
+        req = {'Z': int(request['Z']), 'ion': int(request.get('ion', 0)),
+               'levs': str(LevelSet.parse(str(request.get('levs', '1-25')))),
+               'format': str(request.get('format', 'png')).lower(), 'dpi': int(request.get('dpi', DPI)),
+               'renderer': str(request.get('renderer', renderer))}
+        for name in WINDOW_FIELDS:
+            value = request.get(name)
+            req[name] = None if value in (None, '') else float(value)
+    except KeyError as e:
+        raise ValueError(f"Missing request field: {e}") from None
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Bad request field: {e}") from None
+    if req['format'] not in CONTENT_TYPES:
+        raise ValueError(f"Unknown format: {req['format']} (expected one of {', '.join(CONTENT_TYPES)})")
+    if req['renderer'] not in RENDERERS:
+        raise ValueError(f"Unknown renderer: {req['renderer']}")
+    if req['renderer'] == 'svg' and req['format'] not in SVG_RENDERER_FORMATS:
+        raise ValueError(f"renderer='svg' writes {' or '.join(SVG_RENDERER_FORMATS)}, not {req['format']}")
+    if not 10 <= req['dpi'] <= MAX_DPI:
+        raise ValueError(f"dpi must be in [10, {MAX_DPI}], got {req['dpi']}")
+    files = request.get('files')
+    if isinstance(files, str):
+        files = files.split(',')
+    if files is not None and len(files) != 3:
+        raise ValueError("files must be the Level, Sublevel and LineFine tables")
+    req['files'] = None
+    if files:
+        allowed = {_file_set(f): tuple(f) for f in allowed_files}
+        if _file_set(files) not in allowed:
+            raise ValueError("files are not one of the sources allowed by the service")
+        req['files'] = allowed[_file_set(files)]
+    req['database'] = request.get('database') or None
+    if req['database'] is not None and req['database'] not in allowed_databases:
+        raise ValueError("database is not one of the sources allowed by the service")
+    return req
+
+
+def _percentiles(values):
+    if not values:
+        return {'p50': None, 'p90': None, 'p99': None}
+    p50, p90, p99 = np.percentile(np.asarray(values) * 1e3, [50, 90, 99])
+    return {'p50': float(p50), 'p90': float(p90), 'p99': float(p99)}
+
+
+class RenderService:
+    """Warm GrotrianSession + bounded render pool + cache of rendered images; see the module docstring.
+    workers threads render; up to queue_size more requests wait, the next ones raise ServiceBusy.
+    Requests may name the startup source or one of allowed_files / allowed_databases, nothing else.
+    """
+
+    def __init__(self, files=None, database=DEFAULT_DATABASE, server='Local', workers=4, queue_size=16,
+                 renderer='artists', max_bytes=DEFAULT_MAX_BYTES, output_cache=64, allowed_files=(),
+                 allowed_databases=()):
+        self.session = GrotrianSession(files=files, database=database, server=server, max_bytes=max_bytes)
+        self.renderer = renderer
+        self.allowed_files = ([tuple(files)] if files else []) + [tuple(f) for f in allowed_files]
+        self.allowed_databases = {database, *allowed_databases}
+        self.workers, self.queue_size = workers, queue_size
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='grotrian-render')
+        self._slots = threading.BoundedSemaphore(workers + queue_size)
+        self._lock = threading.Lock()
+        self.outputs = OrderedDict()
+        self.output_cache = output_cache
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.queue_waits = deque(maxlen=LATENCY_WINDOW)
+        self.counts = {'requests': 0, 'ok': 0, 'errors': 0, 'rejected': 0, 'output_hits': 0, 'output_misses': 0,
+                       'invalidations': 0}
+        # bumped by invalidate: renders started before it do not store their image
+        self.generation = 0
+        self.pending = 0
+        self.started = time.time()
+
+    def warm(self):
+        """Import the renderers up front, so the first request does not pay for them."""
+        if self.renderer != 'svg':
+            import matplotlib
+            matplotlib.use('Agg', force=True)
+            import matplotlib.pyplot  # noqa: F401
+        from . import svgwriter  # noqa: F401
+
+    def submit(self, request):
+        """Queue a render request; returns a Future of (bytes, content type). Raises ServiceBusy when full."""
+        req = parse_request(request, self.renderer, self.allowed_files, self.allowed_databases)
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.counts['rejected'] += 1
+            raise ServiceBusy(f"{self.workers} workers busy and {self.queue_size} requests queued")
+        with self._lock:
+            self.counts['requests'] += 1
+            self.pending += 1
+        try:
+            future = self.pool.submit(self._run, req, time.perf_counter())
+        except Exception:
+            self._done()
+            raise
+        future.add_done_callback(lambda _: self._done())
+        return future
+
+    def render(self, request, timeout=None):
+        """submit and wait: (bytes, content type)."""
+        return self.submit(request).result(timeout)
+
+    def _done(self):
+        with self._lock:
+            self.pending -= 1
+        self._slots.release()
+
+    def _run(self, req, t_submit):
+        t_start = time.perf_counter()
+        try:
+            data = self._render(req)
+        except Exception:
+            with self._lock:
+                self.counts['errors'] += 1
+            raise
+        t_end = time.perf_counter()
+        with self._lock:
+            self.counts['ok'] += 1
+            self.latencies.append(t_end - t_submit)
+            self.queue_waits.append(t_start - t_submit)
+        return data, CONTENT_TYPES[req['format']]
+
+    def _render(self, req):
+        source = self.session._source(req['files'], req['database'])
+        # the source key holds the files' size/mtime: an edited table is never served from the cache
+        key = (source.key(), req['Z'], req['ion'], req['levs'], req['format'], req['dpi'], req['renderer']) + \
+            tuple(req[name] for name in WINDOW_FIELDS)
+        with self._lock:
+            if key in self.outputs:
+                self.counts['output_hits'] += 1
+                self.outputs.move_to_end(key)
+                return self.outputs[key]
+            self.counts['output_misses'] += 1
+            generation = self.generation
+        from .plotting import plot_levels_and_transitions
+        levels, transitions = self.session.get(req['Z'], req['ion'], req['levs'], req['files'], req['database'],
+                                               *(req[name] for name in WINDOW_FIELDS))
+        if not levels:
+            raise ValueError(f"No levels for Z={req['Z']}, ion={req['ion']}, levs={req['levs']}")
+        buf = io.BytesIO()
+        kwargs = dict(show=False, renderer=req['renderer'], dpi=req['dpi'], fmt=req['format'])
+        # file output renders on its own Figure (render_figure); matplotlib renders take turns across the
+        # workers (plotting.rendering_turn), the svg renderer does not need to
+        plot_levels_and_transitions(levels, transitions, outpath=buf, **kwargs)
+        data = buf.getvalue()
+        with self._lock:
+            if generation == self.generation:
+                self.outputs[key] = data
+                while len(self.outputs) > self.output_cache:
+                    self.outputs.popitem(last=False)
+        return data
+
+    def invalidate(self):
+        """Drop the cached images and models, e.g. after the database changed; returns how many."""
+        with self._lock:
+            self.generation += 1
+            self.counts['invalidations'] += 1
+            n_outputs = len(self.outputs)
+            self.outputs.clear()
+        n_models = len(self.session.models)
+        self.session.clear()
+        return {'outputs': n_outputs, 'models': n_models}
+
+    def stats(self):
+        with self._lock:
+            counts = dict(self.counts)
+            latencies, waits = list(self.latencies), list(self.queue_waits)
+            pending, n_outputs = self.pending, len(self.outputs)
+            output_bytes = sum(len(v) for v in self.outputs.values())
+        return {'uptime_s': time.time() - self.started, 'workers': self.workers, 'queue_size': self.queue_size,
+                'pending': pending, **counts,
+                'output_hit_rate': _rate(counts['output_hits'], counts['output_misses']),
+                'outputs': n_outputs, 'output_bytes': output_bytes,
+                'session': self.session.stats(),
+                'latency_ms': _percentiles(latencies), 'queue_wait_ms': _percentiles(waits)}
+
+    def close(self):
+        self.pool.shutdown(wait=True)
+
+
+# -----------------------------------------------------------------------------
+# HTTP front end
+# -----------------------------------------------------------------------------
+class _Handler(BaseHTTPRequestHandler):
+    server_version = 'grotrian-plotter'
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path == '/render':
+            self._render(dict(parse_qsl(url.query)))
+        elif url.path == '/stats':
+            self._json(200, self.server.service.stats())
+        elif url.path == '/health':
+            self._json(200, {'ok': True})
+        else:
+            self._json(404, {'error': f"Unknown path: {url.path}"})
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        if url.path == '/invalidate':
+            self._json(200, self.server.service.invalidate())
+            return
+        if url.path != '/render':
+            self._json(404, {'error': f"Unknown path: {url.path}"})
+            return
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+            request = json.loads(self.rfile.read(length) or b'{}')
+            if not isinstance(request, dict):
+                raise ValueError("the body must be a JSON object")
+        except ValueError as e:
+            self._json(400, {'error': f"Bad JSON body: {e}"})
+            return
+        self._render(request)
+
+    def _render(self, request):
+        service = self.server.service
+        try:
+            data, content_type = service.render(request)
+        except ServiceBusy as e:
+            self._json(503, {'error': str(e)}, headers={'Retry-After': '1'})
+        except (ValueError, KeyError, FileNotFoundError) as e:
+            self._json(400, {'error': f"{type(e).__name__}: {e}"})
+        except Exception as e:
+            self._json(500, {'error': f"{type(e).__name__}: {e}"})
+        else:
+            self._send(200, data, content_type)
+
+    def _json(self, status, payload, headers=None):
+        self._send(status, json.dumps(payload).encode(), 'application/json', headers)
+
+    def _send(self, status, data, content_type, headers=None):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def address_string(self):
+        # Unix sockets have no client address
+        return self.client_address[0] if self.client_address else 'unix'
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def server_bind(self):
+        socketserver.UnixStreamServer.server_bind(self)
+        self.server_name, self.server_port = 'localhost', 0
+
+
+class IPv6HTTPServer(ThreadingHTTPServer):
+    address_family = socket.AF_INET6
+
+
+def _remove_socket(path):
+    """Remove the socket file left at path by an earlier server; any other file raises FileExistsError."""
+    try:
+        mode = os.stat(path).st_mode
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(mode):
+        raise FileExistsError(f"{path} exists and is not a socket; not replacing it")
+    os.unlink(path)
+
+
+def make_server(service, host='127.0.0.1', port=DEFAULT_PORT, unix_socket=None, quiet=True):
+    """HTTP server of a RenderService on host:port, or on the Unix socket path unix_socket."""
+    if unix_socket:
+        _remove_socket(unix_socket)
+        httpd = UnixHTTPServer(unix_socket, _Handler)
+    elif ':' in host:
+        httpd = IPv6HTTPServer((host, port), _Handler)
+    else:
+        httpd = ThreadingHTTPServer((host, port), _Handler)
+    httpd.service, httpd.quiet = service, quiet
+    return httpd
+
+
+def serve(service, host='127.0.0.1', port=DEFAULT_PORT, unix_socket=None, quiet=True):
+    """Warm the service and serve until Ctrl-C."""
+    service.warm()
+    httpd = make_server(service, host, port, unix_socket, quiet)
+    where = unix_socket or f"http://{f'[{host}]' if ':' in host else host}:{httpd.server_address[1]}"
+    print(f"[SERVE] listening on {where} ({service.workers} workers, queue {service.queue_size}); Ctrl-C to stop")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+        service.close()
+        if unix_socket:
+            _remove_socket(unix_socket)
+    return service.stats()
+
+
+def _is_loopback(host):
+    if host == 'localhost':
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def parse_address(address, allow_remote=False):
+    """(host, port, unix_socket) of a --serve address: PORT, HOST:PORT ([HOST]:PORT for IPv6) or a socket
+    path. A host other than a loopback address raises ValueError unless allow_remote.
+    """
+    if os.sep in address or address.endswith('.sock'):
+        return None, None, address
+    host, _, port = address.rpartition(':')
+    host = host.removeprefix('[').removesuffix(']') or '127.0.0.1'
+    if not allow_remote and not _is_loopback(host):
+        raise ValueError(f"Refusing to serve on non-loopback host {host} (the service has no authentication); "
+                         "pass --serve-allow-remote to do it anyway")
+    return host, int(port), None
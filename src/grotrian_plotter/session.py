@@ -0,0 +1,342 @@
+# src/grotrian_plotter/session.py
+"""In-process, memoized pipeline for repeated diagrams of the same ions (notebooks, web backends).
+
+A GrotrianSession keeps one SpeciesModel per (source, Z, ion), where the source is either the three
+local files (with their size/mtime) or a database. A model holds the species tables (local files are
+parsed once) and the levels and transitions built so far. When a later selection adds levels
+(e.g. '1-25' then '1-40') only the new levels are parsed and only the lines touching them are
+resolved; the levels already built keep their positions. Any selection inside what is already
+built is answered by slicing, without building anything.
+
+    session = GrotrianSession(files=('data/ModelAtomicIonLevel.dat', 'data/ModelAtomicIonLevelSublevel.dat',
+                                     'data/ModelAtomicIonLineFine.dat'))
+    levels, transitions = session.get(12, 0, '1-25')
+    session.plot(12, 0, '1-40', outpath='mgI.png')
+
+Models are evicted least recently used first once their estimated size exceeds max_bytes.
+"""
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from .data_loader import (DEFAULT_DATABASE, LEVEL_DTYPES, SUBLEVEL_DTYPES, LINEFINE_DTYPES, LEVEL_COLUMNS,
+                          SUBLEVEL_COLUMNS, LINEFINE_COLUMNS, SQL_select, _read_species_table)
+from .building import build_levels_frame, levels_frame_to_list, resolve_transitions
+from .selection import LevelSet
+from .windows import SortedIndex, WindowIndex, has_window, window_masks, level_wavenumbers
+
+DEFAULT_MAX_BYTES = 256 * 1024 ** 2
+# selections memoized per model as (levels, transitions) ready for plotting
+MEMO_SIZE = 8
+# the lines keep their Wavelength for --wlmin/--wlmax windows
+LINEFINE_WAVELENGTH_DTYPES = dict(LINEFINE_DTYPES, Wavelength=float)
+LINEFINE_WAVELENGTH_COLUMNS = LINEFINE_COLUMNS + ['Wavelength']
+
+
+def _lines_array(rows):
+    """(n, 4) int32 [LowerLevel, LowerSublevel, UpperLevel, UpperSublevel], rows with missing values dropped."""
+    return _lines_and_wavelength(rows)[0]
+
+
+def _lines_and_wavelength(rows):
+    """_lines_array and the row-aligned float64 Wavelength of a LineFine DataFrame (NaN without the column)."""
+    wavelength = None
+    if isinstance(rows, pd.DataFrame):
+        if 'Wavelength' in rows.columns:
+            wavelength = rows['Wavelength'].to_numpy(dtype=float)
+        rows = rows.loc[:, LINEFINE_COLUMNS].to_numpy(dtype=float)
+    arr = np.asarray(rows, dtype=float).reshape(-1, 4)
+    if wavelength is None:
+        wavelength = np.full(len(arr), np.nan)
+    valid = np.isfinite(arr).all(axis=1)
+    return arr[valid].astype(np.int32), wavelength[valid]
+
+
+def _rate(hits, misses):
+    return hits / (hits + misses) if hits + misses else None
+
+
+def _frame_nbytes(df):
+    return int(df.memory_usage(index=False, deep=True).sum()) if df is not None else 0
+
+
+class FileSource:
+    """The three local tables; each species is read once (used columns only) and kept in memory."""
+
+    def __init__(self, file_level, file_sublevel, file_linefine):
+        self.files = (file_level, file_sublevel, file_linefine)
+
+    def key(self):
+        from .cache import file_identity
+        return ('files',) + tuple(tuple(sorted(file_identity(f).items())) for f in self.files)
+
+    def open(self, atom, ion):
+        file_level, file_sublevel, file_linefine = self.files
+        levels = _read_species_table(file_level, LEVEL_DTYPES, atom=atom, ion=ion)
+        sublevels = _read_species_table(file_sublevel, SUBLEVEL_DTYPES, atom=atom, ion=ion)
+        lines, wavelength = _lines_and_wavelength(_read_species_table(file_linefine, LINEFINE_WAVELENGTH_DTYPES,
+                                                                      atom=atom, ion=ion))
+        return {'levels': levels, 'sublevels': sublevels, 'lines': lines, 'wavelength': wavelength}
+
+    def fetch_levels(self, tables, new_levs):
+        Levels_SQL, LevelsSub_SQL = tables['levels'], tables['sublevels']
+        return (Levels_SQL[Levels_SQL['LevelNumber'].isin(new_levs)],
+                LevelsSub_SQL[LevelsSub_SQL['LevelNumber'].isin(new_levs)])
+
+    def fetch_lines(self, tables, old_levs, new_levs):
+        lines = tables['lines']
+        low_new, up_new = np.isin(lines[:, 0], new_levs), np.isin(lines[:, 2], new_levs)
+        low_in = low_new | np.isin(lines[:, 0], old_levs)
+        up_in = up_new | np.isin(lines[:, 2], old_levs)
+        wanted = low_in & up_in & (low_new | up_new)
+        return lines[wanted], tables['wavelength'][wanted]
+
+
+class SQLSource:
+    """A database; every growth queries only the rows of the new levels."""
+
+    def __init__(self, database=DEFAULT_DATABASE, server='Local'):
+        self.database, self.server = database, server
+
+    def key(self):
+        return ('sql', self.server, self.database)
+
+    def open(self, atom, ion):
+        return {'atom': atom, 'ion': ion}
+
+    def fetch_levels(self, tables, new_levs):
+        kw = dict(server=self.server, database=self.database, levels=LevelSet.from_values(new_levs),
+                  level_columns=('LevelNumber',), AtomicNumber=tables['atom'], IonCharge=tables['ion'])
+        return (SQL_select('ModelAtomicIonLevel', LEVEL_COLUMNS, **kw),
+                SQL_select('ModelAtomicIonLevelSublevel', SUBLEVEL_COLUMNS, **kw))
+
+    def fetch_lines(self, tables, old_levs, new_levs):
+        kw = dict(server=self.server, database=self.database, AtomicNumber=tables['atom'], IonCharge=tables['ion'])
+        # upper level new (lower old or new) + lower level new with upper old: disjoint, nothing fetched twice
+        new, old = LevelSet.from_values(new_levs), LevelSet.from_values(old_levs)
+        both = LevelSet(new.intervals + old.intervals)
+        up_new, up_wl = _lines_and_wavelength(SQL_select('ModelAtomicIonLineFine', LINEFINE_WAVELENGTH_COLUMNS,
+                                                         levels=new, level_columns=('UpperLevel',), **kw))
+        wanted = both.mask(up_new[:, 0])
+        up_new, up_wl = up_new[wanted], up_wl[wanted]
+        if not old:
+            return up_new, up_wl
+        low_new, low_wl = _lines_and_wavelength(SQL_select('ModelAtomicIonLineFine', LINEFINE_WAVELENGTH_COLUMNS,
+                                                           levels=new, level_columns=('LowerLevel',), **kw))
+        wanted = old.mask(low_new[:, 2])
+        return np.concatenate([up_new, low_new[wanted]]), np.concatenate([up_wl, low_wl[wanted]])
+
+
+class SpeciesModel:
+    """Levels and transitions of one (source, Z, ion), grown incrementally.
+    frame is append-only, so the positions i/f of the lines resolved so far never change.
+    grow and select hold the model's own lock, so only callers of the same species wait for each other.
+    """
+
+    def __init__(self, source, atom, ion):
+        self.source, self.atom, self.ion = source, atom, ion
+        self.tables = None
+        self.lock = threading.RLock()
+        self.size = 0
+        self.levs = np.empty(0, dtype=np.int64)
+        self.frame = None
+        self.lines = np.empty((0, 4), dtype=np.int32)
+        self.wavelength = np.empty(0)
+        self.index = None
+        self.i = np.empty(0, dtype=np.int32)
+        self.f = np.empty(0, dtype=np.int32)
+        self.unresolved = np.empty(0, dtype=bool)
+        self.memo = OrderedDict()
+        self.builds = 0
+        self.memo_hits = 0
+        self.memo_misses = 0
+
+    def grow(self, levs):
+        """Parse the levels of levs not built yet and resolve the lines that touch them."""
+        with self.lock:
+            if self.tables is None:
+                self.tables = self.source.open(self.atom, self.ion)
+            new = self._grow(levs)
+            self.size = self._measure()
+            return new
+
+    def _grow(self, levs):
+        new_levs = np.setdiff1d(levs, self.levs)
+        if not len(new_levs):
+            return 0
+        Levels_SQL, LevelsSub_SQL = self.source.fetch_levels(self.tables, new_levs)
+        new_lines, new_wavelength = self.source.fetch_lines(self.tables, self.levs, new_levs)
+        new_frame = build_levels_frame(Levels_SQL, LevelsSub_SQL)
+        self.frame = new_frame if self.frame is None else pd.concat([self.frame, new_frame], ignore_index=True)
+        i, f, unresolved = resolve_transitions(new_lines, self.frame)
+        # resolve_transitions returns i/f for the resolved rows only; keep one slot per line
+        full_i = np.full(len(new_lines), -1, dtype=np.int32)
+        full_f = np.full(len(new_lines), -1, dtype=np.int32)
+        full_i[~unresolved], full_f[~unresolved] = i, f
+        self.lines = np.concatenate([self.lines, new_lines])
+        self.wavelength = np.concatenate([self.wavelength, new_wavelength])
+        self.index = None
+        self.i = np.concatenate([self.i, full_i])
+        self.f = np.concatenate([self.f, full_f])
+        self.unresolved = np.concatenate([self.unresolved, unresolved])
+        self.levs = np.union1d(self.levs, new_levs)
+        self.builds += 1
+        return len(new_levs)
+
+    def window_index(self):
+        """WindowIndex of the model (energies of its level rows, wavelengths of all its lines), sorted once
+        per growth and reused by every window query.
+        """
+        with self.lock:
+            if self.index is None:
+                self.index = WindowIndex(SortedIndex(level_wavenumbers(self.frame)),
+                                         SortedIndex(self.wavelength))
+            return self.index
+
+    def select(self, levs, emin=None, emax=None, wlmin=None, wlmax=None):
+        """(levels, (i, f, unresolved)) for levs, all of which must be built, restricted to the energy
+        (cm^-1) and wavelength windows; memoized per selection.
+        """
+        levs = LevelSet.parse(levs)
+        with self.lock:
+            result = self._select(levs, emin, emax, wlmin, wlmax)
+            self.size = self._measure()
+            return result
+
+    def _select(self, levs, emin, emax, wlmin, wlmax):
+        memo_key = (str(levs), emin, emax, wlmin, wlmax)
+        if memo_key in self.memo:
+            self.memo_hits += 1
+            self.memo.move_to_end(memo_key)
+            return self.memo[memo_key]
+        self.memo_misses += 1
+        windowed = has_window(emin, emax, wlmin, wlmax)
+        if len(levs) == len(self.levs) and not windowed:
+            frame, keep, new_pos = self.frame, slice(None), None
+        else:
+            rows = levs.mask(self.frame['LevelNumber'].to_numpy(dtype=float))
+            keep = levs.mask(self.lines[:, 0]) & levs.mask(self.lines[:, 2])
+            if windowed:
+                in_energy, in_wavelength = window_masks(self.window_index(), emin, emax, wlmin, wlmax)
+                if in_energy is not None:
+                    rows &= in_energy
+                    # resolved lines need both of their levels kept
+                    resolved = ~self.unresolved
+                    both = self.unresolved.copy()
+                    both[resolved] = rows[self.i[resolved]] & rows[self.f[resolved]]
+                    keep &= both
+                if in_wavelength is not None:
+                    keep &= in_wavelength
+            frame = self.frame[rows].reset_index(drop=True)
+            # position in the model frame -> position in the selection
+            new_pos = (np.cumsum(rows) - 1).astype(np.int32)
+        unresolved = self.unresolved[keep]
+        i, f = self.i[keep][~unresolved], self.f[keep][~unresolved]
+        if new_pos is not None:
+            i, f = new_pos[i], new_pos[f]
+        levels, _ = levels_frame_to_list(frame)
+        result = (levels, (i, f, unresolved))
+        self.memo[memo_key] = result
+        while len(self.memo) > MEMO_SIZE:
+            self.memo.popitem(last=False)
+        return result
+
+    def nbytes(self):
+        """Estimated size as of the last grow/select; read without the lock, so eviction never waits on a build."""
+        return self.size
+
+    def _measure(self):
+        if self.tables is None:
+            return 0
+        tables = sum(_frame_nbytes(v) if isinstance(v, pd.DataFrame) else getattr(v, 'nbytes', 0)
+                     for v in self.tables.values())
+        arrays = self.lines.nbytes + self.wavelength.nbytes + self.i.nbytes + self.f.nbytes + self.unresolved.nbytes
+        if self.index is not None:
+            arrays += 2 * (self.frame.shape[0] + len(self.wavelength)) * 8
+        # memoized level dicts: roughly 1 kB per level
+        memo = sum(1024 * len(levels) for levels, _ in self.memo.values())
+        return tables + _frame_nbytes(self.frame) + arrays + memo
+
+
+class GrotrianSession:
+    """Memoized levels/transitions per (source, Z, ion); see the module docstring.
+    files (a (file_level, file_sublevel, file_linefine) tuple) or database set the default source;
+    get/plot accept either to override it per call. Thread-safe: the session lock only guards the model
+    dict and its counters, each model builds under its own lock, so different species are built concurrently.
+    """
+
+    def __init__(self, files=None, database=DEFAULT_DATABASE, server='Local', max_bytes=DEFAULT_MAX_BYTES):
+        self.files, self.database, self.server = files, database, server
+        self.max_bytes = max_bytes
+        self.models = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def _source(self, files=None, database=None):
+        files = files or (None if database else self.files)
+        if files:
+            return FileSource(*files)
+        return SQLSource(database or self.database, self.server)
+
+    def model(self, Z, ion, levs, files=None, database=None):
+        """The SpeciesModel of (source, Z, ion), grown to cover levs."""
+        source = self._source(files, database)
+        key = (source.key(), int(Z), int(ion))
+        with self._lock:
+            model = self.models.get(key)
+            if model is None:
+                self.misses += 1
+                model = self.models[key] = SpeciesModel(source, int(Z), int(ion))
+            else:
+                self.hits += 1
+            self.models.move_to_end(key)
+        model.grow(levs)
+        self.evict()
+        return model
+
+    def get(self, Z, ion, levs, files=None, database=None, emin=None, emax=None, wlmin=None, wlmax=None):
+        """Return (levels, (i, f, unresolved)) for the selection levs ('1-25', list, range), optionally
+        restricted to an energy window (emin/emax, cm^-1) and a wavelength window (wlmin/wlmax).
+        """
+        levs = LevelSet.parse(levs)
+        return self.model(Z, ion, levs, files, database).select(levs, emin, emax, wlmin, wlmax)
+
+    def plot(self, Z, ion, levs, outpath=None, show=False, files=None, database=None,
+             emin=None, emax=None, wlmin=None, wlmax=None, **plot_kwargs):
+        from .plotting import plot_levels_and_transitions
+        levels, transitions = self.get(Z, ion, levs, files, database, emin, emax, wlmin, wlmax)
+        return plot_levels_and_transitions(levels, transitions, outpath=outpath, show=show, **plot_kwargs)
+
+    def nbytes(self):
+        with self._lock:
+            return sum(m.nbytes() for m in self.models.values())
+
+    def stats(self):
+        """Model and selection cache counters, for monitoring (see service.py)."""
+        with self._lock:
+            models = list(self.models.values())
+            selections = {'hits': sum(m.memo_hits for m in models), 'misses': sum(m.memo_misses for m in models)}
+            return {'models': len(models), 'nbytes': sum(m.nbytes() for m in models),
+                    'builds': sum(m.builds for m in models),
+                    'model_hits': self.hits, 'model_misses': self.misses,
+                    'model_hit_rate': _rate(self.hits, self.misses),
+                    'selection_hits': selections['hits'], 'selection_misses': selections['misses'],
+                    'selection_hit_rate': _rate(selections['hits'], selections['misses'])}
+
+    def evict(self):
+        """Drop least recently used models until the session fits in max_bytes (the newest always stays)."""
+        with self._lock:
+            sizes = {k: m.nbytes() for k, m in self.models.items()}
+            total = sum(sizes.values())
+            for key in list(self.models)[:-1]:
+                if total <= self.max_bytes:
+                    break
+                total -= sizes[key]
+                del self.models[key]
+
+    def clear(self):
+        with self._lock:
+            self.models.clear()
@@ -0,0 +1,378 @@
+# src/grotrian_plotter/svgwriter.py
+"""Direct SVG/PNG writer of the Grotrian diagram (renderer='svg'), without matplotlib.
+
+The figure is only lines and text at known coordinates, so it is laid out once as a display list
+(layout) with the geometry of plotting.plot_levels_and_transitions: same figure size, term columns
+on x, energy axis with automatic ticks, the 6.8275/6.0825 reference lines and the multiplet tags
+of plotting.level_annotations. The display list is then written as SVG text, or rasterized to PNG
+with Pillow (optional dependency, already installed with matplotlib).
+"""
+import io
+import os
+import math
+import importlib.util
+from functools import lru_cache
+from xml.sax.saxutils import escape
+
+import numpy as np
+
+from .plotting import (LEVEL_WIDTH, FONT_SIZE, FIGSIZE, DPI, TERM_TICKS, XLIM, GUIDES, YLABEL, level_annotations,
+                       guide_positions, level_segments, transition_segments, transition_indices, axes_height_pt)
+
+# figure geometry in points (1/72 in), as the tight_layout of the matplotlib figure
+MARGINS = {'left': 44.0, 'right': 8.0, 'top': 8.0, 'bottom': 26.0}
+AXIS_FONT_SIZE = 12
+TICK_FONT_SIZE = 10
+TICK_LENGTH = 3.5
+TICK_PAD = 3.5
+AXES_LINEWIDTH = 0.8
+LEVEL_LINEWIDTH = 1.5
+TRANSITION_LINEWIDTH = 1.0
+# matplotlib ':' pattern, in units of the line width
+DOTTED = (1.0, 1.65)
+Y_MARGIN = 0.05
+TRANSITION_COLOR = (0, 255, 255)
+COLORS = {'black': (0, 0, 0), 'blue': (0, 0, 255), 'green': (0, 128, 0), 'cyan': TRANSITION_COLOR}
+# sub/superscript size and baseline shift, relative to the font size
+SCRIPT_SCALE = 0.7
+SCRIPT_SHIFT = {'normal': 0.0, 'sup': 0.4, 'sub': -0.2}
+
+
+# -----------------------------------------------------------------------------
+# Labels
+# -----------------------------------------------------------------------------
+def text_runs(s):
+    """Split a label with matplotlib math ('4p$_{0,1,2}$', '$3s^2$', 'Energy ($10^4 \\ cm^{-1}$)')
+    into [(text, 'normal' | 'sup' | 'sub', italic)] runs; letters in math are italic, as in mathtext.
+    """
+    runs = []
+    for k, part in enumerate(s.split('$')):
+        if k % 2 == 0:
+            runs.append((part, 'normal', False))
+            continue
+        # mathtext ignores plain spaces; '\ ' is an explicit one
+        part = part.replace('\\ ', '\0').replace(' ', '').replace('\0', ' ').replace('\\', '').replace('-', '−')
+        i = 0
+        while i < len(part):
+            c = part[i]
+            if c in '^_' and i + 1 < len(part):
+                kind = 'sup' if c == '^' else 'sub'
+                if part[i + 1] == '{':
+                    j = part.find('}', i + 2)
+                    j = len(part) if j < 0 else j
+                    runs.extend(_math_runs(part[i + 2:j], kind))
+                    i = j + 1
+                else:
+                    runs.extend(_math_runs(part[i + 1], kind))
+                    i += 2
+            else:
+                j = i + 1
+                while j < len(part) and part[j] not in '^_':
+                    j += 1
+                runs.extend(_math_runs(part[i:j].replace('{', '').replace('}', ''), 'normal'))
+                i = j
+    return [run for run in runs if run[0]]
+
+
+def _math_runs(text, kind):
+    """Runs of math text, split into italic letters and upright everything else."""
+    out = []
+    for ch in text:
+        italic = ch.isalpha()
+        if out and out[-1][2] == italic:
+            out[-1] = (out[-1][0] + ch, kind, italic)
+        else:
+            out.append((ch, kind, italic))
+    return out
+
+
+def nice_ticks(lo, hi, max_ticks=9):
+    """Tick values in [lo, hi] with a 1, 2, 2.5 or 5 x 10^k step (as matplotlib's MaxNLocator)."""
+    span = hi - lo
+    if not span > 0:
+        return np.array([lo])
+    mag = 10 ** math.floor(math.log10(span / (max_ticks - 1)))
+    for m in (1, 2, 2.5, 5, 10):
+        step = m * mag
+        if span / step <= max_ticks - 1:
+            break
+    first = math.ceil(lo / step - 1e-9) * step
+    return np.arange(first, hi + step * 1e-9, step)
+
+
+def tick_labels(ticks):
+    """Shortest fixed-point formatting that shows every tick exactly."""
+    for decimals in range(7):
+        if np.allclose(np.round(ticks, decimals), ticks, rtol=0, atol=1e-9):
+            break
+    return [f"{t:.{decimals}f}".replace('-', '−') if abs(t) > 1e-12 else f"{0:.{decimals}f}"
+            for t in ticks]
+
+
+# -----------------------------------------------------------------------------
+# Display list
+# -----------------------------------------------------------------------------
+def layout(levels, transitions, figsize=FIGSIZE, show_J=True, annotate=True, label_layout=False):
+    """Display list of the diagram in points (y down): figure size, axes box, segment arrays of the
+    transitions / levels / guides / ticks and the texts, all in drawing order. show_J, annotate and
+    label_layout as in plotting.draw_diagram.
+    """
+    width, height = figsize[0] * 72, figsize[1] * 72
+    ax0, ax1 = MARGINS['left'], width - MARGINS['right']
+    ay0, ay1 = MARGINS['top'], height - MARGINS['bottom']
+
+    xs = np.fromiter((l['xstart'] for l in levels), dtype=float, count=len(levels))
+    es = np.fromiter((l['energy'] for l in levels), dtype=float, count=len(levels))
+    x1, x2, y_for_label = guide_positions(levels)
+    ys = np.concatenate([es, [g[0] for g in GUIDES] if annotate else []])
+    ylo, yhi = float(np.nanmin(ys)), float(np.nanmax(ys))
+    pad = (yhi - ylo) * Y_MARGIN or 0.5
+    ylim = (ylo - pad, yhi + pad)
+
+    def to_pt(seg):
+        out = np.empty_like(seg, dtype=float)
+        out[..., 0] = ax0 + (seg[..., 0] - XLIM[0]) / (XLIM[1] - XLIM[0]) * (ax1 - ax0)
+        out[..., 1] = ay1 - (seg[..., 1] - ylim[0]) / (ylim[1] - ylim[0]) * (ay1 - ay0)
+        return out
+
+    def visible(x, y):
+        # matplotlib draws data-anchored annotations only when the anchor is inside the axes
+        return XLIM[0] <= x <= XLIM[1] and ylim[0] <= y <= ylim[1]
+
+    texts = []
+    tags = level_annotations(levels, show_J=show_J, axes_height=axes_height_pt(figsize),
+                             layout=label_layout) if annotate else []
+    for text, (x, y) in tags:
+        if visible(x, y):
+            (px, py), = to_pt(np.array([[x, y]]))
+            texts.append({'text': text, 'x': px, 'y': py, 'size': FONT_SIZE, 'ha': 'left', 'va': 'baseline'})
+    (y_blue, blue), (y_green, green) = GUIDES
+    guide_tags = (('$3p^2$', x2, y_blue), ('nl=9s-20p', x2, y_for_label)) if annotate else ()
+    for text, x, y in guide_tags:
+        if visible(x, y):
+            (px, py), = to_pt(np.array([[x, y]]))
+            texts.append({'text': text, 'x': px, 'y': py, 'size': FONT_SIZE, 'ha': 'left', 'va': 'baseline'})
+
+    # ticks: x on the term columns inside the x limits, y automatic
+    xticks = [(k, label) for k, label in enumerate(TERM_TICKS) if XLIM[0] <= k <= XLIM[1]]
+    yticks = nice_ticks(*ylim)
+    tick_segs = []
+    for k, label in xticks:
+        px = to_pt(np.array([[k, ylim[0]]]))[0, 0]
+        tick_segs.append([[px, ay1], [px, ay1 + TICK_LENGTH]])
+        texts.append({'text': label, 'x': px, 'y': ay1 + TICK_LENGTH + TICK_PAD, 'size': AXIS_FONT_SIZE,
+                      'ha': 'center', 'va': 'top'})
+    for value, label in zip(yticks, tick_labels(yticks)):
+        py = to_pt(np.array([[XLIM[0], value]]))[0, 1]
+        tick_segs.append([[ax0, py], [ax0 - TICK_LENGTH, py]])
+        texts.append({'text': label, 'x': ax0 - TICK_LENGTH - TICK_PAD, 'y': py, 'size': TICK_FONT_SIZE,
+                      'ha': 'right', 'va': 'center'})
+    texts.append({'text': YLABEL, 'x': AXIS_FONT_SIZE * 0.9, 'y': (ay0 + ay1) / 2, 'size': AXIS_FONT_SIZE,
+                  'ha': 'center', 'va': 'center', 'rotation': 90})
+
+    i, f = transition_indices(transitions)
+    return {
+        'width': width, 'height': height, 'axes': (ax0, ay0, ax1, ay1),
+        'transitions': to_pt(transition_segments(xs, es, i, f)),
+        'levels': to_pt(level_segments(xs, es, LEVEL_WIDTH)),
+        'guides': [(to_pt(np.array([[[x1, y_blue], [x2, y_blue]]])), blue),
+                   (to_pt(np.array([[[x1, y_green], [x2, y_green]]])), green)] if annotate else [],
+        'ticks': np.array(tick_segs, dtype=float).reshape(-1, 2, 2),
+        'texts': texts,
+    }
+
+
+# -----------------------------------------------------------------------------
+# SVG
+# -----------------------------------------------------------------------------
+def _path_data(segs):
+    """'M x y L x y ...' of an (n, 2, 2) segment array."""
+    if not len(segs):
+        return ''
+    buf = io.StringIO()
+    np.savetxt(buf, segs.reshape(-1, 4), fmt='M%.2f %.2fL%.2f %.2f', newline='')
+    return buf.getvalue()
+
+
+def _svg_text(t):
+    size = t['size']
+    baseline = t['y'] + {'baseline': 0.0, 'center': 0.35 * size, 'top': 0.8 * size}[t['va']]
+    anchor = {'left': 'start', 'center': 'middle', 'right': 'end'}[t['ha']]
+    spans, shift = [], 0.0
+    for text, kind, italic in text_runs(t['text']):
+        new_shift = SCRIPT_SHIFT[kind] * size
+        dy = shift - new_shift
+        shift = new_shift
+        attrs = f' dy="{dy:.2f}"' if dy else ''
+        if kind != 'normal':
+            attrs += f' font-size="{size * SCRIPT_SCALE:.2f}"'
+        if italic:
+            attrs += ' font-style="italic"'
+        spans.append(f'<tspan{attrs}>{escape(text)}</tspan>')
+    rotate = ''
+    if t.get('rotation'):
+        rotate = f' transform="rotate({-t["rotation"]} {t["x"]:.2f} {t["y"]:.2f})"'
+        baseline = t['y'] + 0.35 * size
+    return (f'<text x="{t["x"]:.2f}" y="{baseline:.2f}" font-size="{size}" text-anchor="{anchor}"{rotate}>'
+            + ''.join(spans) + '</text>')
+
+
+def render_svg(display):
+    """SVG document (str) of a layout() display list."""
+    w, h = display['width'], display['height']
+    ax0, ay0, ax1, ay1 = display['axes']
+    lw = TRANSITION_LINEWIDTH
+    out = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{w:.2f}pt" height="{h:.2f}pt" '
+        f'viewBox="0 0 {w:.2f} {h:.2f}" font-family="DejaVu Sans, Bitstream Vera Sans, sans-serif">',
+        f'<defs><clipPath id="axes"><rect x="{ax0:.2f}" y="{ay0:.2f}" width="{ax1 - ax0:.2f}" '
+        f'height="{ay1 - ay0:.2f}"/></clipPath></defs>',
+        f'<rect width="100%" height="100%" fill="white"/>',
+        f'<path d="{_path_data(display["transitions"])}" fill="none" stroke="cyan" stroke-width="{lw}" '
+        f'stroke-dasharray="{DOTTED[0] * lw} {DOTTED[1] * lw}" clip-path="url(#axes)"/>',
+        f'<path d="{_path_data(display["levels"])}" fill="none" stroke="black" stroke-width="{LEVEL_LINEWIDTH}" '
+        f'stroke-linecap="square" clip-path="url(#axes)"/>',
+    ]
+    for seg, color in display['guides']:
+        out.append(f'<path d="{_path_data(seg)}" fill="none" stroke="{color}" stroke-width="{LEVEL_LINEWIDTH}" '
+                   f'stroke-linecap="square" clip-path="url(#axes)"/>')
+    out.append(f'<rect x="{ax0:.2f}" y="{ay0:.2f}" width="{ax1 - ax0:.2f}" height="{ay1 - ay0:.2f}" fill="none" '
+               f'stroke="black" stroke-width="{AXES_LINEWIDTH}"/>')
+    out.append(f'<path d="{_path_data(display["ticks"])}" stroke="black" stroke-width="{AXES_LINEWIDTH}"/>')
+    out.extend(_svg_text(t) for t in display['texts'])
+    out.append('</svg>\n')
+    return '\n'.join(out)
+
+
+# -----------------------------------------------------------------------------
+# PNG (Pillow)
+# -----------------------------------------------------------------------------
+@lru_cache(maxsize=None)
+def _font_path(name):
+    """A DejaVu font file as shipped with matplotlib (located without importing it), else the bare name."""
+    spec = importlib.util.find_spec('matplotlib')
+    if spec is not None and spec.origin:
+        path = os.path.join(os.path.dirname(spec.origin), 'mpl-data', 'fonts', 'ttf', name)
+        if os.path.exists(path):
+            return path
+    return name
+
+
+@lru_cache(maxsize=64)
+def _font(size_px, italic=False):
+    from PIL import ImageFont
+    try:
+        return ImageFont.truetype(_font_path('DejaVuSans-Oblique.ttf' if italic else 'DejaVuSans.ttf'), size_px)
+    except OSError:
+        pass
+    try:
+        return ImageFont.load_default(size_px)
+    except TypeError:  # Pillow < 10.1: the fixed-size bitmap font only
+        return ImageFont.load_default()
+
+
+def _rasterize_dotted(img, segs, width_px, period_px, on_px, color, box, chunk=2_000_000):
+    """Draw dotted segments (pixels) into an (h, w, 3) uint8 array, clipped to box, vectorized."""
+    if not len(segs):
+        return
+    x0, y0, x1, y1 = box
+    h, w = img.shape[:2]
+    lengths = np.hypot(segs[:, 1, 0] - segs[:, 0, 0], segs[:, 1, 1] - segs[:, 0, 1])
+    counts = np.ceil(lengths).astype(np.int64) + 1
+    offsets = np.arange(-(int(width_px) // 2), int(width_px) - int(width_px) // 2)
+    # pixels hit are collected in one mask and colored once at the end
+    hit = np.zeros(h * w, dtype=bool)
+    start = 0
+    while start < len(segs):
+        # as many segments as fit in chunk samples
+        stop = start + max(1, int(np.searchsorted(np.cumsum(counts[start:]), chunk)))
+        n = counts[start:stop]
+        seg_of = np.repeat(np.arange(start, stop), n)
+        step = np.arange(n.sum()) - np.repeat(np.cumsum(n) - n, n)
+        on = (step % period_px) < on_px
+        seg_of, step = seg_of[on], step[on]
+        t = np.minimum(step / np.maximum(lengths[seg_of], 1e-9), 1.0)
+        xs = np.rint(segs[seg_of, 0, 0] + t * (segs[seg_of, 1, 0] - segs[seg_of, 0, 0])).astype(np.int64)
+        ys = np.rint(segs[seg_of, 0, 1] + t * (segs[seg_of, 1, 1] - segs[seg_of, 0, 1])).astype(np.int64)
+        for dx in offsets:
+            for dy in offsets:
+                xi, yi = xs + dx, ys + dy
+                inside = (xi >= x0) & (xi < x1) & (yi >= y0) & (yi < y1)
+                hit[yi[inside] * w + xi[inside]] = True
+        start = stop
+    img.reshape(h * w, -1)[hit] = color
+
+
+def _draw_text(img, draw, t, scale):
+    from PIL import Image, ImageDraw
+    size = t['size'] * scale
+    runs = [(text, kind, _font(max(1, round(size * (1 if kind == 'normal' else SCRIPT_SCALE))), italic))
+            for text, kind, italic in text_runs(t['text'])]
+    widths = [draw.textlength(text, font=font) for text, _, font in runs]
+    total = sum(widths)
+    if t.get('rotation'):
+        # draw horizontally on a transparent tile, then rotate and paste
+        pad = int(size)
+        tile = Image.new('RGBA', (int(total) + 2 * pad, int(2.5 * size)), (255, 255, 255, 0))
+        _draw_runs(ImageDraw.Draw(tile), runs, widths, pad, 1.6 * size, size)
+        tile = tile.rotate(t['rotation'], expand=True)
+        img.paste(tile, (int(t['x'] * scale - tile.width / 2), int(t['y'] * scale - tile.height / 2)), tile)
+        return
+    x = t['x'] * scale - {'left': 0, 'center': total / 2, 'right': total}[t['ha']]
+    y = t['y'] * scale + {'baseline': 0.0, 'center': 0.35 * size, 'top': 0.8 * size}[t['va']]
+    _draw_runs(draw, runs, widths, x, y, size)
+
+
+def _draw_runs(draw, runs, widths, x, baseline, size):
+    for (text, kind, font), w in zip(runs, widths):
+        draw.text((x, baseline - SCRIPT_SHIFT[kind] * size), text, font=font, fill=(0, 0, 0), anchor='ls')
+        x += w
+
+
+def render_png(display, dpi=DPI):
+    """Rasterize a layout() display list to a PIL image at dpi."""
+    try:
+        from PIL import Image, ImageDraw
+    except ImportError as e:
+        raise ImportError("PNG output of renderer='svg' needs Pillow; write a .svg file instead") from e
+    scale = dpi / 72
+    w, h = int(round(display['width'] * scale)), int(round(display['height'] * scale))
+    box = tuple(int(round(v * scale)) for v in display['axes'])
+    pixels = np.full((h, w, 3), 255, dtype=np.uint8)
+    lw = TRANSITION_LINEWIDTH * scale
+    _rasterize_dotted(pixels, display['transitions'] * scale, max(1, round(lw)), (DOTTED[0] + DOTTED[1]) * lw,
+                      DOTTED[0] * lw, TRANSITION_COLOR, (box[0], box[1], box[2], box[3]))
+    img = Image.fromarray(pixels)
+    draw = ImageDraw.Draw(img)
+    level_w = max(1, round(LEVEL_LINEWIDTH * scale))
+    clip = np.array([[box[0], box[1]], [box[2], box[3]]], dtype=float)
+    for segs, color in [(display['levels'], 'black')] + [(seg, c) for seg, c in display['guides']]:
+        for (xa, ya), (xb, yb) in np.clip(segs * scale, clip[0], clip[1]):
+            draw.line([(xa, ya), (xb, yb)], fill=COLORS[color], width=level_w)
+    axes_w = max(1, round(AXES_LINEWIDTH * scale))
+    draw.rectangle(box, outline=(0, 0, 0), width=axes_w)
+    for (xa, ya), (xb, yb) in display['ticks'] * scale:
+        draw.line([(xa, ya), (xb, yb)], fill=(0, 0, 0), width=axes_w)
+    for t in display['texts']:
+        _draw_text(img, draw, t, scale)
+    return img
+
+
+def write_diagram(levels, transitions, outpath, dpi=DPI, fmt=None, figsize=FIGSIZE, show_J=True, annotate=True,
+                  label_layout=False):
+    """Write the diagram to outpath: SVG for .svg, otherwise PNG (or any Pillow format) at dpi.
+    outpath may be a binary file object; fmt ('svg', 'png', ...) then gives the format.
+    """
+    display = layout(levels, transitions, figsize, show_J, annotate, label_layout)
+    is_path = isinstance(outpath, str)
+    if (fmt or '').lower() == 'svg' or (fmt is None and is_path and outpath.lower().endswith('.svg')):
+        data = render_svg(display).encode('utf-8')
+        if is_path:
+            with open(outpath, 'wb') as fh:
+                fh.write(data)
+        else:
+            outpath.write(data)
+    else:
+        # a path without fmt: Pillow picks the format from the extension
+        render_png(display, dpi).save(outpath, format=fmt or (None if is_path else 'png'), dpi=(dpi, dpi))
+    return outpath
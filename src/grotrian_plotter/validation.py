@@ -0,0 +1,144 @@
+# src/grotrian_plotter/validation.py
+"""Integrity checks of the Level / Sublevel / LineFine tables, run once over whole columns.
+
+    report = check_tables(Levels_SQL, LevelsSub_SQL, DB_transitions, mode='lenient')
+    report.counts()   # {'duplicate_sublevels': 0, 'dangling_transitions': 12, ...}
+
+Each check is one vectorized pass (duplicated keys, isin on packed level keys, to_numeric) and the
+report keeps the number of offending rows plus the first few of them, so a broken table with
+millions of bad rows costs one warning, not millions. mode='strict' raises IntegrityError instead;
+the builders then only ever see tables that passed, and never diagnose rows one by one.
+"""
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from .building import _level_keys, transitions_array, TRANSITION_COLUMNS
+from .metrics import stage
+
+VALIDATION_MODES = ('lenient', 'strict')
+SUBLEVEL_KEY = ['LevelNumber', 'SublevelNumber']
+# offending rows kept per check
+SAMPLE_ROWS = 5
+
+
+class IntegrityError(ValueError):
+    """Raised by check_tables in strict mode; .report is the ValidationReport."""
+
+    def __init__(self, report):
+        super().__init__(f"Table integrity check failed: {report}")
+        self.report = report
+
+
+class ValidationReport:
+    """Counts and sample rows of each failed check (checks that passed are recorded with count 0)."""
+
+    def __init__(self, sample=SAMPLE_ROWS):
+        self.sample = sample
+        self.checks = {}
+
+    def add(self, name, frame, bad):
+        """Record check name over frame: bad is a boolean mask of its offending rows."""
+        bad = np.asarray(bad, dtype=bool)
+        rows = np.flatnonzero(bad)[:self.sample]
+        self.checks[name] = {'count': int(bad.sum()), 'sample': frame.iloc[rows].to_dict('records')}
+
+    @classmethod
+    def from_counts(cls, counts):
+        """Report of stored counts (e.g. those of a cache entry), without sample rows."""
+        report = cls()
+        report.checks = {name: {'count': int(n), 'sample': []} for name, n in counts.items()}
+        return report
+
+    @property
+    def ok(self):
+        return not any(c['count'] for c in self.checks.values())
+
+    def counts(self):
+        return {name: c['count'] for name, c in self.checks.items()}
+
+    def to_dict(self):
+        return {'ok': self.ok, 'checks': self.checks}
+
+    def __str__(self):
+        failed = [f"{c['count']} {name}" for name, c in self.checks.items() if c['count']]
+        return ', '.join(failed) if failed else 'ok'
+
+
+def validate_tables(Levels_SQL, LevelsSub_SQL, DB_transitions=None, sample=SAMPLE_ROWS):
+    """Run every check and return the ValidationReport:
+    missing_columns, duplicate_sublevels (repeated (LevelNumber, SublevelNumber), first row not counted),
+    bad_energy (non-numeric ExcitationWaven), missing_level (sublevels whose LevelNumber is not in
+    Levels_SQL), missing_config (levels used by sublevels with neither FullConfig nor ElectronConfig)
+    and, with DB_transitions, dangling_transitions (rows with an endpoint that is not a sublevel, or
+    non-numeric).
+    """
+    report = ValidationReport(sample)
+    needed = SUBLEVEL_KEY + ['2J', 'ExcitationWaven']
+    missing = [c for c in needed if c not in LevelsSub_SQL.columns]
+    missing += [c for c in ['LevelNumber'] if c not in Levels_SQL.columns]
+    report.add('missing_columns', pd.DataFrame({'column': missing}), np.ones(len(missing), dtype=bool))
+    if missing:
+        return report
+
+    sub = LevelsSub_SQL.reset_index(drop=True)
+    report.add('duplicate_sublevels', sub, sub.duplicated(SUBLEVEL_KEY).to_numpy())
+    raw_e = sub['ExcitationWaven']
+    report.add('bad_energy', sub, (pd.to_numeric(raw_e, errors='coerce').isna() & raw_e.notna()).to_numpy())
+
+    levels = Levels_SQL.reset_index(drop=True)
+    lev_numbers = pd.to_numeric(levels['LevelNumber'], errors='coerce')
+    report.add('missing_level', sub, ~sub['LevelNumber'].isin(lev_numbers).to_numpy())
+
+    configs = [c for c in ('FullConfig', 'ElectronConfig') if c in levels.columns]
+    no_config = np.ones(len(levels), dtype=bool)
+    for c in configs:
+        text = levels[c].astype(object)
+        no_config &= ~(text.map(lambda v: isinstance(v, str)).to_numpy() & (text.str.strip() != '').to_numpy())
+    report.add('missing_config', levels, no_config & lev_numbers.isin(sub['LevelNumber']).to_numpy())
+
+    if DB_transitions is not None:
+        rows = transitions_array(DB_transitions)
+        valid = np.isfinite(rows).all(axis=1) if rows.dtype.kind == 'f' else np.ones(len(rows), dtype=bool)
+        safe = np.where(valid[:, None], rows, 0).astype(np.int64)
+        sub_keys = _level_keys(pd.to_numeric(sub['LevelNumber'], errors='coerce').fillna(-1).to_numpy(),
+                               pd.to_numeric(sub['SublevelNumber'], errors='coerce').fillna(-1).to_numpy())
+        found = np.isin(_level_keys(safe[:, 0], safe[:, 1]), sub_keys) & \
+            np.isin(_level_keys(safe[:, 2], safe[:, 3]), sub_keys)
+        report.add('dangling_transitions', pd.DataFrame(rows, columns=TRANSITION_COLUMNS), ~(valid & found))
+    return report
+
+
+def check_tables(Levels_SQL, LevelsSub_SQL, DB_transitions=None, mode='lenient', sample=SAMPLE_ROWS):
+    """validate_tables, then act on the report: 'lenient' warns once with the summary, 'strict' raises
+    IntegrityError. Returns the report.
+    """
+    _check_mode(mode)
+    return enforce(validate_tables(Levels_SQL, LevelsSub_SQL, DB_transitions, sample), mode)
+
+
+def _check_mode(mode):
+    if mode not in VALIDATION_MODES:
+        raise ValueError(f"Unknown validation mode: {mode} (expected one of {VALIDATION_MODES})")
+
+
+def enforce(report, mode):
+    """Act on a failed report as check_tables does: 'lenient' warns, 'strict' raises. Returns the report."""
+    _check_mode(mode)
+    if not report.ok:
+        if mode == 'strict':
+            raise IntegrityError(report)
+        warnings.warn(f"Table integrity: {report}")
+    return report
+
+
+def validation_stage(metrics, mode, Levels_SQL, LevelsSub_SQL, DB_transitions=None):
+    """check_tables as the 'validate' stage of metrics (its issue counts recorded); None mode skips it."""
+    if mode is None:
+        return None
+    n_lines = 0 if DB_transitions is None else len(DB_transitions)
+    with stage(metrics, 'validate', rows_in=len(LevelsSub_SQL) + n_lines) as rec:
+        report = check_tables(Levels_SQL, LevelsSub_SQL, DB_transitions, mode=mode)
+        rec['issues'] = report.counts()
+    return report
@@ -0,0 +1,218 @@
+# src/grotrian_plotter/watch.py
+"""Watch mode: keep the model and the figure alive and re-render when an input table changes.
+
+DiagramWatcher polls the size/mtime of the three local tables. When one changes only that table is
+re-read; for the Level/Sublevel tables only the levels whose rows changed are rebuilt (the others
+keep their built rows) and only the lines touching them are resolved again. With the collections
+renderer the existing figure's collections and tags are updated in place; the artists renderer draws
+the figure again and the svg renderer writes outpath again, without matplotlib.
+"""
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from .data_loader import (LEVEL_DTYPES, SUBLEVEL_DTYPES, READ_CHUNKSIZE, _levs_filter, _read_species_table,
+                          fetch_transitions)
+from .building import build_levels_frame, levels_frame_to_list, resolve_transitions, _level_keys
+from .selection import LevelSet
+
+
+def _stat(path):
+    st = os.stat(path)
+    return st.st_size, st.st_mtime_ns
+
+
+def changed_levels(old, new):
+    """LevelNumbers whose rows differ between two versions of a Level or Sublevel table.
+    The rows of each LevelNumber are compared in table order (duplicated rows included), floats up to
+    rounding and missing values as equal.
+    """
+    old = old.assign(_row=old.groupby('LevelNumber').cumcount())
+    new = new.assign(_row=new.groupby('LevelNumber').cumcount())
+    both = old.merge(new, on=['LevelNumber', '_row'], how='outer', suffixes=('_old', '_new'), indicator=True)
+    differs = (both['_merge'] != 'both').to_numpy().copy()
+    for col in old.columns.drop(['LevelNumber', '_row']):
+        a, b = both[col + '_old'], both[col + '_new']
+        if pd.api.types.is_float_dtype(a) and pd.api.types.is_float_dtype(b):
+            same = np.isclose(a.to_numpy(), b.to_numpy(), rtol=1e-12, atol=0, equal_nan=True)
+        else:
+            same = ((a == b) | (a.isna() & b.isna())).to_numpy()
+        differs |= ~same
+    return np.unique(both['LevelNumber'].to_numpy(dtype=np.int64)[differs])
+
+
+class DiagramWatcher:
+    """Model and figure of one (Z, ion, levs) diagram from local files; see the module docstring."""
+
+    def __init__(self, atom, ion, levs, file_level, file_sublevel, file_linefine, outpath=None, show=False,
+                 renderer='collections', show_J=True, annotate=True, label_layout=False):
+        if renderer not in ('collections', 'artists', 'svg'):
+            raise ValueError(f"Unknown renderer: {renderer}")
+        if renderer == 'svg' and (show or not outpath):
+            raise ValueError("renderer='svg' writes a file: give outpath (.svg or .png) and no show")
+        self.atom, self.ion, self.levs = atom, ion, LevelSet.parse(levs)
+        self.files = {'level': file_level, 'sublevel': file_sublevel, 'linefine': file_linefine}
+        self.outpath, self.show, self.renderer = outpath, show, renderer
+        self.options = dict(show_J=show_J, annotate=annotate, label_layout=label_layout)
+        self.stats = {name: _stat(path) for name, path in self.files.items()}
+        self.tables = {name: self._read(name) for name in self.files}
+        self.frame = build_levels_frame(self.tables['level'], self.tables['sublevel'])
+        self._resolve_all()
+        self.levels, _ = levels_frame_to_list(self.frame)
+        self.fig = self.ax = self.artists = None
+
+    # --- tables ---
+    def _read(self, name):
+        path = self.files[name]
+        if name == 'linefine':
+            # only the lines between selected levels, streamed
+            return fetch_transitions(None, self.atom, self.ion, '', file_linefine=path, levs=self.levs,
+                                     chunksize=READ_CHUNKSIZE)
+        dtypes = LEVEL_DTYPES if name == 'level' else SUBLEVEL_DTYPES
+        return _read_species_table(path, dtypes, row_filter=_levs_filter(self.levs, self.atom, self.ion),
+                                   atom=self.atom, ion=self.ion)
+
+    def _resolve_all(self):
+        lines = self.tables['linefine']
+        i, f, unresolved = resolve_transitions(lines, self.frame)
+        # one slot per line (-1 when unresolved), so positions can be remapped in place
+        self.i = np.full(len(lines), -1, dtype=np.int32)
+        self.f = np.full(len(lines), -1, dtype=np.int32)
+        self.i[~unresolved], self.f[~unresolved] = i, f
+        self.unresolved = unresolved
+
+    @property
+    def transitions(self):
+        return self.i[~self.unresolved], self.f[~self.unresolved], self.unresolved
+
+    def poll(self):
+        """Names of the tables whose file changed since the last poll."""
+        changed = []
+        for name, path in self.files.items():
+            try:
+                st = _stat(path)
+            except OSError:  # being replaced by an editor
+                continue
+            if st != self.stats[name]:
+                self.stats[name] = st
+                changed.append(name)
+        return changed
+
+    def refresh(self, changed):
+        """Re-read the changed tables and update the model. Returns a summary dict."""
+        t0 = time.perf_counter()
+        summary = {'tables': list(changed), 'levels_rebuilt': 0, 'lines_resolved': 0}
+        affected = np.empty(0, dtype=np.int64)
+        for name in ('level', 'sublevel'):
+            if name in changed:
+                new = self._read(name)
+                affected = np.union1d(affected, changed_levels(self.tables[name], new))
+                self.tables[name] = new
+        if 'linefine' in changed:
+            self.tables['linefine'] = self._read('linefine')
+            if len(affected):
+                self._rebuild_levels(affected, resolve=False)
+            self._resolve_all()
+            summary['lines_resolved'] = len(self.unresolved)
+        elif len(affected):
+            summary['lines_resolved'] = self._rebuild_levels(affected)
+        summary['levels_rebuilt'] = len(affected)
+        if len(affected):
+            self.levels, _ = levels_frame_to_list(self.frame)
+        summary['seconds'] = time.perf_counter() - t0
+        return summary
+
+    def _rebuild_levels(self, affected, resolve=True):
+        """Rebuild the rows of the affected LevelNumbers and keep the frame in Sublevel-table order.
+        Lines not touching them are remapped to the new positions; the others are resolved again.
+        """
+        Levels_SQL, LevelsSub_SQL = self.tables['level'], self.tables['sublevel']
+        keep = ~self.frame['LevelNumber'].isin(affected).to_numpy()
+        rebuilt = build_levels_frame(Levels_SQL[Levels_SQL['LevelNumber'].isin(affected)],
+                                     LevelsSub_SQL[LevelsSub_SQL['LevelNumber'].isin(affected)])
+        combined = pd.concat([self.frame[keep], rebuilt], ignore_index=True)
+        # order of a fresh build: the order of the sublevel rows
+        sub_keys = pd.Index(_level_keys(LevelsSub_SQL['LevelNumber'], LevelsSub_SQL['SublevelNumber']))
+        rank = sub_keys.drop_duplicates().get_indexer(_level_keys(combined['LevelNumber'], combined['SublevelNumber']))
+        order = np.argsort(rank, kind='stable')
+        self.frame = combined.iloc[order].reset_index(drop=True)
+        if not resolve:
+            return 0
+        inverse = np.empty(len(order), dtype=np.int32)
+        inverse[order] = np.arange(len(order), dtype=np.int32)
+        new_pos = np.full(len(keep), -1, dtype=np.int32)
+        new_pos[np.flatnonzero(keep)] = inverse[:int(keep.sum())]
+
+        lines = self.tables['linefine']
+        touch = np.isin(lines[:, 0], affected) | np.isin(lines[:, 2], affected)
+        old = ~touch & ~self.unresolved
+        self.i[old], self.f[old] = new_pos[self.i[old]], new_pos[self.f[old]]
+        i, f, unresolved = resolve_transitions(lines[touch], self.frame)
+        ti, tf = np.full(int(touch.sum()), -1, dtype=np.int32), np.full(int(touch.sum()), -1, dtype=np.int32)
+        ti[~unresolved], tf[~unresolved] = i, f
+        self.i[touch], self.f[touch] = ti, tf
+        self.unresolved[touch] = unresolved
+        return int(touch.sum())
+
+    # --- figure ---
+    def render(self):
+        """Draw the figure the first time, then update it (see the module docstring); save to outpath."""
+        if self.renderer == 'svg':
+            from .svgwriter import write_diagram
+            write_diagram(self.levels, self.transitions, self.outpath, **self.options)
+            return
+        import matplotlib.pyplot as plt
+        from .plotting import draw_diagram, update_diagram, format_axes, FIGSIZE, DPI
+        if self.fig is None:
+            self.fig = plt.figure(figsize=FIGSIZE)
+        if self.renderer == 'collections' and self.artists is not None:
+            update_diagram(self.ax, self.artists, self.levels, self.transitions, **self.options)
+        else:
+            # first render, or the artists renderer: nothing to update in place, draw again
+            self.fig.clear()
+            self.ax = self.fig.subplots()
+            self.artists = draw_diagram(self.ax, self.levels, self.transitions, renderer=self.renderer,
+                                        **self.options)
+            format_axes(self.ax)
+            self.fig.tight_layout()
+        if self.outpath:
+            self.fig.savefig(self.outpath, dpi=DPI)
+        if self.show:
+            self.fig.canvas.draw_idle()
+
+    def run(self, interval=0.5, max_updates=None, log=print):
+        """Render, then poll every interval seconds and refresh/re-render on changes (Ctrl-C to stop)."""
+        self.render()
+        if self.renderer != 'svg':
+            import matplotlib.pyplot as plt
+        log(f"[WATCH] watching {', '.join(self.files.values())} (Ctrl-C to stop)")
+        updates = 0
+        try:
+            while max_updates is None or updates < max_updates:
+                if self.show:
+                    plt.pause(interval)
+                else:
+                    time.sleep(interval)
+                changed = self.poll()
+                if not changed:
+                    continue
+                try:
+                    summary = self.refresh(changed)
+                    t0 = time.perf_counter()
+                    self.render()
+                    summary['render_seconds'] = time.perf_counter() - t0
+                except Exception as e:  # a half-edited table: keep watching
+                    log(f"[WATCH] {', '.join(changed)} changed but could not be reloaded: {type(e).__name__}: {e}")
+                    continue
+                updates += 1
+                log(f"[WATCH] {', '.join(changed)} changed: {summary['levels_rebuilt']} levels rebuilt, "
+                    f"{summary['lines_resolved']} lines resolved in {summary['seconds']:.3f}s, "
+                    f"rendered in {summary['render_seconds']:.3f}s")
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if self.fig is not None:
+                plt.close(self.fig)
+        return updates
@@ -0,0 +1,156 @@
+# src/grotrian_plotter/windows.py
+"""Energy and wavelength windows (--emin/--emax, --wlmin/--wlmax) answered from sorted indexes.
+
+A SortedIndex keeps the argsort of one column: ExcitationWaven of the level rows as read (never the
+rescaled 'energy', so a bound equal to a table energy matches it), or Wavelength of the resolved
+lines. A window [lo, hi] is then two binary searches plus the slice of matching row positions,
+instead of a scan of the column. The index is built once per loaded table: with the model in the
+on-disk cache (load_atomic_model(index=True)) and per SpeciesModel in a session, so repeated window
+queries on the same table cost O(log n + k).
+
+    index = WindowIndex.build(levels, transitions)
+    levels, transitions = apply_windows(levels, transitions, index, emin=50000, emax=70000)
+
+Windows are inclusive; None leaves that side open. Energies are in cm^-1 (ExcitationWaven),
+wavelengths in the units of the LineFine Wavelength column. Levels are a build_levels_frame frame, or
+dicts carrying ExcitationWaven; the plain levels list of levels_frame_to_list needs an index built
+from its frame.
+"""
+import numpy as np
+import pandas as pd
+
+
+class SortedIndex:
+    """Row positions of a column in value order. NaN values sort last and never match a window."""
+
+    def __init__(self, values, order=None):
+        values = np.asarray(values, dtype=float)
+        self.order = np.argsort(values, kind='stable') if order is None else np.asarray(order)
+        self.sorted = values[self.order]
+
+    def __len__(self):
+        return len(self.order)
+
+    def bounds(self, lo=None, hi=None):
+        """[a, b) slice of the sorted values inside [lo, hi]."""
+        a = 0 if lo is None else int(np.searchsorted(self.sorted, lo, side='left'))
+        if hi is None:
+            # open upper side: everything but the NaN tail
+            b = int(np.searchsorted(self.sorted, np.nan, side='left'))
+        else:
+            b = int(np.searchsorted(self.sorted, hi, side='right'))
+        return a, max(a, b)
+
+    def count(self, lo=None, hi=None):
+        a, b = self.bounds(lo, hi)
+        return b - a
+
+    def window(self, lo=None, hi=None):
+        """Row positions with lo <= value <= hi, in value order."""
+        a, b = self.bounds(lo, hi)
+        return self.order[a:b]
+
+    def mask(self, lo=None, hi=None):
+        """Boolean row mask of the window."""
+        out = np.zeros(len(self.order), dtype=bool)
+        out[self.window(lo, hi)] = True
+        return out
+
+
+class WindowIndex:
+    """The energy index of the level rows and the wavelength index of the resolved lines of one model."""
+
+    def __init__(self, energy, wavelength=None):
+        self.energy, self.wavelength = energy, wavelength
+
+    @classmethod
+    def build(cls, levels, transitions=None):
+        """From a levels list or frame and (i, f, unresolved, values) transitions (wavelength index only
+        when the transitions carry their values).
+        """
+        energy = SortedIndex(level_wavenumbers(levels))
+        wavelength = None
+        if transitions is not None and len(transitions) > 3:
+            wavelength = SortedIndex(np.asarray(transitions[3], dtype=float)[:, 0])
+        return cls(energy, wavelength)
+
+    def to_arrays(self, prefix='index'):
+        arrays = {f'{prefix}/energy_order': self.energy.order}
+        if self.wavelength is not None:
+            arrays[f'{prefix}/wavelength_order'] = self.wavelength.order
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays, levels, transitions=None, prefix='index'):
+        """The index stored by to_arrays, re-attached to the values of levels/transitions (no sorting);
+        rebuilt when the arrays are missing (entries written before the index existed).
+        """
+        if f'{prefix}/energy_order' not in arrays:
+            return cls.build(levels, transitions)
+        energy = SortedIndex(level_wavenumbers(levels), arrays[f'{prefix}/energy_order'])
+        wavelength = None
+        if transitions is not None and len(transitions) > 3:
+            order = arrays.get(f'{prefix}/wavelength_order')
+            wavelength = SortedIndex(np.asarray(transitions[3], dtype=float)[:, 0], order)
+        return cls(energy, wavelength)
+
+
+def level_wavenumbers(levels):
+    """ExcitationWaven (cm^-1) of the level rows, as read from the tables."""
+    if isinstance(levels, pd.DataFrame):
+        if 'ExcitationWaven' not in levels.columns:
+            raise ValueError("Energy windows need the ExcitationWaven column of build_levels_frame")
+        return levels['ExcitationWaven'].to_numpy(dtype=float)
+    if levels and 'ExcitationWaven' not in levels[0]:
+        raise ValueError("Energy windows need ExcitationWaven: build the WindowIndex from the levels frame")
+    return np.fromiter((l['ExcitationWaven'] for l in levels), dtype=float, count=len(levels))
+
+
+def has_window(emin=None, emax=None, wlmin=None, wlmax=None):
+    return any(v is not None for v in (emin, emax, wlmin, wlmax))
+
+
+def window_masks(index, emin=None, emax=None, wlmin=None, wlmax=None):
+    """(row mask or None, resolved-line mask or None) of the energy and wavelength windows."""
+    rows = index.energy.mask(emin, emax) if emin is not None or emax is not None else None
+    lines = None
+    if wlmin is not None or wlmax is not None:
+        if index.wavelength is None:
+            raise ValueError("Wavelength windows need the line values (Wavelength) of the transitions")
+        lines = index.wavelength.mask(wlmin, wlmax)
+    return rows, lines
+
+
+def select_rows(levels, transitions, rows=None, lines=None):
+    """Keep the level rows of the row mask and the resolved lines of the line mask whose both levels
+    are kept; positions are renumbered. Unresolved lines are left as they are.
+    """
+    i, f, unresolved = (np.asarray(t) for t in transitions[:3])
+    keep = np.ones(len(i), dtype=bool) if lines is None else lines.copy()
+    if rows is not None:
+        keep &= rows[i] & rows[f]
+        new_pos = (np.cumsum(rows) - 1).astype(np.int32)
+        if isinstance(levels, pd.DataFrame):
+            levels = levels[rows].reset_index(drop=True)
+        else:
+            levels = [levels[k] for k in np.flatnonzero(rows)]
+        i, f = new_pos[i[keep]], new_pos[f[keep]]
+    else:
+        i, f = i[keep], f[keep]
+    # one unresolved flag per input line: drop the flags of the resolved lines left out
+    row_keep = np.ones(len(unresolved), dtype=bool)
+    row_keep[np.flatnonzero(~unresolved)[~keep]] = False
+    out = (i.astype(np.int32), f.astype(np.int32), unresolved[row_keep])
+    if len(transitions) > 3:
+        out += (np.asarray(transitions[3])[keep],)
+    return levels, out
+
+
+def apply_windows(levels, transitions, index=None, emin=None, emax=None, wlmin=None, wlmax=None):
+    """(levels, transitions) restricted to the energy and wavelength windows (see the module docstring)."""
+    if not has_window(emin, emax, wlmin, wlmax):
+        return levels, transitions
+    if index is None:
+        index = WindowIndex.build(levels, transitions)
+    rows, lines = window_masks(index, emin, emax, wlmin, wlmax)
+    return select_rows(levels, transitions, rows, lines)
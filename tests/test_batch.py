@@ -0,0 +1,43 @@
+import os
+import json
+from subprocess import run, PIPE
+
+from grotrian_plotter.batch import run_batch
+
+
+def _manifest(tmp_path):
+    manifest = {
+        "file_level": "data/ModelAtomicIonLevel.dat",
+        "file_sublevel": "data/ModelAtomicIonLevelSublevel.dat",
+        "file_linefine": "data/ModelAtomicIonLineFine.dat",
+        "jobs": [
+            {"Z": 12, "ion": 0, "levs": "1-25", "out": str(tmp_path / "mgI_1-25.png")},
+            {"Z": 12, "ion": 1, "levs": "1-10", "out": str(tmp_path / "mgII.png")},
+            {"Z": 12, "ion": 0, "levs": "1-10,20", "out": str(tmp_path / "mgI_1-10.png")},
+        ],
+    }
+    return manifest
+
+
+def test_batch_reports_failures_without_stopping(tmp_path):
+    messages = []
+    results = run_batch(_manifest(tmp_path), workers=2, progress=messages.append)
+    assert [r['ok'] for r in results] == [True, False, True]
+    assert "KeyError" in results[1]['error']
+    assert (tmp_path / "mgI_1-25.png").exists() and (tmp_path / "mgI_1-10.png").exists()
+    assert results[0]['n_levels'] == 43 and results[0]['timings']['render'] > 0
+    assert len(messages) == 4
+    stages = [r['stage'] for r in results[0]['metrics']['stages']]
+    assert stages == ['build_levels', 'build_transitions', 'plot']
+    assert results[0]['metrics']['totals']['n_levels'] == 43
+
+
+def test_cli_batch(tmp_path):
+    path = tmp_path / "manifest.json"
+    manifest = _manifest(tmp_path)
+    for key in ("file_level", "file_sublevel", "file_linefine"):
+        manifest[key] = os.path.abspath(manifest[key])
+    path.write_text(json.dumps(manifest))
+    r = run(["python", "src/cli.py", "--batch", str(path), "--workers", "2"], stdout=PIPE, stderr=PIPE, text=True)
+    assert r.returncode == 0, r.stderr
+    assert "[BATCH] 2 ok, 1 failed" in r.stdout
@@ -0,0 +1,87 @@
+import warnings
+
+import pandas as pd
+
+from grotrian_plotter.data_loader import fetch_levels_tables
+from grotrian_plotter.building import build_levels_list, config_tag
+
+
+def _data_tables(levs):
+    return fetch_levels_tables(None, 12, 0, levs,
+                               file_level="data/ModelAtomicIonLevel.dat",
+                               file_sublevel="data/ModelAtomicIonLevelSublevel.dat")
+
+
+def _assert_same_levels(Levels_SQL, LevelsSub_SQL):
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        ref_levels, ref_pos = build_levels_list(Levels_SQL, LevelsSub_SQL, engine='iterrows')
+        levels, pos_map = build_levels_list(Levels_SQL, LevelsSub_SQL, engine='columnar')
+    assert pos_map == ref_pos
+    assert len(levels) == len(ref_levels)
+    for got, ref in zip(levels, ref_levels):
+        assert got.keys() == ref.keys()
+        for key in ref:
+            same_nan = key == 'energy' and pd.isna(got[key]) and pd.isna(ref[key])
+            assert same_nan or got[key] == ref[key], (key, got, ref)
+            assert type(got[key]) is type(ref[key]) or key == 'J2', (key, got, ref)
+
+
+def test_columnar_levels_match_iterrows():
+    _assert_same_levels(*_data_tables(list(range(1, 27))))
+
+
+def test_columnar_levels_match_iterrows_on_odd_configs():
+    Levels_SQL = pd.DataFrame({
+        'LevelNumber': [1, 2, 3, 4, 5, 12],
+        'FullConfig': ['3s2-1S', '3s.5g-', '3p2-3P', 'weird', None, '3s.4d'],
+        'ElectronConfig': ['3s2', '3s.5g', '3p2', 'x', 'y', '3s.4d'],
+    })
+    LevelsSub_SQL = pd.DataFrame({
+        'LevelNumber': [1, 2, 2, 3, 4, 5, 12, 99],
+        'SublevelNumber': [1, 1, 2, 1, 1, 1, 1, 1],
+        '2J': [0, 7, 9, 2, 1, 4, 3, 0],
+        'ExcitationWaven': [0.0, 57262.76, 57262.8, 100.0, 2.5, 3.0, float('nan'), 1.0],
+    })
+    _assert_same_levels(Levels_SQL, LevelsSub_SQL)
+
+
+def test_columnar_levels_match_iterrows_on_duplicated_levels():
+    Levels_SQL, LevelsSub_SQL = _data_tables([1, 2, 4])
+    # level 4 listed twice in the Level table, one sublevel row of level 2 twice in the Sublevel table
+    Levels_SQL = pd.concat([Levels_SQL, Levels_SQL[Levels_SQL['LevelNumber'] == 4]], ignore_index=True)
+    LevelsSub_SQL = pd.concat([LevelsSub_SQL, LevelsSub_SQL.iloc[[1]]], ignore_index=True)
+    _assert_same_levels(Levels_SQL, LevelsSub_SQL)
+    levels, _ = build_levels_list(Levels_SQL, LevelsSub_SQL)
+    assert [l['label'] for l in levels if l['LevelNumber'] == 4] == ['4-1_1']
+
+
+def test_tags_from_configurations():
+    assert config_tag('3s2-1S', '3s2') == '$3s^2$'
+    assert config_tag('3p2-3P', '3p2') == '$3p^2$'
+    assert config_tag('3s.4s-3S', '3s.4s') == '4s'
+    assert config_tag('3s.5g-', '3s.5g') == '5g'
+    assert config_tag('weird') is None
+    levels, _ = build_levels_list(*_data_tables([1, 4]))
+    assert [l['tag'] for l in levels] == ['$3s^2$', '4s']
+
+
+def test_resolve_transitions_matches_dicts():
+    from grotrian_plotter.data_loader import fetch_transitions
+    from grotrian_plotter.building import build_levels_frame, build_transitions_list
+
+    levels, pos_map = build_levels_list(*_data_tables(list(range(1, 21))))
+    rows = fetch_transitions(None, 12, 0, '', file_linefine="data/ModelAtomicIonLineFine.dat")
+    rows.append([1, 1, 2, float('nan')])
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        ref = build_transitions_list(rows[:-1], pos_map)
+    i, f, unresolved = build_transitions_list(rows, pos_map, mode='arrays')
+    assert i.dtype.name == 'int32' and f.dtype.name == 'int32'
+    assert list(zip(i.tolist(), f.tolist())) == [(t['i'], t['f']) for t in ref]
+    assert unresolved.shape == (len(rows),)
+    assert unresolved[-1] and int((~unresolved).sum()) == len(ref)
+
+    frame = build_levels_frame(*_data_tables(list(range(1, 21))))
+    i2, f2, unresolved2 = build_transitions_list(rows, frame, mode='arrays')
+    assert (i2 == i).all() and (f2 == f).all() and (unresolved2 == unresolved).all()
@@ -0,0 +1,99 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import grotrian_plotter.data_loader as data_loader
+from grotrian_plotter.building import levels_frame_to_list
+from grotrian_plotter.cache import TableCache, load_atomic_model
+from grotrian_plotter.validation import IntegrityError
+
+FILES = ("data/ModelAtomicIonLevel.dat", "data/ModelAtomicIonLevelSublevel.dat",
+         "data/ModelAtomicIonLineFine.dat")
+
+
+def test_cached_model_round_trip(tmp_path, monkeypatch):
+    cache = TableCache(str(tmp_path / "cache"))
+    levs = list(range(1, 26))
+    ref = load_atomic_model(12, 0, levs, *FILES, cache=cache)
+    assert cache.misses == 1
+
+    # a hit must not parse anything
+    def boom(*a, **k):
+        raise AssertionError("table parsed on a cache hit")
+    monkeypatch.setattr(data_loader, "read_table_from_file", boom)
+    got = load_atomic_model(12, 0, levs, *FILES, cache=cache)
+    assert cache.hits == 1
+
+    pd.testing.assert_frame_equal(got.levels, ref.levels, check_dtype=False)
+    pd.testing.assert_frame_equal(got.sublevels, ref.sublevels, check_dtype=False)
+    assert levels_frame_to_list(got.frame) == levels_frame_to_list(ref.frame)
+    for a, b in zip(got.transitions, ref.transitions):
+        assert isinstance(a, np.memmap)
+        assert np.array_equal(a, b)
+
+    # a different selection is another entry
+    with pytest.raises(AssertionError):
+        load_atomic_model(12, 0, levs[:10], *FILES, cache=cache)
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    cache = TableCache(str(tmp_path))
+    for t, key in enumerate(("a", "b", "c")):
+        cache.store(key, {"x": np.zeros(100)})
+        os.utime(os.path.join(str(tmp_path), key, "meta.json"), (t, t))
+    size = cache.entries()[0][1]
+    cache.max_bytes = int(2.5 * size)
+    cache.load("a")
+    cache.store("d", {"x": np.zeros(100)})
+    keys = sorted(k for k, _, _ in cache.entries())
+    assert keys == ["a", "d"]
+
+
+def test_load_hits_when_access_time_cannot_be_set(tmp_path, monkeypatch):
+    cache = TableCache(str(tmp_path))
+    cache.store("k", {"x": np.ones(3)})
+
+    def read_only(*args, **kwargs):
+        raise PermissionError("read-only cache")
+    monkeypatch.setattr(os, "utime", read_only)
+    assert cache.load("k")[0]["x"].tolist() == [1, 1, 1] and cache.hits == 1
+
+
+def test_corrupt_entry_is_rebuilt(tmp_path):
+    cache = TableCache(str(tmp_path))
+    ref = load_atomic_model(12, 0, "1-25", *FILES, cache=cache)
+    (key,) = [k for k, _, _ in cache.entries()]
+    entry = tmp_path / key
+    for npy in sorted(entry.glob("*.npy"))[:2]:
+        npy.write_bytes(b"garbage")
+    with pytest.warns(UserWarning, match="unreadable cache entry"):
+        got = load_atomic_model(12, 0, "1-25", *FILES, cache=cache)
+    assert (cache.hits, cache.misses) == (0, 2)
+    load_atomic_model(12, 0, "1-25", *FILES, cache=cache)
+    assert cache.hits == 1
+    assert levels_frame_to_list(got.frame) == levels_frame_to_list(ref.frame)
+    assert [k for k, _, _ in cache.entries()] == [key] and not [p for p in tmp_path.iterdir() if p.name != key]
+
+
+def test_store_replaces_existing_entry(tmp_path):
+    cache = TableCache(str(tmp_path))
+    cache.store("k", {"x": np.zeros(3)})
+    cache.store("k", {"x": np.ones(3)})
+    assert cache.load("k")[0]["x"].tolist() == [1, 1, 1]
+
+
+def test_validation_warns_on_hits(tmp_path):
+    lines = pd.read_csv(FILES[2], sep=r"\s+")
+    lines.loc[0, "UpperSublevel"] = 99
+    linefine = str(tmp_path / "linefine.dat")
+    lines.to_csv(linefine, sep="\t", index=False)
+    files = (FILES[0], FILES[1], linefine)
+    cache = TableCache(str(tmp_path / "cache"))
+    for expected_hits in (0, 1):
+        with pytest.warns(UserWarning, match="1 dangling_transitions"):
+            load_atomic_model(12, 0, "1-30", *files, cache=cache, validate="lenient")
+        assert cache.hits == expected_hits
+    with pytest.raises(IntegrityError, match="1 dangling_transitions"):
+        load_atomic_model(12, 0, "1-30", *files, cache=cache, validate="strict")
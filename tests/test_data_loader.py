@@ -0,0 +1,71 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from grotrian_plotter.data_loader import (read_table_from_file, fetch_levels_tables, fetch_transitions,
+                                          SUBLEVEL_DTYPES)
+
+
+def test_fetch_levels_tables_pushdown():
+    Levels_SQL, LevelsSub_SQL = fetch_levels_tables(None, 12, 0, [2, 3, 8],
+                                                    file_level="data/ModelAtomicIonLevel.dat",
+                                                    file_sublevel="data/ModelAtomicIonLevelSublevel.dat")
+    assert list(Levels_SQL.columns) == ['LevelNumber', 'FullConfig', 'ElectronConfig']
+    assert list(LevelsSub_SQL.columns) == ['LevelNumber', 'SublevelNumber', '2J', 'ExcitationWaven']
+    assert Levels_SQL['LevelNumber'].tolist() == [2, 3, 8]
+    assert LevelsSub_SQL['LevelNumber'].tolist() == [2, 2, 2, 3, 8, 8, 8]
+    assert str(LevelsSub_SQL['2J'].dtype) == 'int32'
+    assert LevelsSub_SQL['ExcitationWaven'].iloc[1] == 21870.464
+
+
+def test_fetch_transitions_keeps_four_columns():
+    rows = fetch_transitions(None, 12, 0, '', file_linefine="data/ModelAtomicIonLineFine.dat")
+    assert rows[0] == [1, 1, 25, 1]
+    assert all(len(r) == 4 for r in rows)
+
+
+def test_read_table_falls_back_on_bad_numbers(tmp_path):
+    path = tmp_path / "sub.dat"
+    path.write_text("LevelNumber SublevelNumber 2J ExcitationWaven extra\n"
+                    "1 1 0 0.0 a\n"
+                    "2 1 NULL 10.5 b\n"
+                    "3 1 2 bad c\n")
+    df = read_table_from_file(str(path), usecols=list(SUBLEVEL_DTYPES), dtype=SUBLEVEL_DTYPES,
+                              row_filter=lambda d: d['LevelNumber'] > 1, chunksize=1)
+    assert df['LevelNumber'].tolist() == [2, 3]
+    assert pd.isna(df['2J'].iloc[0]) and pd.isna(df['ExcitationWaven'].iloc[1])
+    assert 'extra' not in df.columns
+
+
+def test_streamed_transitions_keep_only_selected_levels(tmp_path):
+    from grotrian_plotter.data_loader import iter_transitions
+
+    chunks = list(iter_transitions("data/ModelAtomicIonLineFine.dat", levs=range(1, 10), chunksize=7))
+    assert len(chunks) == 12
+    streamed = np.concatenate(chunks)
+    assert streamed.dtype == np.int32
+    rows = np.array(fetch_transitions(None, 12, 0, '', file_linefine="data/ModelAtomicIonLineFine.dat"))
+    keep = np.isin(rows[:, 0], range(1, 10)) & np.isin(rows[:, 2], range(1, 10))
+    assert keep.sum() > 0
+    assert np.array_equal(streamed, rows[keep])
+
+    path = tmp_path / "lines.dat"
+    path.write_text("LowerLevel LowerSublevel UpperLevel UpperSublevel gf\n1 1 2 1 0.1\nNULL 1 2 1 0.2\n")
+    out = fetch_transitions(None, 12, 0, '', file_linefine=str(path), chunksize=1)
+    assert out.tolist() == [[1, 1, 2, 1]]
+
+
+def test_missing_species_warns():
+    files = dict(file_level="data/ModelAtomicIonLevel.dat", file_sublevel="data/ModelAtomicIonLevelSublevel.dat")
+    with pytest.warns(UserWarning, match="species Z=26 ion=0"):
+        Levels_SQL, _ = fetch_levels_tables(None, 26, 0, [1, 2], **files)
+    assert Levels_SQL.empty
+    with pytest.warns(UserWarning, match="ModelAtomicIonLineFine.dat: none of its"):
+        assert len(fetch_transitions(None, 12, 1, '', file_linefine="data/ModelAtomicIonLineFine.dat",
+                                     chunksize=10_000)) == 0
+    # rows of the species outside the selected levels are not a missing species
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        assert fetch_levels_tables(None, 12, 0, [999], **files)[0].empty
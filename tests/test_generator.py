@@ -0,0 +1,44 @@
+import sys
+import subprocess
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, "examples")
+from generate_synthetic_tables import gen_scaled_tables, LEVEL_COLUMNS, SUBLEVEL_COLUMNS, LINEFINE_COLUMNS
+
+from grotrian_plotter.data_loader import fetch_levels_tables, fetch_transitions
+from grotrian_plotter.building import build_levels_list, resolve_transitions
+
+
+def test_scaled_tables_schema(tmp_path):
+    gen_scaled_tables(tmp_path, species=2, terms=40, sublevels=3, lines=500, seed=1)
+    for name, columns in (("ModelAtomicIonLevel.dat", LEVEL_COLUMNS),
+                          ("ModelAtomicIonLevelSublevel.dat", SUBLEVEL_COLUMNS),
+                          ("ModelAtomicIonLineFine.dat", LINEFINE_COLUMNS)):
+        ref = pd.read_csv(f"data/{name}", sep=r"\s+", comment="#", nrows=1)
+        df = pd.read_csv(tmp_path / name, sep=r"\s+", comment="#")
+        assert list(df.columns) == list(ref.columns) == columns
+        assert set(zip(df["AtomicNumber"], df["IonCharge"])) == {(12, 0), (12, 1)}
+
+    # the second species must not leak into a (12, 1) diagram read from the same files
+    levs = list(range(1, 41))
+    Levels_SQL, LevelsSub_SQL = fetch_levels_tables(None, 12, 1, levs,
+                                                    file_level=tmp_path / "ModelAtomicIonLevel.dat",
+                                                    file_sublevel=tmp_path / "ModelAtomicIonLevelSublevel.dat")
+    assert len(Levels_SQL) == 40 and Levels_SQL["LevelNumber"].is_unique
+    levels, pos_map = build_levels_list(Levels_SQL, LevelsSub_SQL)
+    rows = fetch_transitions(None, 12, 1, "", file_linefine=tmp_path / "ModelAtomicIonLineFine.dat")
+    assert len(rows) == 500
+    i, f, unresolved = resolve_transitions(rows, pos_map)
+    assert not unresolved.any()
+    energies = np.array([lv["energy"] for lv in levels])
+    assert (energies[i] <= energies[f]).all()
+
+
+def test_generator_cli_scaled(tmp_path):
+    r = subprocess.run([sys.executable, "examples/generate_synthetic_tables.py", "--outdir", str(tmp_path),
+                        "--terms", "30", "--species", "1", "--lines", "200"], capture_output=True, text=True)
+    assert r.returncode == 0, r.stderr
+    df = pd.read_csv(tmp_path / "ModelAtomicIonLineFine.dat", sep=r"\s+")
+    assert len(df) == 200 and df["UpperLevel"].max() <= 30
@@ -0,0 +1,56 @@
+import numpy as np
+
+from grotrian_plotter.labels import multiplet_groups, place_labels
+from grotrian_plotter.plotting import level_annotations
+
+# one 3P multiplet (LevelNumber 2) with its J rows split by another level, and a singlet
+LEVELS = [
+    {'LevelNumber': 2, 'xstart': 1, 'energy': 2.0, 'label': '3^3P_0', 'mult': 3, 'l': 1, 'j': 0},
+    {'LevelNumber': 3, 'xstart': 9, 'energy': 3.5, 'label': '3^1P_1', 'mult': 1, 'l': 1, 'j': 1},
+    {'LevelNumber': 2, 'xstart': 1, 'energy': 2.2, 'label': '3^3P_1', 'mult': 3, 'l': 1, 'j': 1},
+    {'LevelNumber': 2, 'xstart': 1, 'energy': 2.4, 'label': '3^3P_2', 'mult': 3, 'l': 1, 'j': 2},
+]
+
+
+def test_multiplets_grouped_by_level_not_row_order():
+    assert multiplet_groups([2, 3, 2, 2], [3, 1, 3, 3], [1, 1, 1, 1], [True, False, True, True]).tolist() == \
+        [0, 1, 0, 0]
+    tags = dict(level_annotations(LEVELS, layout=False))
+    assert set(tags) == {'3p$_{0,1,2}$', '3p$_{1}$'}
+    assert np.isclose(tags['3p$_{0,1,2}$'][1], 2.2)
+    # the same tags whatever the row order
+    for order in (LEVELS[::-1], [LEVELS[k] for k in (3, 0, 1, 2)]):
+        got = dict(level_annotations(order, layout=False))
+        assert set(got) == set(tags)
+        assert all(np.allclose(got[text], xy) for text, xy in tags.items())
+
+
+def test_place_labels_resolves_collisions_per_column():
+    columns = np.array([0, 0, 0, 1, 0, 1])
+    ys = np.array([1.0, 1.05, 3.0, 1.0, 1.1, 1.02])
+    out = place_labels(columns, ys, 0.2)
+    # isolated tag untouched, the crowded cluster centered on its anchors and height apart
+    assert out[2] == 3.0
+    assert np.allclose(np.sort(out[[0, 1, 4]]), [0.85, 1.05, 1.25])
+    assert np.allclose(np.sort(out[[3, 5]]), [0.91, 1.11])
+    # order of the anchors is kept
+    assert out[0] < out[1] < out[4]
+
+
+def test_place_labels_dense_column():
+    rng = np.random.default_rng(0)
+    ys = rng.random(20_000) * 7
+    columns = rng.integers(0, 14, len(ys))
+    out = place_labels(columns, ys, 0.01)
+    for c in range(14):
+        gaps = np.diff(np.sort(out[columns == c]))
+        assert gaps.min() >= 0.01 - 1e-9
+
+
+def test_layout_is_opt_in():
+    crowded = [{'LevelNumber': k, 'xstart': 8, 'energy': 4.0 + 0.001 * k, 'label': f'{k}^1S_0', 'mult': 1,
+                'l': 0, 'j': 0} for k in range(3, 6)]
+    anchors = [xy[1] for _, xy in level_annotations(crowded)]
+    assert anchors == [l['energy'] for l in crowded]
+    spread = [xy[1] for _, xy in level_annotations(crowded, layout=True)]
+    assert spread != anchors and np.all(np.diff(spread) > 0)
@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+
+from grotrian_plotter.data_loader import fetch_transitions, LINE_VALUE_COLUMNS
+from grotrian_plotter.cache import load_atomic_model
+from grotrian_plotter.lod import reduce_transitions, with_values
+
+FILES = ('data/ModelAtomicIonLevel.dat', 'data/ModelAtomicIonLevelSublevel.dat', 'data/ModelAtomicIonLineFine.dat')
+LEVELS = [{'LevelNumber': 1}, {'LevelNumber': 2}, {'LevelNumber': 2}, {'LevelNumber': 3}]
+# (i, f, unresolved, values): lines 0-2 form the 1 -> 2 multiplet
+TRANSITIONS = (np.array([0, 0, 0, 1], dtype=np.int32), np.array([1, 2, 2, 3], dtype=np.int32),
+               np.arange(5) == 4,
+               np.array([[100., 0.1, 1e6], [101., 0.5, 2e6], [102., np.nan, 3e6], [200., 0.2, np.nan]]))
+
+
+def test_readers_return_row_aligned_values():
+    levs = list(range(1, 26))
+    rows, values = fetch_transitions(None, 12, 0, '', file_linefine=FILES[2], values=True)
+    lines, streamed = fetch_transitions(None, 12, 0, '', file_linefine=FILES[2], levs=levs, chunksize=50,
+                                        values=True)
+    assert values.shape == (len(rows), len(LINE_VALUE_COLUMNS)) and streamed.shape == (len(lines), 3)
+    # first line of the file: 1-1 -> 25-1, 1747.7937 A, gf 0.007762474
+    assert rows[0] == [1, 1, 25, 1] and lines[0].tolist() == [1, 1, 25, 1]
+    assert values[0, :2].tolist() == streamed[0, :2].tolist() == [1747.7937, 0.007762474]
+    assert fetch_transitions(None, 12, 0, '', file_linefine=FILES[2]) == rows
+
+
+def test_top_and_threshold():
+    (i, f, _, values), counts = reduce_transitions(TRANSITIONS, by='gf', top=2)
+    assert values[:, 1].tolist() == [0.5, 0.2] and counts.tolist() == [1, 1]
+    (i, f, _, values), _ = reduce_transitions(TRANSITIONS, by='A', min_value=1.5e6)
+    assert values[:, 0].tolist() == [101., 102.]
+    # lines without a value never pass a cut
+    (i, _, unresolved, _), _ = reduce_transitions(TRANSITIONS, by='gf', top=10)
+    assert len(i) == 3 and unresolved.sum() == 1
+    with pytest.raises(ValueError):
+        reduce_transitions(TRANSITIONS[:3])
+    with pytest.raises(ValueError):
+        reduce_transitions(TRANSITIONS, by='Wavelength')
+
+
+def test_merge_multiplets():
+    (i, f, _, values), counts = reduce_transitions(TRANSITIONS, LEVELS, merge=True)
+    assert counts.tolist() == [3, 1]
+    # drawn at the strongest gf component (line 1), gf and A summed
+    assert i.tolist() == [0, 1] and f.tolist() == [2, 3]
+    assert values[0].tolist() == [101., 0.6, 6e6]
+    assert np.isnan(values[1, 2])
+    (i, _, _, _), counts = reduce_transitions(TRANSITIONS, LEVELS, merge=True, by='A', top=1)
+    assert counts.tolist() == [3] and i.tolist() == [0]
+
+
+def test_load_atomic_model_with_values(tmp_path):
+    from grotrian_plotter.cache import TableCache
+    cache = TableCache(str(tmp_path))
+    for _ in range(2):
+        model = load_atomic_model(12, 0, range(1, 26), *FILES, cache=cache, values=True)
+        frame, transitions = model.frame, model.transitions
+        assert len(transitions) == 4 and len(transitions[3]) == len(transitions[0])
+    assert cache.hits == 1
+    reduced, counts = reduce_transitions(transitions, frame, merge=True)
+    assert counts.sum() == len(transitions[0]) and len(reduced[0]) < len(transitions[0])
+    plain = load_atomic_model(12, 0, range(1, 26), *FILES).transitions
+    np.testing.assert_array_equal(with_values(plain, np.zeros((len(plain[2]), 3)))[0], transitions[0])
+
+
+def test_cli_level_of_detail(tmp_path):
+    import cli
+    metrics = cli.main(['--file-level', FILES[0], '--file-sublevel', FILES[1], '--file-linefine', FILES[2],
+                        '--no-cache', '--lod-merge', '--lod-top', '5', '--renderer', 'svg',
+                        '--out', str(tmp_path / 'lod.svg')])
+    assert metrics.stage_record('level_of_detail')['rows_out'] == 5
+    assert metrics.stage_record('plot')['rows_in'] == metrics.totals['n_levels'] + 5
@@ -0,0 +1,43 @@
+import json
+import pstats
+
+from grotrian_plotter.cache import TableCache, load_atomic_model
+from grotrian_plotter.metrics import PipelineMetrics
+
+import cli
+
+FILES = ["data/ModelAtomicIonLevel.dat", "data/ModelAtomicIonLevelSublevel.dat", "data/ModelAtomicIonLineFine.dat"]
+
+
+def test_cli_metrics_json_and_profile(tmp_path):
+    out_json = tmp_path / "metrics.json"
+    prof = tmp_path / "plot.prof"
+    cli.main(["--file-level", FILES[0], "--file-sublevel", FILES[1], "--file-linefine", FILES[2],
+              "--no-cache", "--levs", "1-25", "--out", str(tmp_path / "mg.png"), "--profile",
+              "--metrics-json", str(out_json), "--profile-stage", "plot", "--profile-out", str(prof)])
+    report = json.loads(out_json.read_text())
+    stages = {r["stage"]: r for r in report["stages"]}
+    assert list(stages) == ["read_levels", "build_levels", "read_transitions", "build_transitions", "plot"]
+    for rec in stages.values():
+        assert rec["wall_s"] >= 0 and rec["cpu_s"] >= 0 and rec["peak_mb"] is not None
+    assert stages["build_levels"]["rows_in"] == stages["read_levels"]["rows_out"]
+    assert stages["build_levels"]["rows_out"] == report["totals"]["n_levels"] == 43
+    bt = stages["build_transitions"]
+    assert bt["rows_in"] == bt["rows_out"] + bt["unresolved"]
+    assert report["totals"]["n_unresolved"] == bt["unresolved"]
+    assert stages["plot"]["profile"] == str(prof)
+    assert pstats.Stats(str(prof)).total_calls > 0
+
+
+def test_load_atomic_model_metrics(tmp_path):
+    cache = TableCache(str(tmp_path))
+    miss = PipelineMetrics()
+    load_atomic_model(12, 0, range(1, 26), *FILES, cache=cache, metrics=miss)
+    assert [r["stage"] for r in miss.stages] == ["cache_load", "read_levels", "build_levels", "read_transitions",
+                                                 "build_transitions", "cache_store"]
+    assert miss.stage_record("cache_load")["hit"] is False
+    hit = PipelineMetrics()
+    load_atomic_model(12, 0, range(1, 26), *FILES, cache=cache, metrics=hit)
+    assert [r["stage"] for r in hit.stages] == ["cache_load"]
+    assert hit.stage_record("cache_load")["hit"] is True
+    assert hit.stage_record("cache_load")["rows_out"] == miss.stage_record("build_levels")["rows_out"]
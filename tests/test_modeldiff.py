@@ -0,0 +1,87 @@
+import io
+
+import matplotlib
+matplotlib.use("Agg")
+import numpy as np
+import pandas as pd
+import pytest
+
+from grotrian_plotter.cache import load_atomic_model
+from grotrian_plotter.data_loader import fetch_levels_tables, fetch_transitions, split_models
+from grotrian_plotter.modeldiff import load_models, diff_models, diff_levels, plot_model_diff
+
+FILES = ("data/ModelAtomicIonLevel.dat", "data/ModelAtomicIonLevelSublevel.dat",
+         "data/ModelAtomicIonLineFine.dat")
+
+
+@pytest.fixture(scope="module")
+def two_models(tmp_path_factory):
+    """The Mg I tables as ModelIndex 1, plus a model 2 with level 3 shifted by 50 cm^-1, level 5
+    removed, a new sublevel (1, 9) and the first 5 lines dropped.
+    """
+    root = tmp_path_factory.mktemp("models")
+    paths = []
+    for k, path in enumerate(FILES):
+        df = pd.read_csv(path, sep=r'\s+')
+        new = df.assign(ModelIndex=2)
+        if k == 1:
+            new.loc[new['LevelNumber'] == 3, 'ExcitationWaven'] += 50
+            new = new[new['LevelNumber'] != 5]
+            new = pd.concat([new, new.iloc[:1].assign(SublevelNumber=9)])
+        elif k == 2:
+            new = new.iloc[5:]
+        out = root / path.split('/')[-1]
+        pd.concat([new, df]).to_csv(out, sep='\t', index=False)
+        paths.append(str(out))
+    return paths
+
+
+def test_split_models_keeps_row_order():
+    df = pd.DataFrame({'ModelIndex': [2, 1, 2, 1], 'x': [0, 1, 2, 3]})
+    split = split_models([1, 2, 7], df['ModelIndex'], df, np.arange(4))
+    assert split[1][0]['x'].tolist() == [1, 3] and split[2][1].tolist() == [0, 2]
+    assert list(split[1][0].columns) == ['x'] and split[7][0].empty
+
+
+def test_models_are_read_together_and_split(two_models, tmp_path):
+    tables = fetch_levels_tables(None, 12, 0, '1-30', *two_models[:2], models=[2, 1])
+    ref = fetch_levels_tables(None, 12, 0, '1-30', *FILES[:2])
+    pd.testing.assert_frame_equal(tables[1][1], ref[1])
+    assert 5 not in tables[2][1]['LevelNumber'].tolist()
+    lines = fetch_transitions(None, 12, 0, '', two_models[2], levs='1-30', models=[1, 2])
+    streamed = fetch_transitions(None, 12, 0, '', two_models[2], levs='1-30', models=[1, 2], chunksize=50,
+                                 values=True)
+    assert lines[1] == fetch_transitions(None, 12, 0, '', FILES[2], levs='1-30')
+    for m in (1, 2):
+        assert streamed[m][0].tolist() == lines[m] and streamed[m][1].shape == (len(lines[m]), 3)
+    single = tmp_path / "single.dat"
+    pd.read_csv(FILES[1], sep=r'\s+').drop(columns='ModelIndex').to_csv(single, sep='\t', index=False)
+    with pytest.raises(ValueError, match='ModelIndex'):
+        fetch_levels_tables(None, 12, 0, '1-30', FILES[0], str(single), models=[1])
+
+
+def test_diff_of_two_models(two_models):
+    models = load_models(12, 0, '1-40', [1, 2], *two_models)
+    ref = load_atomic_model(12, 0, '1-40', *FILES)
+    pd.testing.assert_frame_equal(models[1].frame, ref.frame)
+    diff = diff_models(models[1], models[2])
+    assert diff.counts() == {'shifted_sublevels': 1, 'added_sublevels': 1, 'removed_sublevels': 1,
+                             'added_lines': 0, 'removed_lines': 10, 'common_lines': len(models[2].transitions[0])}
+    shifted = diff.sublevels('shifted')
+    assert shifted['LevelNumber'].tolist() == [3] and shifted['shift'].tolist() == pytest.approx([50.0])
+    assert diff.sublevels('added')[['LevelNumber', 'SublevelNumber']].values.tolist() == [[1, 9]]
+    # reversed, removed and added swap
+    back = diff_models(models[2], models[1]).counts()
+    assert (back['added_lines'], back['removed_lines'], back['added_sublevels']) == (10, 0, 1)
+    assert not diff_models(models[1], models[1]).sublevels('shifted').shape[0]
+    buf = io.BytesIO()
+    plot_model_diff(diff, models[1], models[2], outpath=buf, fmt='svg')
+    assert b'<svg' in buf.getvalue()
+
+
+def test_diff_levels_tolerance_and_duplicates():
+    a = pd.DataFrame({'LevelNumber': [1, 2, 2], 'SublevelNumber': [1, 1, 1], 'ExcitationWaven': [0.0, 1.0, 1.5]})
+    b = pd.DataFrame({'LevelNumber': [2, 1], 'SublevelNumber': [1, 1], 'ExcitationWaven': [1.7, 0.4]})
+    levels = diff_levels(a, b, tolerance=0.5)
+    assert levels['status'].tolist() == ['same', 'shifted', 'same']
+    assert levels['pos_b'].tolist() == [1, 0, 0]
@@ -0,0 +1,116 @@
+import io
+from concurrent.futures import ThreadPoolExecutor
+
+import matplotlib
+matplotlib.use("Agg")
+import numpy as np
+import pytest
+from matplotlib.colors import to_rgba
+from matplotlib.figure import Figure
+
+from grotrian_plotter.plotting import (plot_levels_and_transitions, level_segments, transition_segments,
+                                       transition_indices, draw_diagram, render_figure, rendering_turn)
+
+LEVELS = [
+    {'xstart': 8, 'energy': 0.0, 'label': '3^1S_0', 'mult': 1, 'j': 0},
+    {'xstart': 1, 'energy': 2.185, 'label': '3^3P_1', 'mult': 3, 'j': 1},
+    {'xstart': 9, 'energy': 3.505, 'label': '3^1P_1', 'mult': 1, 'j': 1},
+]
+
+
+def test_segments_from_arrays():
+    xs = np.array([l['xstart'] for l in LEVELS], dtype=float)
+    es = np.array([l['energy'] for l in LEVELS])
+    seg = level_segments(xs, es, 0.1)
+    assert seg.shape == (3, 2, 2)
+    assert seg[1].tolist() == [[0.9, 2.185], [1.1, 2.185]]
+    tseg = transition_segments(xs, es, np.array([0, 2, 5]), np.array([2, 1, 0]))
+    assert tseg.tolist() == [[[8, 0.0], [9, 3.505]], [[9, 3.505], [1, 2.185]]]
+
+
+def test_transition_indices_accepts_dicts_and_arrays():
+    i, f = transition_indices([{'i': 0, 'f': 2}, {'i': 1, 'f': 2}])
+    assert i.tolist() == [0, 1] and f.tolist() == [2, 2]
+    i, f = transition_indices((np.array([0], dtype=np.int32), np.array([1], dtype=np.int32), np.zeros(1, bool)))
+    assert i.tolist() == [0] and f.tolist() == [1]
+
+
+@pytest.mark.parametrize("renderer", ["collections", "artists"])
+def test_renderers_write_figure(tmp_path, renderer):
+    out = tmp_path / f"{renderer}.png"
+    plot_levels_and_transitions(LEVELS, [{'i': 0, 'f': 2}, {'i': 1, 'f': 2}], outpath=str(out), show=False,
+                                renderer=renderer)
+    assert out.exists()
+
+
+def _drawn(renderer):
+    """Level and transition segments, their styles and the axes limits, as drawn by renderer."""
+    ax = Figure().add_subplot()
+    drawn = draw_diagram(ax, LEVELS, [{'i': 0, 'f': 2}, {'i': 1, 'f': 2}], renderer=renderer, annotate=False)
+    if renderer == 'collections':
+        levels, transitions = drawn['levels'], drawn['transitions']
+        lines = {'levels': (levels.get_segments(), to_rgba(levels.get_edgecolor()[0]), levels.get_linewidth()[0],
+                            levels.get_linestyle()[0][1], levels.get_zorder()),
+                 'transitions': (transitions.get_segments(), to_rgba(transitions.get_edgecolor()[0]),
+                                 transitions.get_linewidth()[0], list(transitions.get_linestyle()[0][1]),
+                                 transitions.get_zorder())}
+    else:
+        level, arrow = ax.lines[0], ax.patches[0]
+        # a head-less FancyArrow: tip first, the tail between vertices 3 and 4
+        tails = [(a.get_xy()[3] + a.get_xy()[4]) / 2 for a in ax.patches]
+        dotted = [x * arrow.get_linewidth() for x in matplotlib.rcParams['lines.dotted_pattern']]
+        lines = {'levels': ([l.get_xydata() for l in ax.lines], to_rgba(level.get_color()), level.get_linewidth(),
+                            None if level.get_linestyle() == '-' else level.get_linestyle(), level.get_zorder()),
+                 'transitions': ([np.array([t, a.get_xy()[0]]) for t, a in zip(tails, ax.patches)],
+                                 to_rgba(arrow.get_edgecolor()), arrow.get_linewidth(),
+                                 dotted if arrow.get_linestyle() == ':' else None, arrow.get_zorder())}
+    return lines, ax.get_xlim() + ax.get_ylim()
+
+
+def test_renderers_draw_the_same_lines():
+    collections, limits = _drawn('collections')
+    artists, artist_limits = _drawn('artists')
+    for kind in ('levels', 'transitions'):
+        (seg, *style), (ref_seg, *ref_style) = collections[kind], artists[kind]
+        np.testing.assert_allclose(np.array(seg), np.array(ref_seg), atol=1e-3)
+        assert style == ref_style, kind
+    # the arrow patches pad the data limits by their (zero) head only
+    np.testing.assert_allclose(limits, artist_limits, atol=1e-2)
+
+
+def _png(levels, transitions, **options):
+    buf = io.BytesIO()
+    render_figure(levels, transitions, **options).savefig(buf, format='png', dpi=40)
+    return buf.getvalue()
+
+
+def test_render_figure_options_leave_rcparams_alone():
+    before = list(matplotlib.rcParams['figure.figsize'])
+    fig = render_figure(LEVELS, [{'i': 0, 'f': 2}], figsize=(4, 3), show_J=False)
+    assert list(fig.get_size_inches()) == [4, 3]
+    assert matplotlib.rcParams['figure.figsize'] == before
+    texts = [t.get_text() for t in fig.axes[0].texts]
+    assert '3p' in texts and not any('$_{' in t for t in texts)
+    assert not render_figure(LEVELS, [{'i': 0, 'f': 2}], annotate=False).axes[0].texts
+
+
+def test_threaded_renders_match_serial():
+    jobs = [(LEVELS[:k], [{'i': 0, 'f': k - 1}], show_J) for k in (2, 3) for show_J in (True, False)] * 4
+    serial = [_png(l, t, show_J=j) for l, t, j in jobs]
+
+    def render(job):
+        with rendering_turn():
+            return _png(job[0], job[1], show_J=job[2])
+    with ThreadPoolExecutor(4) as pool:
+        threaded = list(pool.map(render, jobs))
+    assert threaded == serial
+
+
+def test_rendering_leaves_matplotlib_unpatched():
+    from matplotlib.mathtext import MathTextParser
+    # matplotlib creates its shared parser on first use; nothing may replace it afterwards
+    assert _png(LEVELS, [{'i': 0, 'f': 2}])
+    before = dict(vars(MathTextParser))
+    assert _png(LEVELS[:2], [{'i': 0, 'f': 1}], show_J=False)
+    assert dict(vars(MathTextParser)) == before
+    assert rendering_turn() is rendering_turn()
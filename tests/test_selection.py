@@ -0,0 +1,19 @@
+import numpy as np
+
+from grotrian_plotter.selection import LevelSet, parse_levs
+
+
+def test_parse_merges_intervals():
+    levs = LevelSet.parse('30, 1-25,26-28,35,27')
+    assert levs.intervals == [(1, 28), (30, 30), (35, 35)]
+    assert str(levs) == '1-28,30,35' and len(levs) == 30
+    assert LevelSet.parse(range(1, 26)) == '1-25' == LevelSet.from_values(np.arange(25, 0, -1))
+    assert parse_levs('3,1-2,2') == [1, 2, 3]
+    assert not LevelSet.parse('') and list(LevelSet.parse('')) == []
+
+
+def test_mask_matches_isin():
+    levs = LevelSet.parse('2-4,7,10-1000000')
+    values = np.array([0, 1, 2, 4, 5, 7, 8, 9, 10, 500, 1000000, 1000001])
+    assert levs.mask(values).tolist() == np.isin(values, levs.to_array()).tolist()
+    assert 7 in levs and 8 not in levs and len(levs) == 1000 * 1000 - 9 + 4
@@ -0,0 +1,150 @@
+import os
+import json
+import socket
+import threading
+import urllib.request
+import urllib.error
+
+import pytest
+
+from grotrian_plotter.service import RenderService, ServiceBusy, parse_request, make_server, parse_address
+
+FILES = ('data/ModelAtomicIonLevel.dat', 'data/ModelAtomicIonLevelSublevel.dat', 'data/ModelAtomicIonLineFine.dat')
+REQUEST = {'Z': 12, 'ion': 0, 'levs': '1-25', 'format': 'svg'}
+
+
+def test_parse_request():
+    req = parse_request({'Z': '12', 'levs': '1-10', 'files': ','.join(FILES)}, allowed_files=[FILES])
+    assert req['Z'] == 12 and req['ion'] == 0 and req['format'] == 'png' and req['files'] == FILES
+    for bad in ({}, {'Z': 'x'}, {'Z': 12, 'format': 'gif'}, {'Z': 12, 'dpi': 0},
+                {'Z': 12, 'renderer': 'svg', 'format': 'pdf'}, {'Z': 12, 'files': 'a,b'}):
+        with pytest.raises(ValueError):
+            parse_request(bad)
+    assert parse_address('8765') == ('127.0.0.1', 8765, None)
+    assert parse_address('localhost:80') == ('localhost', 80, None)
+    assert parse_address('[::1]:80') == ('::1', 80, None)
+    assert parse_address('0.0.0.0:80', allow_remote=True) == ('0.0.0.0', 80, None)
+    assert parse_address('/tmp/grotrian.sock') == (None, None, '/tmp/grotrian.sock')
+    for remote in ('0.0.0.0:80', '192.168.1.2:80', 'example.org:80'):
+        with pytest.raises(ValueError, match='non-loopback'):
+            parse_address(remote)
+
+
+def test_sources_are_restricted(tmp_path):
+    other = tuple(str(tmp_path / name) for name in ('l.dat', 's.dat', 'lf.dat'))
+    assert parse_request({'Z': 12, 'files': list(other)}, allowed_files=[FILES, other])['files'] == other
+    assert parse_request({'Z': 12, 'database': 'sqlite:///a.db'},
+                         allowed_databases={'sqlite:///a.db'})['database'] == 'sqlite:///a.db'
+    service = RenderService(files=FILES, renderer='svg', database='sqlite:///models.db')
+    try:
+        # the startup source, also spelled differently, is allowed
+        assert service.submit(dict(REQUEST, files=['./' + f for f in FILES])).result(10)[0].startswith(b'<')
+        assert parse_request(dict(REQUEST, database='sqlite:///models.db'), 'svg', service.allowed_files,
+                             service.allowed_databases)['database'] == 'sqlite:///models.db'
+        for bad in ({'files': ['/etc/passwd'] * 3}, {'files': list(other)}, {'database': 'sqlite:////etc/x.db'}):
+            with pytest.raises(ValueError, match='not one of the sources'):
+                service.submit(dict(REQUEST, **bad))
+    finally:
+        service.close()
+
+
+def test_invalidate_drops_images_and_models():
+    service = RenderService(files=FILES, renderer='svg')
+    try:
+        data = service.render(REQUEST)[0]
+        assert service.invalidate() == {'outputs': 1, 'models': 1}
+        assert service.render(REQUEST)[0] == data
+        stats = service.stats()
+        assert stats['output_misses'] == 2 and stats['invalidations'] == 1 and stats['session']['builds'] == 1
+    finally:
+        service.close()
+
+
+def test_render_is_cached_and_counted():
+    service = RenderService(files=FILES, renderer='svg', workers=2)
+    try:
+        data, content_type = service.render(REQUEST)
+        assert content_type == 'image/svg+xml' and b'<svg' in data
+        assert service.render(REQUEST)[0] == data
+        png, content_type = service.render(dict(REQUEST, levs='1-20', format='png', dpi=50))
+        assert content_type == 'image/png' and png.startswith(b'\x89PNG')
+        stats = service.stats()
+        assert stats['ok'] == 3 and stats['output_hits'] == 1 and stats['output_misses'] == 2
+        # 1-20 is sliced out of the model built for 1-25
+        assert stats['session']['models'] == 1 and stats['session']['builds'] == 1
+        assert stats['latency_ms']['p50'] is not None and stats['pending'] == 0
+    finally:
+        service.close()
+
+
+def test_backpressure_rejects_when_full():
+    service = RenderService(files=FILES, renderer='svg', workers=1, queue_size=1)
+    release = threading.Event()
+    service._render = lambda req: release.wait(10) and b''
+    try:
+        running = service.submit(REQUEST)
+        queued = service.submit(REQUEST)
+        with pytest.raises(ServiceBusy):
+            service.submit(REQUEST)
+        release.set()
+        running.result(10)
+        queued.result(10)
+        service.submit(REQUEST).result(10)
+        assert service.stats()['rejected'] == 1 and service.stats()['ok'] == 3
+    finally:
+        release.set()
+        service.close()
+
+
+def _serving(httpd):
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    return thread
+
+
+def test_http_front_end():
+    service = RenderService(files=FILES, renderer='svg')
+    httpd = make_server(service, port=0)
+    _serving(httpd)
+    base = f"http://127.0.0.1:{httpd.server_address[1]}"
+    try:
+        with urllib.request.urlopen(f"{base}/render?Z=12&ion=0&levs=1-25&format=svg") as r:
+            assert r.headers['Content-Type'] == 'image/svg+xml' and b'<svg' in r.read()
+        body = json.dumps(dict(REQUEST, format='png', dpi=40)).encode()
+        with urllib.request.urlopen(urllib.request.Request(f"{base}/render", data=body)) as r:
+            assert r.read().startswith(b'\x89PNG')
+        with pytest.raises(urllib.error.HTTPError) as err:
+            urllib.request.urlopen(f"{base}/render?Z=12&format=gif")
+        assert err.value.code == 400
+        with urllib.request.urlopen(f"{base}/stats") as r:
+            assert json.load(r)['ok'] == 2
+        with urllib.request.urlopen(urllib.request.Request(f"{base}/invalidate", data=b'')) as r:
+            assert json.load(r) == {'outputs': 2, 'models': 1}
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+        service.close()
+
+
+def test_unix_socket(tmp_path):
+    path = str(tmp_path / 'grotrian.sock')
+    service = RenderService(files=FILES, renderer='svg')
+    # a regular file at the socket path is not deleted
+    with open(path, 'w') as fh:
+        fh.write('keep')
+    with pytest.raises(FileExistsError):
+        make_server(service, unix_socket=path)
+    assert open(path).read() == 'keep'
+    os.unlink(path)
+    httpd = make_server(service, unix_socket=path)
+    _serving(httpd)
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+            s.connect(path)
+            s.sendall(b"GET /health HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n")
+            reply = b''.join(iter(lambda: s.recv(4096), b''))
+        assert reply.startswith(b'HTTP/1.1 200') and reply.endswith(b'{"ok": true}')
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+        service.close()
@@ -0,0 +1,88 @@
+import shutil
+import threading
+
+import pytest
+
+from grotrian_plotter.session import GrotrianSession
+from grotrian_plotter.cache import load_atomic_model
+from grotrian_plotter.building import levels_frame_to_list
+
+FILES = ("data/ModelAtomicIonLevel.dat", "data/ModelAtomicIonLevelSublevel.dat", "data/ModelAtomicIonLineFine.dat")
+
+
+def _edges(levels, transitions):
+    """Set of drawn (lower key, upper key) pairs, independent of level order."""
+    i, f, _ = transitions
+    key = [(lv["LevelNumber"], lv["SublevelNumber"]) for lv in levels]
+    return sorted((key[a], key[b]) for a, b in zip(i, f))
+
+
+def _fresh(levs):
+    model = load_atomic_model(12, 0, levs, *FILES, chunksize=10_000)
+    levels, _ = levels_frame_to_list(model.frame)
+    return levels, model.transitions
+
+
+def test_session_grows_incrementally():
+    session = GrotrianSession(files=FILES)
+    levels, transitions = session.get(12, 0, "1-10")
+    model = session.model(12, 0, [])
+    assert model.builds == 1 and len(model.levs) == 10
+
+    # growth parses only the new levels; the old positions stay valid
+    levels40, transitions40 = session.get(12, 0, "1-40")
+    assert model.builds == 2 and list(model.levs) == list(range(1, 41))
+    assert levels40[:len(levels)] == levels
+    ref_levels, ref_transitions = _fresh(range(1, 41))
+    assert sorted(map(str, levels40)) == sorted(map(str, ref_levels))
+    assert _edges(levels40, transitions40) == _edges(ref_levels, ref_transitions)
+    assert transitions40[2].sum() == ref_transitions[2].sum()
+
+    # a sub-selection is sliced from the built model, not rebuilt
+    levels15, transitions15 = session.get(12, 0, "5-15,30")
+    assert model.builds == 2
+    ref_levels, ref_transitions = _fresh([*range(5, 16), 30])
+    assert _edges(levels15, transitions15) == _edges(ref_levels, ref_transitions)
+    assert session.get(12, 0, "5-15,30") is session.get(12, 0, [30, *range(5, 16)])
+    assert session.misses == 1
+
+
+def test_session_memory_bound():
+    session = GrotrianSession(files=FILES, max_bytes=1)
+    session.get(12, 0, "1-10")
+    assert session.nbytes() > 1 and len(session.models) == 1
+    with pytest.warns(UserWarning, match="species Z=12 ion=1"):
+        session.get(12, 1, "1-10")
+    # over the bound: only the most recently used model is kept
+    assert [key[1:] for key in session.models] == [(12, 1)]
+
+
+def test_models_build_concurrently(monkeypatch, tmp_path):
+    from grotrian_plotter.session import FileSource
+    copies = []
+    for path in FILES:
+        copies.append(str(tmp_path / path.split("/")[-1]))
+        shutil.copy(path, copies[-1])
+    session = GrotrianSession(files=FILES)
+    opening, release = threading.Event(), threading.Event()
+    open_tables = FileSource.open
+
+    def slow_open(self, atom, ion):
+        if self.files == FILES:
+            opening.set()
+            assert release.wait(10)
+        return open_tables(self, atom, ion)
+
+    monkeypatch.setattr(FileSource, "open", slow_open)
+    blocked = threading.Thread(target=session.get, args=(12, 0, "1-10"))
+    blocked.start()
+    try:
+        assert opening.wait(10)
+        # the first model is still being built; the copy is neither blocked by it nor by the session lock
+        levels, _ = session.get(12, 0, "1-10", files=copies)
+        assert len(levels) and blocked.is_alive()
+        assert session.stats()["models"] == 2
+    finally:
+        release.set()
+        blocked.join()
+    assert len(session.model(12, 0, []).levs) == 10
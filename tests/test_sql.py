@@ -0,0 +1,75 @@
+from subprocess import run, PIPE
+
+import pandas as pd
+import pytest
+
+pytest.importorskip("sqlalchemy")
+
+from grotrian_plotter import data_loader
+from grotrian_plotter.data_loader import (build_sqlite_database, fetch_levels_tables, fetch_transitions,
+                                          fetch_sql_tables, get_engine, SQL_select)
+from grotrian_plotter.selection import LevelSet
+
+FILES = ("data/ModelAtomicIonLevel.dat", "data/ModelAtomicIonLevelSublevel.dat",
+         "data/ModelAtomicIonLineFine.dat")
+
+
+@pytest.fixture(scope="module")
+def standin(tmp_path_factory):
+    path = tmp_path_factory.mktemp("sql") / "standin.db"
+    build_sqlite_database(str(path), *FILES)
+    yield f"sqlite:///{path}"
+    data_loader.dispose_engines()
+
+
+def test_sqlite_path_matches_files(standin):
+    levs = list(range(1, 26))
+    Levels_SQL, LevelsSub_SQL, rows = fetch_sql_tables(standin, 12, 0, levs)
+    ref_levels, ref_sub = fetch_levels_tables(None, 12, 0, levs, file_level=FILES[0], file_sublevel=FILES[1])
+    pd.testing.assert_frame_equal(Levels_SQL, ref_levels, check_dtype=False)
+    pd.testing.assert_frame_equal(LevelsSub_SQL, ref_sub, check_dtype=False)
+    file_rows = fetch_transitions(None, 12, 0, '', file_linefine=FILES[2])
+    assert sorted(rows) == sorted(r for r in file_rows if r[0] in levs and r[2] in levs)
+    pd.testing.assert_frame_equal(fetch_levels_tables(standin, 12, 0, levs)[1], LevelsSub_SQL)
+
+
+def test_engine_is_pooled_and_in_lists_are_batched(standin, monkeypatch):
+    assert get_engine(database=standin) is get_engine(database=standin)
+    monkeypatch.setattr(data_loader, "MAX_BIND_PARAMS", 4)
+    df = SQL_select('ModelAtomicIonLevelSublevel', ['LevelNumber', 'SublevelNumber'], database=standin,
+                    in_column='LevelNumber', in_values=range(1, 11), AtomicNumber=12, IonCharge=0)
+    assert sorted(set(df['LevelNumber'])) == list(range(1, 11))
+    assert SQL_select('ModelAtomicIonLevel', ['LevelNumber'], database=standin, AtomicNumber=99).empty
+
+
+def test_level_ranges_pushed_down(standin, monkeypatch):
+    columns = ['LowerLevel', 'UpperLevel']
+    lines = SQL_select('ModelAtomicIonLineFine', columns, database=standin, AtomicNumber=12, IonCharge=0)
+    levs = LevelSet.parse('1-10,14,20-25')
+    wanted = lines[levs.mask(lines['LowerLevel']) & levs.mask(lines['UpperLevel'])].reset_index(drop=True)
+    for limit in (data_loader.MAX_BIND_PARAMS, 2):
+        # with 2 bind parameters the covering range is queried and the rows filtered locally
+        monkeypatch.setattr(data_loader, "MAX_BIND_PARAMS", limit)
+        df = SQL_select('ModelAtomicIonLineFine', columns, database=standin, levels=levs,
+                        level_columns=('LowerLevel', 'UpperLevel'), AtomicNumber=12, IonCharge=0)
+        pd.testing.assert_frame_equal(df.sort_values(columns, ignore_index=True),
+                                      wanted.sort_values(columns, ignore_index=True), check_dtype=False)
+
+
+def test_models_in_one_query(standin):
+    tables = fetch_levels_tables(standin, 12, 0, '1-25', models=[1, 2])
+    ref = fetch_levels_tables(None, 12, 0, '1-25', *FILES[:2], models=[1, 2])
+    for m in (1, 2):
+        for got, want in zip(tables[m], ref[m]):
+            pd.testing.assert_frame_equal(got, want, check_dtype=False)
+    lines = fetch_transitions(standin, 12, 0, '1-25', models=[1, 2], values=True)
+    file_lines = fetch_transitions(None, 12, 0, '1-25', file_linefine=FILES[2], levs='1-25', models=[1, 2])
+    assert sorted(lines[1][0]) == sorted(file_lines[1]) and lines[2][0] == []
+
+
+def test_cli_on_sqlite_standin(standin, tmp_path):
+    outfig = tmp_path / "mg_sql.png"
+    r = run(["python", "src/cli.py", "--database", standin, "--levs", "1-25", "--out", str(outfig)],
+            stdout=PIPE, stderr=PIPE, text=True)
+    assert r.returncode == 0, r.stderr
+    assert outfig.exists()
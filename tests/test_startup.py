@@ -0,0 +1,60 @@
+import os
+import sys
+from subprocess import run, PIPE
+
+# Budget for everything imported by `src/cli.py --help` (interpreter start-up included).
+# Measured at ~30 ms; NumPy/pandas/matplotlib alone are several hundred ms.
+HELP_IMPORT_BUDGET_US = 200_000
+HEAVY_MODULES = ('numpy', 'pandas', 'matplotlib', 'sqlalchemy', 'pyodbc')
+
+
+def _importtime(args):
+    r = run([sys.executable, "-X", "importtime", "src/cli.py"] + args, stdout=PIPE, stderr=PIPE, text=True)
+    assert r.returncode == 0, r.stderr
+    modules, total = [], 0
+    for line in r.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        modules.append(name.strip())
+        if not name.startswith("  "):  # top-level imports only, nested ones are in their cumulative time
+            total += int(cumulative)
+    return modules, total
+
+
+def test_help_does_not_import_heavy_modules():
+    modules, total = _importtime(["--help"])
+    heavy = [m for m in modules if m.split(".")[0] in HEAVY_MODULES]
+    assert heavy == []
+    assert total < HELP_IMPORT_BUDGET_US, f"--help imports took {total} us"
+
+
+def test_out_selects_agg_backend(tmp_path):
+    r = run([sys.executable, "-c",
+             "import sys; sys.path.insert(0, 'src'); sys.argv[0] = 'cli'; import cli, matplotlib; "
+             f"cli.main(['--file-level', 'data/ModelAtomicIonLevel.dat', "
+             f"'--file-sublevel', 'data/ModelAtomicIonLevelSublevel.dat', "
+             f"'--file-linefine', 'data/ModelAtomicIonLineFine.dat', '--no-cache', "
+             f"'--out', r'{tmp_path / 'fig.png'}']); print(matplotlib.get_backend())"],
+            stdout=PIPE, stderr=PIPE, text=True)
+    assert r.returncode == 0, r.stderr
+    assert r.stdout.strip().splitlines()[-1].lower() == "agg"
+    assert "backend set" not in r.stdout
+    assert (tmp_path / "fig.png").exists()
+
+
+def test_headless_run_imports_matplotlib_only_to_draw(tmp_path):
+    files = ['--file-level', 'data/ModelAtomicIonLevel.dat', '--file-sublevel',
+             'data/ModelAtomicIonLevelSublevel.dat', '--file-linefine', 'data/ModelAtomicIonLineFine.dat',
+             '--cache-dir', str(tmp_path / 'cache')]
+    code = ("import sys, os; sys.path.insert(0, 'src'); sys.argv[0] = 'cli'; import cli; "
+            "cli.main({!r}); print('matplotlib' in sys.modules, os.environ.get('MPLBACKEND'))")
+    env = {k: v for k, v in os.environ.items() if k != 'MPLBACKEND'}
+    svg = files + ['--renderer', 'svg', '--out', str(tmp_path / 'fig.svg')]
+    r = run([sys.executable, "-c", code.format(svg)], stdout=PIPE, stderr=PIPE, text=True, env=env)
+    assert r.returncode == 0, r.stderr
+    assert r.stdout.strip().splitlines()[-1] == "False None"
+    png = files + ['--out', str(tmp_path / 'fig.png')]
+    r = run([sys.executable, "-c", code.format(png)], stdout=PIPE, stderr=PIPE, text=True, env=env)
+    assert r.returncode == 0, r.stderr
+    assert r.stdout.strip().splitlines()[-1] == "True Agg" and "backend set" not in r.stdout
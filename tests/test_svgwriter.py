@@ -0,0 +1,64 @@
+import sys
+import xml.etree.ElementTree as ET
+from subprocess import run, PIPE
+
+import pytest
+
+from grotrian_plotter.svgwriter import text_runs, nice_ticks, tick_labels, write_diagram
+from grotrian_plotter.plotting import FIGSIZE, DPI
+
+FILES = ['--file-level', 'data/ModelAtomicIonLevel.dat', '--file-sublevel', 'data/ModelAtomicIonLevelSublevel.dat',
+         '--file-linefine', 'data/ModelAtomicIonLineFine.dat', '--no-cache']
+
+
+def test_text_runs():
+    assert text_runs('4p$_{0,1,2}$') == [('4p', 'normal', False), ('0,1,2', 'sub', False)]
+    assert text_runs('$3s^2$') == [('3', 'normal', False), ('s', 'normal', True), ('2', 'sup', False)]
+    assert text_runs('$^1P$') == [('1', 'sup', False), ('P', 'normal', True)]
+    assert text_runs('Energy ($10^4 \\ cm^{-1}$)')[-3:] == [('cm', 'normal', True), ('−1', 'sup', False),
+                                                             (')', 'normal', False)]
+
+
+def test_ticks():
+    ticks = nice_ticks(-0.35, 7.2)
+    assert ticks.tolist() == [0, 1, 2, 3, 4, 5, 6, 7]
+    assert tick_labels(ticks)[:2] == ['0', '1']
+    assert tick_labels(nice_ticks(0, 1)) == ['0.0', '0.2', '0.4', '0.6', '0.8', '1.0']
+
+
+@pytest.fixture(scope="module")
+def mg_diagram():
+    from grotrian_plotter.cache import load_atomic_model
+    from grotrian_plotter.building import levels_frame_to_list
+    model = load_atomic_model(12, 0, range(1, 26), 'data/ModelAtomicIonLevel.dat',
+                              'data/ModelAtomicIonLevelSublevel.dat', 'data/ModelAtomicIonLineFine.dat', cache=None)
+    return levels_frame_to_list(model.frame)[0], model.transitions
+
+
+def test_svg_output(tmp_path, mg_diagram):
+    out = str(tmp_path / "mg.svg")
+    write_diagram(*mg_diagram, out)
+    root = ET.parse(out).getroot()
+    texts = ''.join(''.join(t.itertext()) for t in root.iter('{http://www.w3.org/2000/svg}text'))
+    assert '3p' in texts and 'nl=9s-20p' in texts and 'Energy' in texts
+
+
+def test_png_output(tmp_path, mg_diagram):
+    from PIL import Image
+    out = str(tmp_path / "mg.png")
+    write_diagram(*mg_diagram, out)
+    img = Image.open(out)
+    assert img.size == (round(FIGSIZE[0] * DPI), round(FIGSIZE[1] * DPI))
+    assert (0, 255, 255) in {c for _, c in img.convert('RGB').getcolors(1 << 16)}
+
+
+def test_cli_svg_renderer_does_not_import_matplotlib(tmp_path):
+    out = tmp_path / "fig.svg"
+    r = run([sys.executable, "-c",
+             "import sys; sys.path.insert(0, 'src'); sys.argv[0] = 'cli'; import cli; "
+             f"cli.main({FILES + ['--renderer', 'svg', '--out', str(out)]!r}); "
+             "print('matplotlib' in sys.modules)"],
+            stdout=PIPE, stderr=PIPE, text=True)
+    assert r.returncode == 0, r.stderr
+    assert r.stdout.strip().splitlines()[-1] == "False"
+    assert out.exists()
@@ -0,0 +1,52 @@
+import warnings
+from subprocess import run, PIPE
+
+import pandas as pd
+import pytest
+
+from grotrian_plotter.building import build_transitions_list
+from grotrian_plotter.validation import check_tables, validate_tables, IntegrityError
+
+LEVELS = pd.DataFrame({'LevelNumber': [1, 2, 3], 'FullConfig': ['3s2-1S', None, '3s.3p-3P'],
+                       'ElectronConfig': ['3s2', ' ', '3s.3p']})
+SUBLEVELS = pd.DataFrame({
+    'LevelNumber': [1, 2, 3, 3, 3, 9],
+    'SublevelNumber': [1, 1, 1, 2, 2, 1],
+    '2J': [0, 2, 0, 2, 2, 0],
+    'ExcitationWaven': [0.0, 'x', 21850.4, 21870.5, 21870.5, float('nan')],
+})
+LINES = [[1, 1, 3, 2], [1, 1, 3, 3], [2, 1, 7, 1], [1, 1, 3, float('nan')]]
+
+
+def test_report_counts_and_samples():
+    report = validate_tables(LEVELS, SUBLEVELS, LINES, sample=1)
+    assert report.counts() == {'missing_columns': 0, 'duplicate_sublevels': 1, 'bad_energy': 1,
+                               'missing_level': 1, 'missing_config': 1, 'dangling_transitions': 3}
+    assert report.checks['missing_level']['sample'][0]['LevelNumber'] == 9
+    assert len(report.checks['dangling_transitions']['sample']) == 1
+    assert str(report).startswith('1 duplicate_sublevels, 1 bad_energy') and not report.ok
+    assert validate_tables(LEVELS, SUBLEVELS.drop(columns='2J')).counts() == {'missing_columns': 1}
+
+
+def test_modes():
+    with pytest.raises(IntegrityError) as err:
+        check_tables(LEVELS, SUBLEVELS, LINES, mode='strict')
+    assert err.value.report.counts()['dangling_transitions'] == 3
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter('always')
+        assert not check_tables(LEVELS, SUBLEVELS, LINES * 1000).ok
+        # the per-row loop of the dicts builder reports once as well
+        build_transitions_list([[1, 1, 7, 1]] * 1000, {(1, 1): 0})
+    assert len(caught) == 2
+    with pytest.raises(ValueError):
+        check_tables(LEVELS, SUBLEVELS, mode='fatal')
+
+
+def test_cli_strict_on_clean_data(tmp_path):
+    r = run(["python", "src/cli.py", "--file-level", "data/ModelAtomicIonLevel.dat",
+             "--file-sublevel", "data/ModelAtomicIonLevelSublevel.dat",
+             "--file-linefine", "data/ModelAtomicIonLineFine.dat", "--no-cache", "--renderer", "svg",
+             "--validate", "strict", "--profile", "--out", str(tmp_path / "mg.svg")],
+            stdout=PIPE, stderr=PIPE, text=True)
+    assert r.returncode == 0, r.stderr
+    assert "validate" in r.stdout
@@ -0,0 +1,94 @@
+import os
+import shutil
+
+import matplotlib
+matplotlib.use("Agg")
+
+from grotrian_plotter.watch import DiagramWatcher
+from grotrian_plotter.cache import load_atomic_model
+from grotrian_plotter.building import levels_frame_to_list
+
+NAMES = ("ModelAtomicIonLevel.dat", "ModelAtomicIonLevelSublevel.dat", "ModelAtomicIonLineFine.dat")
+
+
+def _edit(path, old, new):
+    text = open(path).read()
+    assert old in text
+    with open(path, "w") as fh:
+        fh.write(text.replace(old, new, 1))
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+
+
+def _fresh(files):
+    model = load_atomic_model(12, 0, range(1, 26), *files, chunksize=10_000)
+    return levels_frame_to_list(model.frame)[0], model.transitions
+
+
+def test_watch_updates_only_changed_levels(tmp_path):
+    files = [str(tmp_path / name) for name in NAMES]
+    for name in NAMES:
+        shutil.copy(os.path.join("data", name), tmp_path / name)
+    out = tmp_path / "mg.png"
+    w = DiagramWatcher(12, 0, range(1, 26), *files, outpath=str(out))
+    w.render()
+    levels_artist = w.artists["levels"]
+    assert out.exists() and w.poll() == []
+
+    # energy of one sublevel of level 3
+    _edit(files[1], "35051.264", "36051.264")
+    assert w.poll() == ["sublevel"]
+    summary = w.refresh(["sublevel"])
+    assert summary["levels_rebuilt"] == 1 and 0 < summary["lines_resolved"] < len(w.unresolved)
+    w.render()
+    assert w.artists["levels"] is levels_artist
+    ref_levels, ref_transitions = _fresh(files)
+    assert w.levels == ref_levels
+    assert all((a == b).all() for a, b in zip(w.transitions, ref_transitions))
+
+    # drop the last line of the LineFine table
+    lines = open(files[2]).read().splitlines()
+    with open(files[2], "w") as fh:
+        fh.write("\n".join(lines[:-1]) + "\n")
+    assert w.refresh(w.poll())["levels_rebuilt"] == 0
+    w.render()
+    ref_levels, ref_transitions = _fresh(files)
+    assert all((a == b).all() for a, b in zip(w.transitions, ref_transitions))
+
+
+def test_watch_keeps_renderer_and_options(tmp_path):
+    files = [str(tmp_path / name) for name in NAMES]
+    for name in NAMES:
+        shutil.copy(os.path.join("data", name), tmp_path / name)
+    # the collections figure is updated with the options it was drawn with
+    w = DiagramWatcher(12, 0, range(1, 26), *files, outpath=str(tmp_path / "mg.png"), show_J=False)
+    w.render()
+    _edit(files[1], "35051.264", "36051.264")
+    w.refresh(w.poll())
+    w.render()
+    assert w.artists["tags"] and not any("$_{" in t.get_text() for t in w.artists["tags"])
+
+    # the svg renderer writes the file again, without a matplotlib figure
+    svg = tmp_path / "mg.svg"
+    w = DiagramWatcher(12, 0, range(1, 26), *files, outpath=str(svg), renderer="svg")
+    w.render()
+    before = svg.read_text()
+    _edit(files[1], "36051.264", "37051.264")
+    w.refresh(w.poll())
+    w.render()
+    assert w.fig is None and svg.read_text() != before
+
+
+def test_changed_levels_compares_rows_per_level():
+    from grotrian_plotter.watch import changed_levels
+    import pandas as pd
+    old = pd.DataFrame({"LevelNumber": [1, 2, 2, 3], "SublevelNumber": [1, 1, 1, 1],
+                        "ExcitationWaven": [0.0, 10.0, 10.0, float("nan")]})
+    assert len(changed_levels(old, old.copy())) == 0
+    # one of two identical rows of level 2 dropped; level 3 keeps its missing value
+    assert list(changed_levels(old, old.drop(index=2))) == [2]
+    new = old.copy()
+    new.loc[3, "ExcitationWaven"] = 5.0
+    new.loc[1, "ExcitationWaven"] = 10.0 + 1e-14
+    assert list(changed_levels(old, new)) == [3]
+    assert list(changed_levels(old, pd.concat([old, old.iloc[[0]]], ignore_index=True))) == [1]
@@ -0,0 +1,69 @@
+import numpy as np
+
+from grotrian_plotter.cache import TableCache, load_atomic_model
+from grotrian_plotter.building import levels_frame_to_list
+from grotrian_plotter.session import GrotrianSession
+from grotrian_plotter.windows import SortedIndex, WindowIndex, apply_windows
+
+FILES = ("data/ModelAtomicIonLevel.dat", "data/ModelAtomicIonLevelSublevel.dat", "data/ModelAtomicIonLineFine.dat")
+
+
+def _edges(levels, transitions):
+    key = [(lv["LevelNumber"], lv["SublevelNumber"]) for lv in levels]
+    return sorted((key[a], key[b]) for a, b in zip(transitions[0], transitions[1]))
+
+
+def test_sorted_index_matches_scan():
+    values = np.array([5.0, np.nan, 1.0, 3.0, 3.0, 9.0])
+    index = SortedIndex(values)
+    for lo, hi in ((None, None), (3, 3), (2, 6), (None, 4), (4, None), (10, 20), (6, 2)):
+        scan = (values >= (-np.inf if lo is None else lo)) & (values <= (np.inf if hi is None else hi))
+        assert index.mask(lo, hi).tolist() == scan.tolist()
+        assert index.count(lo, hi) == scan.sum()
+    assert index.window(3, 5).tolist() == [3, 4, 0]
+
+
+def test_windows_from_cache_and_session(tmp_path):
+    cache = TableCache(str(tmp_path))
+    windows = dict(emin=40000, emax=60000, wlmin=2000, wlmax=9000)
+    for _ in range(2):
+        # miss, then a hit re-attaching the stored index
+        model = load_atomic_model(12, 0, "1-40", *FILES, cache=cache, values=True, index=True)
+        frame, transitions, index = model.frame, model.transitions, model.window_index
+        levels, _ = levels_frame_to_list(frame)
+        got_levels, got = apply_windows(levels, transitions, index, **windows)
+    assert cache.hits == 1
+
+    # brute force: filter the rows and the lines directly
+    energy = frame["ExcitationWaven"].to_numpy()
+    rows = (energy >= 40000) & (energy <= 60000)
+    wl = transitions[3][:, 0]
+    keep = rows[transitions[0]] & rows[transitions[1]] & (wl >= 2000) & (wl <= 9000)
+    assert [lv for lv, r in zip(levels, rows) if r] == got_levels
+    assert _edges(got_levels, got) == sorted(_edges(levels, (transitions[0][keep], transitions[1][keep])))
+    assert np.allclose(got[3], transitions[3][keep]) and got[2].sum() == transitions[2].sum()
+
+    session = GrotrianSession(files=FILES)
+    s_levels, s_transitions = session.get(12, 0, "1-40", **windows)
+    assert sorted(map(str, s_levels)) == sorted(map(str, got_levels))
+    assert _edges(s_levels, s_transitions) == _edges(got_levels, got)
+    model = session.model(12, 0, [])
+    index = model.window_index()
+    session.get(12, 0, "1-40", emin=50000)
+    assert model.window_index() is index
+
+
+def test_energy_bounds_equal_to_table_energies():
+    Levels_SQL, LevelsSub_SQL, frame, transitions, index = load_atomic_model(12, 0, "1-40", *FILES)
+    assert index is None
+    levels, _ = levels_frame_to_list(frame)
+    # 21911.178 / 1e4 * 1e4 < 21911.178: a bound on the rescaled energy would miss this sublevel
+    assert 21911.178 in LevelsSub_SQL["ExcitationWaven"].tolist()
+    for e in LevelsSub_SQL["ExcitationWaven"]:
+        index = WindowIndex.build(frame, transitions)
+        got, _ = apply_windows(levels, transitions, index, emin=e, emax=e)
+        assert got and all(lv["energy"] == e / 1e4 for lv in got)
+    got, _ = apply_windows(frame, transitions, emin=21911.178, emax=21911.178)
+    assert got["ExcitationWaven"].tolist() == [21911.178]
+    session = GrotrianSession(files=FILES)
+    assert len(session.get(12, 0, "1-40", emin=21911.178, emax=21911.178)[0]) == 1